@@ -1,6 +1,9 @@
 from datetime import time
 from typing import List, TYPE_CHECKING
 
+# Duración por defecto de un turno, en minutos (ver también data/generar_turnos.py)
+DURACION_TURNO_MINUTOS = 30
+
 if TYPE_CHECKING:
     from medico import Medico
     from consultorio import Consultorio
@@ -12,13 +15,15 @@ class Agenda:
     
     def __init__(self, nro_agenda: int, medico: 'Medico', 
                  consultorio: 'Consultorio', dia_semana: str,
-                 hora_inicio: time, hora_fin: time):
+                 hora_inicio: time, hora_fin: time,
+                 duracion_turno: int = DURACION_TURNO_MINUTOS):
         self.__nroAgenda = nro_agenda
         self.__medico = medico
         self.__consultorio = consultorio
         self.__deSemana = dia_semana
         self.__hora_inicio = hora_inicio
         self.__hora_fin = hora_fin
+        self.__duracion_turno = duracion_turno
         self.__turnos: List['Turno'] = []
     
     # Getters
@@ -46,6 +51,10 @@ class Agenda:
         """Obtiene la hora de fin"""
         return self.__hora_fin
     
+    def get_duracion_turno(self) -> int:
+        """Obtiene la duración de cada turno, en minutos"""
+        return self.__duracion_turno
+    
     def get_turnos(self) -> List['Turno']:
         """Obtiene la lista de turnos"""
         return self.__turnos.copy()
@@ -66,6 +75,13 @@ class Agenda:
         """Modifica la hora de fin"""
         self.__hora_fin = hora_fin
     
+    def set_duracion_turno(self, duracion_turno: int) -> None:
+        """Modifica la duración de cada turno, en minutos"""
+        if duracion_turno > 0:
+            self.__duracion_turno = duracion_turno
+        else:
+            raise ValueError("La duración del turno debe ser mayor a cero")
+    
     # Métodos de negocio
     def verificar_disponibilidad(self) -> bool:
         """Verifica si hay espacios disponibles en la agenda"""
@@ -75,7 +91,7 @@ class Agenda:
         """Calcula la cantidad de turnos que caben en este horario"""
         diferencia = (self.__hora_fin.hour * 60 + self.__hora_fin.minute) - \
                      (self.__hora_inicio.hour * 60 + self.__hora_inicio.minute)
-        return diferencia // 30  # Asumiendo turnos de 30 minutos
+        return diferencia // self.__duracion_turno
     
     def actualizar_agenda(self) -> None:
         """Actualiza la información de la agenda"""
@@ -0,0 +1,200 @@
+"""
+Prueba de carga de reservas concurrentes sobre los mismos turnos
+
+Varios hilos (recepcionistas) intentan programar todos los turnos de una
+misma tanda en distinto orden. La mitad usa programar_turno (por id_turno)
+y la otra mitad programar_turno_libre (el camino del asistente de reservas,
+por agenda, fecha y hora), así los dos compiten por las mismas filas. Cada
+turno debe quedar tomado exactamente una vez y el resto de los intentos
+debe recibir "ya fue tomado".
+
+Uso:
+    python benchmark_reservas.py [hilos] [cantidad_turnos] [archivo.sqlite]
+
+Por defecto usa SQLite en un archivo temporal con los datos de ejemplo.
+Con SQLite la comprobación de doble reserva no dice mucho: BEGIN IMMEDIATE
+serializa a todos los escritores, así que las carreras entre transacciones
+no pueden ocurrir y solo se mide el costo. La verificación es significativa
+con DB_BACKEND=mysql, que corre contra el servidor configurado (los turnos
+de prueba se crean dentro de dos años y al terminar se borran solo las
+filas creadas por la prueba, por id_turno).
+"""
+
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+HILOS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+CANTIDAD_TURNOS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+os.environ.setdefault("DB_POOL_SIZE", str(HILOS + 2))
+
+# El motor se elige antes de crear Database
+os.environ.setdefault("DB_BACKEND", "sqlite")
+if os.environ["DB_BACKEND"] == "sqlite":
+    # Cada hilo usa su propia conexión: hace falta una base en archivo
+    os.environ["DB_SQLITE_PATH"] = sys.argv[3] if len(sys.argv) > 3 else os.path.join(
+        tempfile.mkdtemp(prefix="tpdao_reservas_"), "hospital.sqlite")
+    os.environ.setdefault("DB_SQLITE_DATOS", "1")
+
+from data.database import Database
+from data.generar_turnos import calcular_slots
+from frontend.controllers.turno_controller import TurnoController
+
+
+def crear_turnos_libres(db: Database):
+    """Crea la tanda de turnos libres a disputar y devuelve (turnos, pacientes)"""
+    agenda = db.obtener_registro(
+        "SELECT id_agenda, matricula, id_consultorio, dia_semana, hora_inicio, hora_fin "
+        "FROM Agenda WHERE activa = TRUE LIMIT 1")
+    pacientes = [p['id_paciente'] for p in db.obtener_registros(
+        "SELECT id_paciente FROM Paciente LIMIT 50") or []]
+    if not agenda or not pacientes:
+        print("[ERROR] Se necesitan al menos una agenda activa y un paciente")
+        sys.exit(1)
+
+    # Horarios reales de la agenda: programar_turno_libre valida contra ella
+    inicio = date.today() + timedelta(days=730)
+    slots = calcular_slots([agenda], inicio, inicio + timedelta(days=7 * CANTIDAD_TURNOS))[:CANTIDAD_TURNOS]
+    if len(slots) < CANTIDAD_TURNOS:
+        print("[ERROR] La agenda no tiene horarios suficientes")
+        sys.exit(1)
+    filas = [(matricula, id_consultorio, id_agenda, fecha, hora_inicio, hora_fin)
+             for matricula, id_consultorio, id_agenda, fecha, hora_inicio, hora_fin in slots]
+
+    resultado = db.ejecutar_lote(
+        "INSERT INTO Turno (matricula, id_consultorio, id_agenda, fecha, hora_inicio, hora_fin, estado) "
+        "VALUES (%s, %s, %s, %s, %s, %s, 'Libre')",
+        filas
+    )
+    if not resultado or len(resultado['ids']) != CANTIDAD_TURNOS:
+        print("[ERROR] No se pudieron crear los turnos de prueba")
+        sys.exit(1)
+
+    turnos = [
+        {'id_turno': id_turno, 'matricula': matricula, 'id_consultorio': id_consultorio,
+         'id_agenda': id_agenda, 'fecha': fecha, 'hora_inicio': hora_inicio, 'hora_fin': hora_fin}
+        for id_turno, (matricula, id_consultorio, id_agenda, fecha, hora_inicio, hora_fin)
+        in zip(resultado['ids'], slots)
+    ]
+    return turnos, pacientes
+
+
+def recepcionista(numero: int, turnos, pacientes, ganadores, resultados, reservados, barrera):
+    """
+    Intenta programar todos los turnos en orden aleatorio: los hilos pares por
+    id_turno y los impares como turno libre del asistente
+    """
+    controller = TurnoController()
+
+    # programar_turno_libre no devuelve el id_turno: se registra el que
+    # devuelve reservar para verificar y borrar solo las filas de la prueba
+    reservar = controller.disponibilidad.reservar
+
+    def reservar_registrando(*args, **kwargs):
+        exito, mensaje, id_turno = reservar(*args, **kwargs)
+        if id_turno is not None:
+            reservados.add(id_turno)
+        return exito, mensaje, id_turno
+
+    controller.disponibilidad.reservar = reservar_registrando
+    orden = list(turnos)
+    random.Random(numero).shuffle(orden)
+    conteo = {'exitosas': 0, 'tomadas': 0, 'errores': 0}
+
+    barrera.wait()
+    for turno in orden:
+        id_turno = turno['id_turno']
+        id_paciente = pacientes[(numero + id_turno) % len(pacientes)]
+        if numero % 2 == 0:
+            exito, mensaje = controller.programar_turno(id_paciente, 0, id_turno, f"hilo {numero}")
+        else:
+            exito, mensaje = controller.programar_turno_libre(id_paciente, turno, observaciones=f"hilo {numero}")
+        if exito:
+            conteo['exitosas'] += 1
+            ganadores.setdefault(id_turno, []).append(numero)
+        elif "ya fue tomado" in mensaje:
+            conteo['tomadas'] += 1
+        else:
+            conteo['errores'] += 1
+    resultados[numero] = conteo
+
+
+def main():
+    print("=" * 80)
+    print(f"RESERVAS CONCURRENTES - {HILOS} hilos x {CANTIDAD_TURNOS} turnos "
+          f"(por id_turno y como turno libre)")
+    print("=" * 80)
+
+    db = Database()
+    if not db.conectar():
+        sys.exit(1)
+    try:
+        turnos, pacientes = crear_turnos_libres(db)
+        ids = [t['id_turno'] for t in turnos]
+    finally:
+        db.desconectar()
+
+    ganadores, resultados, reservados = {}, {}, set()
+    barrera = threading.Barrier(HILOS + 1)
+    hilos = [
+        threading.Thread(target=recepcionista,
+                         args=(n, turnos, pacientes, ganadores, resultados, reservados, barrera))
+        for n in range(HILOS)
+    ]
+    for hilo in hilos:
+        hilo.start()
+
+    # Las notificaciones de terminal no forman parte de la medición
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        barrera.wait()
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+    exitosas = sum(r['exitosas'] for r in resultados.values())
+    tomadas = sum(r['tomadas'] for r in resultados.values())
+    errores = sum(r['errores'] for r in resultados.values())
+    intentos = exitosas + tomadas + errores
+    duplicados = [id_turno for id_turno, hilos_ok in ganadores.items() if len(hilos_ok) > 1]
+
+    # programar_turno_libre nunca debe crear una segunda fila para un horario ya materializado
+    extra = len(reservados - set(ids))
+    ids_prueba = sorted(set(ids) | reservados)
+    marcadores = ", ".join(["%s"] * len(ids_prueba))
+    db = Database()
+    db.conectar()
+    try:
+        filas = db.obtener_registros(
+            f"SELECT id_turno, estado FROM Turno WHERE id_turno IN ({marcadores})", tuple(ids_prueba)) or []
+        programados = sum(1 for f in filas if f['estado'] == 'Programado')
+        db.ejecutar_consulta(f"DELETE FROM Turno WHERE id_turno IN ({marcadores})", tuple(ids_prueba))
+    finally:
+        db.desconectar()
+
+    print(f"\n   Intentos:                {intentos:>10,}")
+    print(f"   Reservas exitosas:       {exitosas:>10,}")
+    print(f"   Rechazadas (ya tomado):  {tomadas:>10,}")
+    print(f"   Errores:                 {errores:>10,}")
+    print(f"   Tiempo total:            {duracion * 1000:>10.1f} ms")
+    print(f"   Intentos por segundo:    {intentos / duracion:>10,.0f}")
+    print(f"   Reservas por segundo:    {exitosas / duracion:>10,.0f}")
+
+    correcto = (exitosas == CANTIDAD_TURNOS == programados and not duplicados and not errores and not extra)
+    print(f"\n   {'[OK] Cada turno se tomó exactamente una vez' if correcto else '[ERROR] Reservas inconsistentes'}")
+    if duplicados:
+        print(f"   Turnos tomados más de una vez: {duplicados[:10]}")
+    if extra:
+        print(f"   Filas de turno de más: {extra}")
+
+    Database.cerrar_pools()
+    sys.exit(0 if correcto else 1)
+
+
+if __name__ == "__main__":
+    main()
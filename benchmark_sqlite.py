@@ -0,0 +1,140 @@
+"""
+Benchmark de controladores, gestores y reportes sobre SQLite (sin servidor MySQL)
+
+Uso:
+    python benchmark_sqlite.py [cantidad_turnos] [archivo.sqlite]
+
+Por defecto genera 1.000.000 de turnos en una base en memoria.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+# El motor se elige antes de crear Database
+os.environ["DB_BACKEND"] = "sqlite"
+if len(sys.argv) > 2:
+    os.environ["DB_SQLITE_PATH"] = sys.argv[2]
+
+from data.database import Database
+from frontend.controllers.turno_controller import TurnoController
+from gestores.gestor_turno import GestorTurno
+
+CANTIDAD_TURNOS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+CANTIDAD_MEDICOS = 200
+CANTIDAD_PACIENTES = 20_000
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+ESTADOS = ["Libre", "Programado", "Atendido", "Cancelado", "Inasistencia"]
+
+
+def medir(nombre, funcion):
+    """Ejecuta `funcion` y muestra cuánto tardó"""
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    print(f"   {nombre:<45} {duracion * 1000:>10.1f} ms")
+    return resultado
+
+
+def poblar(db: Database):
+    """Genera médicos, pacientes, agendas y turnos sintéticos"""
+    random.seed(42)
+    hoy = date.today()
+
+    db.ejecutar_lote(
+        "INSERT INTO especialidad (id_especialidad, nombre) VALUES (%s, %s)",
+        [(i, f"Especialidad {i}") for i in range(1, 11)]
+    )
+    db.ejecutar_lote(
+        "INSERT INTO medico (matricula, nombre, apellido, fecha_ingreso, activo) VALUES (%s, %s, %s, %s, 1)",
+        [(m, f"Medico{m}", "Bench", hoy - timedelta(days=3650)) for m in range(1, CANTIDAD_MEDICOS + 1)]
+    )
+    db.ejecutar_lote(
+        "INSERT INTO medico_especialidad (matricula, id_especialidad) VALUES (%s, %s)",
+        [(m, m % 10 + 1) for m in range(1, CANTIDAD_MEDICOS + 1)]
+    )
+    db.ejecutar_lote(
+        "INSERT INTO paciente (id_paciente, nombre, apellido, fecha_nacimiento, activo) VALUES (%s, %s, %s, %s, 1)",
+        [(p, f"Paciente{p}", "Bench", date(1980, 1, 1)) for p in range(1, CANTIDAD_PACIENTES + 1)]
+    )
+    db.ejecutar_lote(
+        "INSERT INTO consultorio (id_consultorio, numero, piso) VALUES (%s, %s, %s)",
+        [(c, 100 + c, c % 5) for c in range(1, 51)]
+    )
+    db.ejecutar_lote(
+        "INSERT INTO agenda (id_agenda, matricula, id_consultorio, dia_semana, hora_inicio, hora_fin) "
+        "VALUES (%s, %s, %s, %s, '08:00:00', '16:00:00')",
+        [(m, m, m % 50 + 1, DIAS[m % 5]) for m in range(1, CANTIDAD_MEDICOS + 1)]
+    )
+
+    # 16 turnos de 30 minutos por día y médico, hacia atrás y adelante de hoy
+    def filas_turnos():
+        generados = 0
+        dia = 0
+        while True:
+            fecha = hoy + timedelta(days=dia - 180)
+            for matricula in range(1, CANTIDAD_MEDICOS + 1):
+                for slot in range(16):
+                    if generados >= CANTIDAD_TURNOS:
+                        return
+                    estado = random.choice(ESTADOS)
+                    paciente = None if estado == "Libre" else random.randint(1, CANTIDAD_PACIENTES)
+                    inicio = timedelta(hours=8, minutes=30 * slot)
+                    yield (paciente, matricula, matricula % 50 + 1, matricula, matricula % 10 + 1,
+                           fecha, inicio, inicio + timedelta(minutes=30), estado)
+                    generados += 1
+            dia += 1
+
+    db.ejecutar_lote(
+        "INSERT INTO turno (id_paciente, matricula, id_consultorio, id_agenda, id_especialidad, "
+        "fecha, hora_inicio, hora_fin, estado) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+        filas_turnos(),
+        chunk_size=10_000
+    )
+
+
+def main():
+    print("=" * 80)
+    print(f"BENCHMARK SQLITE - {CANTIDAD_TURNOS:,} turnos")
+    print("=" * 80)
+
+    db = Database()
+    Database.metricas.activo = False
+    if not db.conectar():
+        sys.exit(1)
+    try:
+        print("\n1. Generando datos...")
+        medir("Poblar base", lambda: poblar(db))
+    finally:
+        db.desconectar()
+    Database.metricas.activo = True
+
+    controller = TurnoController()
+    gestor = GestorTurno()
+
+    print("\n2. Consultas")
+    medir("TurnoController.obtener_turnos_filtrados(hoy)", lambda: controller.obtener_turnos_filtrados("hoy"))
+    medir("TurnoController.obtener_turnos_filtrados(todos)", lambda: controller.obtener_turnos_filtrados("todos"))
+    medir("TurnoController.obtener_turnos_con_doble_filtro", lambda: controller.obtener_turnos_con_doble_filtro("futuros", "todos_estados"))
+    medir("TurnoController.obtener_turnos_libres_medico", lambda: controller.obtener_turnos_libres_medico(1))
+    medir("TurnoController.obtener_proximos_turnos_especialidad", lambda: controller.obtener_proximos_turnos_especialidad(1, 10))
+    medir("TurnoController.obtener_medicos", controller.obtener_medicos)
+    medir("GestorTurno.iterar_turnos_bd (recorrido completo)", lambda: sum(1 for _ in gestor.iterar_turnos_bd(5000)))
+
+    try:
+        from reports.asistencia import _contar_asistencias
+        medir("reports.asistencia._contar_asistencias", _contar_asistencias)
+    except ImportError as e:
+        print(f"   (reporte de asistencia omitido: {e})")
+
+    print("\n3. Consultas más costosas (tiempo total)")
+    for fila in Database.estadisticas_consultas()['por_huella'][:5]:
+        print(f"   {fila['total_ms']:>10.1f} ms  x{fila['cantidad']:<4} p95 {fila['p95_ms']:>8.1f} ms  {fila['huella'][:70]}")
+
+    Database.cerrar_pools()
+
+
+if __name__ == "__main__":
+    main()
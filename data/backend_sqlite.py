@@ -0,0 +1,412 @@
+"""
+Motor SQLite para Database (DB_BACKEND=sqlite).
+
+Permite correr controladores, gestores y reportes sin un servidor MySQL, por
+ejemplo para benchmarks o pruebas de carga: la conexión imita la interfaz de
+mysql.connector que usa Database, traduce el esquema de
+data/hospital_db_tpdao_create.sql y los pocos dialectos de MySQL que aparecen
+en las consultas (%s, CURDATE, NOW, GROUP_CONCAT ... SEPARATOR, INSERT IGNORE).
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from mysql.connector import Error
+from mysql.connector.errors import IntegrityError
+
+
+_DIR_DATA = os.path.dirname(os.path.abspath(__file__))
+_DIR_RAIZ = os.path.dirname(_DIR_DATA)
+
+# Scripts MySQL que arman el esquema, en orden
+SCRIPTS_ESQUEMA = [
+    os.path.join(_DIR_DATA, "hospital_db_tpdao_create.sql"),
+    os.path.join(_DIR_RAIZ, "ampliacion_bd_contactos.sql"),
+]
+SCRIPT_DATOS = os.path.join(_DIR_DATA, "hospital_db_tpdao_inserts.sql")
+
+
+# ============================================================
+# Traducción de consultas
+# ============================================================
+
+_RE_GROUP_CONCAT_DISTINCT = re.compile(
+    r"GROUP_CONCAT\(\s*DISTINCT\s+([^()]+?)\s+SEPARATOR\s+('[^']*')\s*\)", re.IGNORECASE)
+_RE_GROUP_CONCAT = re.compile(
+    r"GROUP_CONCAT\(\s*([^()]+?)\s+SEPARATOR\s+('[^']*')\s*\)", re.IGNORECASE)
+_REEMPLAZOS = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bCURDATE\(\)", re.IGNORECASE), "DATE('now', 'localtime')"),
+    (re.compile(r"\bCURTIME\(\)", re.IGNORECASE), "TIME('now', 'localtime')"),
+    (re.compile(r"\bDATE_ADD\(\s*NOW\(\)\s*,\s*INTERVAL\s+(\?|\d+)\s+SECOND\s*\)", re.IGNORECASE),
+     r"DATETIME('now', 'localtime', '+' || \1 || ' seconds')"),
+    (re.compile(r"\bNOW\(\)", re.IGNORECASE), "DATETIME('now', 'localtime')"),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.IGNORECASE), "INSERT OR IGNORE"),
+    (re.compile(r"\s+FOR\s+UPDATE(\s+SKIP\s+LOCKED)?\b", re.IGNORECASE), ""),
+    # Las columnas de texto ya se crean con COLLATE NOCASE
+    (re.compile(r"\s+COLLATE\s+utf8mb4_\w+", re.IGNORECASE), ""),
+]
+
+
+@lru_cache(maxsize=512)
+def traducir_consulta(sql: str) -> str:
+    """
+    Traduce una consulta escrita para MySQL al dialecto de SQLite
+
+    CONCAT() no se traduce: se registra como función en cada conexión.
+    """
+    # SQLite no acepta DISTINCT con separador: se concatena con ',' y se reemplaza
+    sql = _RE_GROUP_CONCAT_DISTINCT.sub(r"REPLACE(GROUP_CONCAT(DISTINCT \1), ',', \2)", sql)
+    sql = _RE_GROUP_CONCAT.sub(r"GROUP_CONCAT(\1, \2)", sql)
+    for patron, reemplazo in _REEMPLAZOS:
+        sql = patron.sub(reemplazo, sql)
+    return sql
+
+
+# ============================================================
+# Traducción del esquema
+# ============================================================
+
+_RE_OPCIONES_TABLA = re.compile(r"\)\s*ENGINE\s*=.*$", re.IGNORECASE | re.DOTALL)
+_RE_CREATE_TABLE = re.compile(
+    r"^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)\)\s*$", re.IGNORECASE | re.DOTALL)
+_RE_PRIMARY_KEY = re.compile(r"^PRIMARY\s+KEY\s*\(\s*(\w+)\s*\)$", re.IGNORECASE)
+_RE_UNIQUE_KEY = re.compile(r"^UNIQUE\s+KEY\s*(?:\w+\s*)?(\(.*\))$", re.IGNORECASE)
+_RE_KEY = re.compile(r"^KEY\s*(?:\w+\s*)?(\(.*\))$", re.IGNORECASE)
+_RE_TEXTO = re.compile(r"^\w+\s+(VARCHAR|TEXT|CHAR)\b", re.IGNORECASE)
+_RE_INVISIBLE = re.compile(r"\s+INVISIBLE\b", re.IGNORECASE)
+_SENTENCIAS_IGNORADAS = re.compile(r"^\s*(DROP\s+DATABASE|CREATE\s+DATABASE|USE)\b", re.IGNORECASE)
+
+
+def _dividir_definiciones(cuerpo: str) -> List[str]:
+    """Separa el cuerpo de un CREATE TABLE por las comas de primer nivel"""
+    partes, actual, nivel = [], [], 0
+    for caracter in cuerpo:
+        if caracter == "(":
+            nivel += 1
+        elif caracter == ")":
+            nivel -= 1
+        if caracter == "," and nivel == 0:
+            partes.append("".join(actual).strip())
+            actual = []
+        else:
+            actual.append(caracter)
+    if "".join(actual).strip():
+        partes.append("".join(actual).strip())
+    return partes
+
+
+def _traducir_create_table(sentencia: str) -> List[str]:
+    """Traduce un CREATE TABLE de MySQL a SQLite (más sus CREATE INDEX)"""
+    sentencia = _RE_OPCIONES_TABLA.sub(")", sentencia)
+    coincidencia = _RE_CREATE_TABLE.match(sentencia)
+    if not coincidencia:
+        return [sentencia]
+
+    tabla = coincidencia.group(2)
+    definiciones = _dividir_definiciones(coincidencia.group(3))
+
+    # La columna AUTO_INCREMENT pasa a ser INTEGER PRIMARY KEY AUTOINCREMENT
+    autoincremental = None
+    for definicion in definiciones:
+        if re.search(r"\bAUTO_INCREMENT\b", definicion, re.IGNORECASE):
+            autoincremental = definicion.split()[0]
+
+    columnas, indices = [], []
+    for definicion in definiciones:
+        if _RE_PRIMARY_KEY.match(definicion) and _RE_PRIMARY_KEY.match(definicion).group(1) == autoincremental:
+            continue
+        unica = _RE_UNIQUE_KEY.match(definicion)
+        clave = _RE_KEY.match(definicion)
+        if unica:
+            columnas.append(f"UNIQUE {unica.group(1)}")
+        elif clave:
+            indices.append(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_{len(indices) + 1} ON {tabla} {clave.group(1)}")
+        elif definicion.split()[0] == autoincremental:
+            columnas.append(f"{autoincremental} INTEGER PRIMARY KEY AUTOINCREMENT")
+        elif _RE_INVISIBLE.search(definicion):
+            # SQLite no tiene columnas invisibles: queda como columna normal
+            columnas.append(_RE_INVISIBLE.sub("", definicion))
+        elif _RE_TEXTO.match(definicion):
+            # Las comparaciones de texto en MySQL (utf8mb4_*_ci) no distinguen mayúsculas
+            columnas.append(f"{definicion} COLLATE NOCASE")
+        else:
+            columnas.append(definicion)
+
+    prefijo = "CREATE TABLE IF NOT EXISTS" if coincidencia.group(1) else "CREATE TABLE"
+    cuerpo = ",\n  ".join(columnas)
+    return [f"{prefijo} {tabla} (\n  {cuerpo}\n)"] + indices
+
+
+def _sentencias_de_script(texto: str) -> List[str]:
+    """Separa un script SQL en sentencias completas, sin comentarios de línea"""
+    sentencias, actual = [], ""
+    for linea in texto.lstrip("﻿").splitlines():
+        if linea.strip().startswith("--"):
+            continue
+        actual += linea + "\n"
+        if sqlite3.complete_statement(actual):
+            sentencias.append(actual.strip().rstrip(";").strip())
+            actual = ""
+    if actual.strip():
+        sentencias.append(actual.strip().rstrip(";").strip())
+    return sentencias
+
+
+def traducir_script(texto: str) -> List[str]:
+    """
+    Traduce un script MySQL (esquema o datos) a sentencias SQLite
+
+    Returns:
+        Lista de sentencias listas para ejecutar, en orden
+    """
+    resultado = []
+    for sentencia in _sentencias_de_script(texto):
+        if not sentencia or _SENTENCIAS_IGNORADAS.match(sentencia):
+            continue
+        if re.match(r"^\s*CREATE\s+TABLE\b", sentencia, re.IGNORECASE):
+            resultado.extend(_traducir_create_table(sentencia))
+        else:
+            resultado.append(traducir_consulta(sentencia))
+    return resultado
+
+
+# ============================================================
+# Tipos
+# ============================================================
+
+def _a_timedelta(valor: bytes):
+    """TIME se devuelve como timedelta, igual que mysql.connector"""
+    texto = valor.decode()
+    try:
+        horas, minutos, segundos = texto.split(":")
+        return timedelta(hours=int(horas), minutes=int(minutos), seconds=float(segundos))
+    except ValueError:
+        return texto
+
+
+def _a_fecha(valor: bytes):
+    texto = valor.decode()
+    try:
+        return date.fromisoformat(texto[:10])
+    except ValueError:
+        return texto
+
+
+def _a_fecha_hora(valor: bytes):
+    texto = valor.decode()
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        return texto
+
+
+def _timedelta_a_texto(valor: timedelta) -> str:
+    segundos = int(valor.total_seconds())
+    return f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+
+
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(sep=" "))
+sqlite3.register_adapter(time, lambda t: t.isoformat())
+sqlite3.register_adapter(timedelta, _timedelta_a_texto)
+sqlite3.register_converter("DATE", _a_fecha)
+sqlite3.register_converter("TIME", _a_timedelta)
+sqlite3.register_converter("DATETIME", _a_fecha_hora)
+sqlite3.register_converter("TIMESTAMP", _a_fecha_hora)
+
+
+def _concat(*valores):
+    """CONCAT() de MySQL: NULL si algún argumento es NULL"""
+    if any(v is None for v in valores):
+        return None
+    return "".join(_timedelta_a_texto(v) if isinstance(v, timedelta) else str(v) for v in valores)
+
+
+def _convertir_error(e: sqlite3.Error) -> Error:
+    """Convierte un error de sqlite3 al equivalente de mysql.connector"""
+    if isinstance(e, sqlite3.IntegrityError):
+        errno = 1062 if "UNIQUE" in str(e) else 1452
+        return IntegrityError(msg=str(e), errno=errno)
+    return Error(msg=str(e))
+
+
+# ============================================================
+# Conexión y cursor con la interfaz de mysql.connector
+# ============================================================
+
+class CursorSQLite:
+    """Cursor con la interfaz de mysql.connector (dictionary, column_names, lastrowid...)"""
+
+    def __init__(self, conexion: sqlite3.Connection, dictionary: bool = False):
+        self.__conexion = conexion
+        self.__cursor = conexion.cursor()
+        self.__dictionary = dictionary
+        self.lastrowid: Optional[int] = None
+        self.rowcount = -1
+
+    @property
+    def column_names(self) -> tuple:
+        if not self.__cursor.description:
+            return ()
+        return tuple(d[0] for d in self.__cursor.description)
+
+    def execute(self, query: str, params: Optional[Sequence] = None) -> None:
+        try:
+            self.__cursor.execute(traducir_consulta(query), tuple(params) if params else ())
+        except sqlite3.Error as e:
+            raise _convertir_error(e) from e
+        self.rowcount = self.__cursor.rowcount
+        self.lastrowid = self.__cursor.lastrowid
+
+    def executemany(self, query: str, seq_params: Sequence[Sequence]) -> None:
+        try:
+            self.__cursor.executemany(traducir_consulta(query), seq_params)
+            self.rowcount = self.__cursor.rowcount
+            # mysql.connector devuelve el id de la PRIMERA fila de un INSERT múltiple
+            self.lastrowid = None
+            if self.rowcount > 0 and query.lstrip()[:6].upper() == "INSERT":
+                ultimo = self.__conexion.execute("SELECT last_insert_rowid()").fetchone()[0]
+                self.lastrowid = ultimo - self.rowcount + 1
+        except sqlite3.Error as e:
+            raise _convertir_error(e) from e
+
+    def __fila(self, fila):
+        if fila is None or not self.__dictionary:
+            return fila
+        return dict(zip(self.column_names, fila))
+
+    def fetchone(self):
+        return self.__fila(self.__cursor.fetchone())
+
+    def fetchmany(self, size: int = 1) -> List:
+        return [self.__fila(f) for f in self.__cursor.fetchmany(size)]
+
+    def fetchall(self) -> List:
+        return [self.__fila(f) for f in self.__cursor.fetchall()]
+
+    def close(self) -> None:
+        self.__cursor.close()
+
+
+class ConexionSQLite:
+    """Conexión SQLite en modo autocommit, con la interfaz de mysql.connector que usa Database"""
+
+    def __init__(self, conexion: sqlite3.Connection):
+        self.__conexion = conexion
+        self.__abierta = True
+
+    def cursor(self, dictionary: bool = False, buffered: Optional[bool] = None,
+               prepared: bool = False) -> CursorSQLite:
+        # sqlite3 ya reutiliza las sentencias compiladas; buffered/prepared no cambian nada
+        return CursorSQLite(self.__conexion, dictionary=dictionary)
+
+    def start_transaction(self) -> None:
+        # IMMEDIATE toma el lock de escritura al empezar, como FOR UPDATE en MySQL:
+        # con BEGIN diferido, dos transacciones que leen y después escriben fallan
+        # con "database is locked" en lugar de esperarse
+        self.__conexion.execute("BEGIN IMMEDIATE")
+
+    def commit(self) -> None:
+        self.__conexion.commit()
+
+    def rollback(self) -> None:
+        self.__conexion.rollback()
+
+    def consume_results(self) -> None:
+        pass
+
+    def is_connected(self) -> bool:
+        return self.__abierta
+
+    def get_server_info(self) -> str:
+        return f"SQLite {sqlite3.sqlite_version}"
+
+    def close(self) -> None:
+        self.__abierta = False
+        self.__conexion.close()
+
+
+# Bases en memoria abiertas: la conexión "ancla" mantiene viva la base compartida
+# aunque el pool cierre todas sus conexiones
+_anclas: Dict[str, sqlite3.Connection] = {}
+_inicializadas = set()
+_lock = threading.Lock()
+
+
+def _abrir(ruta: str) -> sqlite3.Connection:
+    if ruta == ":memory:":
+        uri, es_uri = "file:hospital_db?mode=memory&cache=shared", True
+    else:
+        uri, es_uri = ruta, ruta.startswith("file:")
+
+    conexion = sqlite3.connect(
+        uri, uri=es_uri, timeout=30, isolation_level=None,
+        detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False
+    )
+    conexion.create_function("CONCAT", -1, _concat, deterministic=True)
+    conexion.execute("PRAGMA foreign_keys = ON")
+    if ruta == ":memory:":
+        # En cache compartido las lecturas no bloquean a las escrituras de otro hilo
+        conexion.execute("PRAGMA read_uncommitted = 1")
+    else:
+        conexion.execute("PRAGMA journal_mode = WAL")
+    return conexion
+
+
+def inicializar_esquema(conexion: sqlite3.Connection, con_datos: bool = False) -> None:
+    """Crea las tablas traducidas (y opcionalmente los datos de ejemplo) si la base está vacía"""
+    existe = conexion.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'turno'").fetchone()
+    if existe:
+        return
+
+    scripts = SCRIPTS_ESQUEMA + ([SCRIPT_DATOS] if con_datos else [])
+    conexion.execute("BEGIN")
+    try:
+        for ruta in scripts:
+            with open(ruta, encoding="utf-8") as f:
+                for sentencia in traducir_script(f.read()):
+                    conexion.execute(sentencia)
+        conexion.execute("COMMIT")
+    except Exception:
+        conexion.execute("ROLLBACK")
+        raise
+
+
+def conectar(ruta: str = ":memory:", con_datos: bool = False) -> ConexionSQLite:
+    """
+    Abre una conexión SQLite con el esquema del sistema
+
+    Args:
+        ruta: Archivo de la base, o ':memory:' para una base en memoria
+              compartida por todas las conexiones del proceso
+        con_datos: Cargar hospital_db_tpdao_inserts.sql al crear el esquema
+
+    Raises:
+        mysql.connector.Error: Si no se puede abrir la base o crear el esquema
+    """
+    try:
+        with _lock:
+            if ruta == ":memory:" and ruta not in _anclas:
+                _anclas[ruta] = _abrir(ruta)
+            conexion = _abrir(ruta)
+            if ruta not in _inicializadas:
+                inicializar_esquema(conexion, con_datos)
+                _inicializadas.add(ruta)
+        return ConexionSQLite(conexion)
+    except (sqlite3.Error, OSError) as e:
+        raise Error(msg=f"SQLite ({ruta}): {e}") from e
+
+
+def descartar_memoria() -> None:
+    """Libera la base en memoria compartida (la próxima conexión la recrea vacía)"""
+    with _lock:
+        ancla = _anclas.pop(":memory:", None)
+        if ancla is not None:
+            ancla.close()
+        _inicializadas.discard(":memory:")
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+
+class CacheSentencias:
+    """
+    Cache LRU de sentencias preparadas de UNA conexión, indexada por el texto SQL.
+    Cada entrada es un cursor preparado: mientras siga en el cache, volver a
+    ejecutar el mismo SQL no obliga al servidor a parsearlo y planificarlo de nuevo.
+
+    No es thread-safe: cada conexión la usa un solo hilo a la vez (ver Database).
+    """
+
+    def __init__(self, capacidad: int = 64):
+        """
+        Args:
+            capacidad: Cantidad máxima de sentencias preparadas por conexión
+        """
+        self.__capacidad = capacidad
+        self.__cursores: 'OrderedDict[str, Any]' = OrderedDict()
+        self.__aciertos = 0
+        self.__fallos = 0
+        self.__desalojadas = 0
+
+    def obtener(self, sql: str, crear: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Devuelve el cursor preparado para `sql`, creándolo si no está en el cache
+
+        Args:
+            sql: Texto de la consulta (clave del cache)
+            crear: Función que crea un cursor preparado nuevo
+
+        Returns:
+            (cursor, True si fue un acierto del cache)
+        """
+        cursor = self.__cursores.get(sql)
+        if cursor is not None:
+            self.__cursores.move_to_end(sql)
+            self.__aciertos += 1
+            return cursor, True
+
+        self.__fallos += 1
+        cursor = crear()
+        self.__cursores[sql] = cursor
+
+        if len(self.__cursores) > self.__capacidad:
+            # Cerrar el cursor libera la sentencia en el servidor
+            _, viejo = self.__cursores.popitem(last=False)
+            self.__desalojadas += 1
+            self.__cerrar(viejo)
+
+        return cursor, False
+
+    def descartar(self, sql: str) -> None:
+        """Quita una sentencia del cache (por ejemplo tras un error al ejecutarla)"""
+        cursor = self.__cursores.pop(sql, None)
+        if cursor is not None:
+            self.__cerrar(cursor)
+
+    def cerrar_todas(self) -> None:
+        """Libera todas las sentencias preparadas"""
+        while self.__cursores:
+            _, cursor = self.__cursores.popitem()
+            self.__cerrar(cursor)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Retorna contadores de uso del cache"""
+        return {
+            'sentencias': len(self.__cursores),
+            'aciertos': self.__aciertos,
+            'fallos': self.__fallos,
+            'desalojadas': self.__desalojadas,
+        }
+
+    @staticmethod
+    def __cerrar(cursor: Any) -> None:
+        """Cierra un cursor ignorando errores (la conexión puede estar caída)"""
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def __len__(self) -> int:
+        return len(self.__cursores)
+
+    def __repr__(self) -> str:
+        return f"CacheSentencias({len(self.__cursores)}/{self.__capacidad}, aciertos={self.__aciertos}, fallos={self.__fallos})"
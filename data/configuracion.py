@@ -0,0 +1,127 @@
+import os
+from typing import Optional
+
+# python-dotenv es opcional: si no está instalado se usan solo las variables del entorno
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+
+class DestinoBD:
+    """Datos de conexión a un servidor MySQL (host, puerto, credenciales y base)"""
+
+    def __init__(self, host: str, port: int, user: str, password: str, database: str):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.database = database
+
+    def clave(self) -> tuple:
+        """Identifica al destino (sin la contraseña) para indexar pools"""
+        return (self.host, self.port, self.user, self.database)
+
+    @classmethod
+    def desde_cadena(cls, connection_string: str, base: 'DestinoBD') -> 'DestinoBD':
+        """
+        Crea un destino a partir de "host:puerto/database", tomando las
+        credenciales de `base`
+        """
+        parts = connection_string.split('/')
+        host_port = parts[0].split(':')
+        return cls(
+            host_port[0],
+            int(host_port[1]) if len(host_port) > 1 else base.port,
+            base.user,
+            base.password,
+            parts[1] if len(parts) > 1 else base.database
+        )
+
+    def __eq__(self, otro) -> bool:
+        return isinstance(otro, DestinoBD) and self.clave() == otro.clave()
+
+    def __hash__(self) -> int:
+        return hash(self.clave())
+
+    def __repr__(self) -> str:
+        return f"{self.user}@{self.host}:{self.port}/{self.database}"
+
+
+class ConfiguracionBD:
+    """
+    Configuración de la base de datos leída de variables de entorno (o de un
+    archivo .env, igual que las credenciales de email de GestorNotificacion).
+
+    Variables:
+        DB_BACKEND              'mysql' (default) o 'sqlite' (sin servidor, para benchmarks)
+        DB_SQLITE_PATH          Archivo de la base SQLite, o ':memory:' (default)
+        DB_SQLITE_DATOS         1 para cargar los datos de ejemplo al crear la base SQLite
+        DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME   Servidor principal (escrituras)
+        DB_READ_HOST, DB_READ_PORT, DB_READ_USER,
+        DB_READ_PASSWORD, DB_READ_NAME                    Servidor de lectura (reportes);
+                                                          cada valor no definido se toma
+                                                          del principal
+        DB_READ_MAX_LAG_SECONDS Retraso de replicación tolerado en lecturas (default 30)
+        DB_READ_RETRY_SECONDS   Segundos sin usar la réplica tras una falla (default 30)
+        DB_POOL_SIZE            Conexiones máximas por pool (default 10)
+        DB_POOL_IDLE_SECONDS    Segundos antes de cerrar una conexión libre (default 300)
+        DB_POOL_TIMEOUT         Segundos de espera por una conexión (default 10)
+        DB_STATEMENT_CACHE      Sentencias preparadas por conexión (default 64)
+        DB_METRICS_JSONL        Archivo donde registrar cada consulta (opcional)
+    """
+
+    def __init__(self):
+        if load_dotenv is not None:
+            load_dotenv()
+
+        self.motor = os.getenv('DB_BACKEND', 'mysql').strip().lower()
+        if self.motor not in ('mysql', 'sqlite'):
+            print(f"[WARNING] DB_BACKEND={self.motor!r} no soportado, se usa 'mysql'")
+            self.motor = 'mysql'
+        self.ruta_sqlite = os.getenv('DB_SQLITE_PATH', ':memory:')
+        self.datos_sqlite = os.getenv('DB_SQLITE_DATOS', '0') == '1'
+
+        self.escritura = DestinoBD(
+            os.getenv('DB_HOST', '127.0.0.1'),
+            self._entero('DB_PORT', 3306),
+            os.getenv('DB_USER', 'root'),
+            os.getenv('DB_PASSWORD', '1234'),
+            os.getenv('DB_NAME', 'hospital_db')
+        )
+        self.lectura = DestinoBD(
+            os.getenv('DB_READ_HOST', self.escritura.host),
+            self._entero('DB_READ_PORT', self.escritura.port),
+            os.getenv('DB_READ_USER', self.escritura.user),
+            os.getenv('DB_READ_PASSWORD', self.escritura.password),
+            os.getenv('DB_READ_NAME', self.escritura.database)
+        )
+        self.retraso_max_lectura = self._entero('DB_READ_MAX_LAG_SECONDS', 30)
+        self.espera_reintento_lectura = self._entero('DB_READ_RETRY_SECONDS', 30)
+
+        self.tamano_pool = self._entero('DB_POOL_SIZE', 10)
+        self.tiempo_max_inactiva = self._entero('DB_POOL_IDLE_SECONDS', 300)
+        self.timeout_pool = self._entero('DB_POOL_TIMEOUT', 10)
+        self.capacidad_cache_sentencias = self._entero('DB_STATEMENT_CACHE', 64)
+        self.metricas_jsonl: Optional[str] = os.getenv('DB_METRICS_JSONL') or None
+
+    def hay_replica(self) -> bool:
+        """Indica si las lecturas van a un servidor distinto del principal"""
+        return self.motor == 'mysql' and self.lectura != self.escritura
+
+    @staticmethod
+    def _entero(variable: str, por_defecto: int) -> int:
+        """Lee una variable de entorno entera, usando el default si falta o es inválida"""
+        valor = os.getenv(variable)
+        if not valor:
+            return por_defecto
+        try:
+            return int(valor)
+        except ValueError:
+            print(f"[WARNING] {variable}={valor!r} no es un número, se usa {por_defecto}")
+            return por_defecto
+
+    def __repr__(self) -> str:
+        if self.motor == 'sqlite':
+            return f"ConfiguracionBD(sqlite={self.ruta_sqlite}, pool={self.tamano_pool})"
+        return f"ConfiguracionBD(escritura={self.escritura}, lectura={self.lectura}, pool={self.tamano_pool})"
@@ -1,163 +1,676 @@
-from typing import Optional
+from typing import Optional, Dict, Tuple, Iterator, Union, Sequence, List
+from contextlib import contextmanager
+import threading
+import time
+import weakref
 import mysql.connector
 from mysql.connector import Error
 from datetime import datetime
 
+from data.configuracion import ConfiguracionBD, DestinoBD
+from data.pool_conexiones import PoolConexiones
+from data.cache_sentencias import CacheSentencias
+from data.metricas_consultas import MetricasConsultas, llamador_externo
+from data.monitor_replica import MonitorReplica
+from data import backend_sqlite
+
 
 class Database:
     """Clase para manejar la conexión a la base de datos MySQL"""
     
     _instancia: Optional['Database'] = None
+    _lock_instancia = threading.Lock()
+    
+    # Pools compartidos, uno por destino (principal y, si está configurada, réplica de lectura)
+    _pools: Dict[Tuple, PoolConexiones] = {}
+    _lock_pools = threading.Lock()
+    
+    # Sentencias preparadas cacheadas por conexión (se liberan junto con la conexión)
+    _caches_sentencias: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+    _lock_sentencias = threading.Lock()
+    _aciertos_sentencias = 0
+    _fallos_sentencias = 0
+    
+    # Latencia, filas y llamador de cada consulta (ver estadisticas_consultas)
+    metricas = MetricasConsultas()
+
+    def __new__(cls):
+        """Todas las llamadas a Database() devuelven la misma instancia"""
+        if cls._instancia is None:
+            with cls._lock_instancia:
+                if cls._instancia is None:
+                    cls._instancia = super().__new__(cls)
+        return cls._instancia
     
     def __init__(self):
         """Inicializa la conexión a la BD"""
         if not hasattr(self, '_initialized'):
-            self.connection = None
-            self.host = "127.0.0.1"
-            self.port = 3306
-            self.user = "root"
-            self.password = "1234"  # ← CAMBIAR AQUÍ || si no tienes contraseña, dejar vacío: self.password = ""
-            self.database = "hospital_db"
+            # Estado de conexión propio de cada hilo (UI, scheduler, etc.)
+            self._local = threading.local()
+            
+            # Host, credenciales y pool se configuran por variables de entorno / .env
+            # (ver data/configuracion.py); por defecto root:1234@127.0.0.1:3306/hospital_db
+            self.config = ConfiguracionBD()
+            self.host = self.config.escritura.host
+            self.port = self.config.escritura.port
+            self.user = self.config.escritura.user
+            self.password = self.config.escritura.password
+            self.database = self.config.escritura.database
+            
+            if self.config.metricas_jsonl:
+                Database.metricas.configurar_jsonl(self.config.metricas_jsonl)
+            
+            # Disponibilidad y retraso del servidor de lectura (si hay réplica)
+            self.monitor_replica = MonitorReplica(
+                retraso_maximo=self.config.retraso_max_lectura,
+                espera_reintento=self.config.espera_reintento_lectura
+            )
+            
             self._initialized = True
     
     @classmethod
     def obtener_instancia(cls):
         """Obtiene la única instancia de Database"""
-        if cls._instancia is None:
-            cls._instancia = cls()
-        return cls._instancia
+        return cls()
+    
+    @property
+    def connection(self):
+        """Conexión prestada al hilo actual (None si no hay)"""
+        return getattr(self._local, 'connection', None)
+    
+    def _obtener_pool(self, destino: DestinoBD) -> PoolConexiones:
+        """Obtiene (o crea) el pool correspondiente a un destino"""
+        clave = destino.clave()
+        
+        with Database._lock_pools:
+            pool = Database._pools.get(clave)
+            if pool is None:
+                fabrica = self._fabrica_conexiones(destino)
+                pool = PoolConexiones(
+                    fabrica,
+                    tamano_maximo=self.config.tamano_pool,
+                    tiempo_max_inactiva=self.config.tiempo_max_inactiva,
+                    timeout_espera=self.config.timeout_pool
+                )
+                Database._pools[clave] = pool
+            return pool
     
-    def conectar(self, connection_string=None):
+    def _fabrica_conexiones(self, destino: DestinoBD):
+        """Función que abre una conexión nueva al destino, según el motor configurado"""
+        if self.config.motor == 'sqlite':
+            def fabrica():
+                conexion = backend_sqlite.conectar(self.config.ruta_sqlite, self.config.datos_sqlite)
+                print(f"✓ Conectado a {conexion.get_server_info()} ({self.config.ruta_sqlite})")
+                return conexion
+            return fabrica
+        
+        def fabrica():
+            # autocommit: cada SELECT ve datos frescos aunque la conexión se reutilice
+            conexion = mysql.connector.connect(
+                host=destino.host,
+                port=destino.port,
+                user=destino.user,
+                password=destino.password,
+                database=destino.database,
+                autocommit=True
+            )
+            print(f"✓ Conectado a MySQL Server versión {conexion.get_server_info()} ({destino})")
+            return conexion
+        return fabrica
+    
+    @classmethod
+    def cerrar_pools(cls):
+        """Cierra las conexiones libres de todos los pools (usar al cerrar la aplicación)"""
+        with cls._lock_pools:
+            for pool in cls._pools.values():
+                pool.cerrar_todas()
+    
+    def conectar(self, connection_string=None, solo_lectura: bool = False):
         """
-        Conecta a la base de datos
+        Toma prestada una conexión del pool compartido para el hilo actual.
+        Las llamadas anidadas en el mismo hilo reutilizan la misma conexión,
+        que vuelve al pool con el último desconectar().
         
         Args:
-            connection_string: Formato "host:puerto/database" (opcional)
+            connection_string: Formato "host:puerto/database" (opcional, para
+                               apuntar a un servidor distinto del configurado)
+            solo_lectura: Si es True usa el servidor de lectura configurado
+                          (DB_READ_*); pensado para reportes y listados.
+                          Si la réplica está caída o atrasada se usa el principal
         """
         try:
-            if connection_string:
-                # Parsear connection_string
-                parts = connection_string.split('/')
-                host_port = parts[0].split(':')
-                self.host = host_port[0]
-                self.port = int(host_port[1]) if len(host_port) > 1 else 3306
-                self.database = parts[1] if len(parts) > 1 else "hospital_db"
-            
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                port=self.port,
-                user=self.user,
-                password=self.password,
-                database=self.database
-            )
+            local = self._local
             
-            if self.connection.is_connected():
-                db_info = self.connection.get_server_info()
-                print(f"✓ Conectado a MySQL Server versión {db_info}")
+            # Si el hilo ya tiene una conexión prestada se reutiliza
+            # (así una lectura dentro de una escritura ve los datos recién escritos)
+            if self.connection is not None:
+                local.profundidad += 1
                 return True
             
-        except Error as e:
+            if connection_string:
+                destino = DestinoBD.desde_cadena(connection_string, self.config.escritura)
+            else:
+                if solo_lectura and self.config.hay_replica() and self._prestar_de_replica():
+                    return True
+                destino = self.config.escritura
+            
+            local.pool = self._obtener_pool(destino)
+            local.connection = local.pool.obtener()
+            local.profundidad = 1
+            return True
+            
+        except (Error, TimeoutError) as e:
             print(f"✗ Error al conectar a la base de datos: {e}")
             return False
     
+    def _prestar_de_replica(self) -> bool:
+        """
+        Intenta tomar una conexión del servidor de lectura para el hilo actual.
+        Si la réplica no responde o está más atrasada que DB_READ_MAX_LAG_SECONDS
+        retorna False, y conectar() usa el principal.
+        """
+        if not self.monitor_replica.disponible():
+            return False
+        
+        pool = self._obtener_pool(self.config.lectura)
+        try:
+            conexion = pool.obtener()
+        except (Error, TimeoutError) as e:
+            self.monitor_replica.marcar_caida(f"({e})")
+            return False
+        
+        if self.monitor_replica.necesita_verificar():
+            try:
+                retraso = self._medir_retraso_replica(conexion)
+            except Error as e:
+                pool.devolver(conexion, descartar=True)
+                self.monitor_replica.marcar_caida(f"({e})")
+                return False
+            if not self.monitor_replica.registrar_retraso(retraso):
+                pool.devolver(conexion)
+                return False
+        
+        local = self._local
+        local.pool = pool
+        local.connection = conexion
+        local.profundidad = 1
+        return True
+    
+    @staticmethod
+    def _medir_retraso_replica(conexion) -> Optional[float]:
+        """
+        Segundos de retraso de la réplica respecto del principal.
+        Retorna None si la replicación está detenida, y 0 si el servidor
+        no es una réplica (por ejemplo una segunda instancia de prueba).
+        """
+        cursor = conexion.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except Error:
+                # MySQL anterior a 8.0.22
+                cursor.execute("SHOW SLAVE STATUS")
+            estado = cursor.fetchone()
+        finally:
+            cursor.close()
+        
+        if not estado:
+            return 0.0
+        retraso = estado.get('Seconds_Behind_Source', estado.get('Seconds_Behind_Master'))
+        return float(retraso) if retraso is not None else None
+    
     def desconectar(self):
-        """Desconecta de la base de datos"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            print("✓ Desconexión exitosa")
+        """Devuelve la conexión al pool (no la cierra físicamente)"""
+        local = self._local
+        if self.connection is None:
+            return
+        
+        local.profundidad -= 1
+        if local.profundidad > 0:
+            return
+        
+        conexion = local.connection
+        local.connection = None
+        local.pool.devolver(conexion)
+    
+    @contextmanager
+    def session(self, solo_lectura: bool = False):
+        """
+        Conexión prestada durante un bloque `with`, que se devuelve siempre al salir
+        
+        Uso:
+            with db.session() as s:
+                s.obtener_registro(...)
+        
+        Args:
+            solo_lectura: Si es True usa el servidor de lectura (ver conectar)
+        
+        Raises:
+            ConnectionError: Si no se pudo obtener una conexión
+        """
+        if not self.conectar(solo_lectura=solo_lectura):
+            raise ConnectionError("No se pudo conectar a la base de datos")
+        try:
+            yield self
+        finally:
+            self.desconectar()
+    
+    @contextmanager
+    def transaccion(self):
+        """
+        Agrupa varias escrituras en una unidad atómica con un único commit al final.
+        Si el bloque termina con una excepción se revierte todo lo hecho en él.
+        
+        Los bloques anidados usan SAVEPOINT: un error en un bloque interno revierte
+        solo ese bloque, y el commit real lo hace el bloque más externo.
+        
+        Dentro de una transacción, ejecutar_consulta y ejecutar_lote propagan los
+        errores de la BD en lugar de devolver None, para que el bloque se revierta.
+        
+        Uso:
+            with db.transaccion():
+                db.ejecutar_consulta(...)
+                db.ejecutar_consulta(...)
+        
+        Raises:
+            ConnectionError: Si no se pudo obtener una conexión
+        """
+        if not self.conectar():
+            raise ConnectionError("No se pudo conectar a la base de datos")
+        
+        local = self._local
+        nivel = getattr(local, 'nivel_transaccion', 0)
+        savepoint = f"sp_nivel_{nivel}"
+        
+        try:
+            if nivel == 0:
+                self.connection.start_transaction()
+            else:
+                self._ejecutar_sin_commit(f"SAVEPOINT {savepoint}")
+            local.nivel_transaccion = nivel + 1
+            
+            try:
+                yield self
+            except BaseException:
+                if nivel == 0:
+                    self.connection.rollback()
+                else:
+                    self._ejecutar_sin_commit(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                raise
+            else:
+                if nivel == 0:
+                    self.connection.commit()
+                else:
+                    self._ejecutar_sin_commit(f"RELEASE SAVEPOINT {savepoint}")
+            finally:
+                local.nivel_transaccion = nivel
+        
+        finally:
+            self.desconectar()
+    
+    def en_transaccion(self) -> bool:
+        """Indica si el hilo actual está dentro de un bloque transaccion()"""
+        return getattr(self._local, 'nivel_transaccion', 0) > 0
+    
+    def _ejecutar_sin_commit(self, query):
+        """Ejecuta una sentencia de control (SAVEPOINT, etc.) en la conexión actual"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query)
+        finally:
+            cursor.close()
     
-    def ejecutar_consulta(self, query, params=None):
+    def ejecutar_consulta(self, query, params=None, preparada: bool = False):
         """
-        Ejecuta una consulta SQL (INSERT, UPDATE, DELETE)
+        Ejecuta una consulta SQL (INSERT, UPDATE, DELETE).
+        Fuera de una transacción hace commit inmediatamente; dentro de
+        transaccion() el commit lo hace el bloque al terminar.
         
         Args:
             query: Consulta SQL
             params: Parámetros para la consulta (tupla)
+            preparada: Si es True usa una sentencia preparada del cache de la conexión
         
         Returns:
             Número de filas afectadas o None si hay error
         """
+        inicio = time.perf_counter()
+        affected_rows = None
         try:
-            cursor = self.connection.cursor()
-            
-            if params:
-                cursor.execute(query, params)
+            if preparada:
+                cursor = self._ejecutar_preparada(query, params)
             else:
-                cursor.execute(query)
+                cursor = self.connection.cursor()
+                
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
             
-            self.connection.commit()
+            if not self.en_transaccion():
+                self.connection.commit()
             
-            # Guardar el ID del último registro insertado
-            self.last_insert_id = cursor.lastrowid
+            # Guardar el ID del último registro insertado (por hilo)
+            self._local.last_insert_id = cursor.lastrowid
             
             affected_rows = cursor.rowcount
-            cursor.close()
+            if not preparada:
+                cursor.close()
             
             return affected_rows
         
         except Error as e:
             print(f"✗ Error en consulta: {e}")
+            if self.en_transaccion():
+                raise
+            return None
+        
+        finally:
+            self._registrar_metrica(query, inicio, affected_rows, affected_rows is None)
+    
+    def ejecutar_lote(self, query, seq_params: Sequence, chunk_size: int = 500) -> Optional[Dict[str, List[int]]]:
+        """
+        Ejecuta la misma consulta (INSERT, UPDATE, DELETE) para muchos juegos de
+        parámetros en una única transacción, con un solo commit al final.
+        Los INSERT ... VALUES se envían como INSERT de múltiples filas por lote.
+        Dentro de transaccion() se suma a la transacción en curso.
+        
+        Args:
+            query: Consulta SQL con marcadores %s
+            seq_params: Secuencia de tuplas de parámetros
+            chunk_size: Cantidad de filas enviadas al servidor por lote
+        
+        Returns:
+            Diccionario con:
+              - 'filas_por_lote': filas afectadas por cada lote
+              - 'ids': IDs autoincrementales generados (solo si todas las filas
+                       de un INSERT fueron insertadas; vacío en otro caso)
+            o None si hay error (en ese caso no se aplica ningún cambio)
+        """
+        resultado = {'filas_por_lote': [], 'ids': []}
+        seq_params = list(seq_params)
+        if not seq_params:
+            return resultado
+        
+        es_insert = query.lstrip().upper().startswith("INSERT")
+        propia = not self.en_transaccion()
+        cursor = None
+        inicio = time.perf_counter()
+        exito = False
+        
+        try:
+            cursor = self.connection.cursor()
+            if propia:
+                self.connection.start_transaction()
+            
+            for desde in range(0, len(seq_params), chunk_size):
+                lote = seq_params[desde:desde + chunk_size]
+                cursor.executemany(query, lote)
+                
+                filas = cursor.rowcount
+                resultado['filas_por_lote'].append(filas)
+                
+                # En un INSERT de múltiples filas el servidor informa el ID de la
+                # primera fila; las siguientes son consecutivas
+                if es_insert and cursor.lastrowid and filas == len(lote):
+                    resultado['ids'].extend(range(cursor.lastrowid, cursor.lastrowid + filas))
+            
+            if propia:
+                self.connection.commit()
+            
+            if resultado['ids']:
+                self._local.last_insert_id = resultado['ids'][-1]
+            
+            exito = True
+            return resultado
+        
+        except Error as e:
+            print(f"✗ Error en lote: {e}")
+            if not propia:
+                raise
+            try:
+                self.connection.rollback()
+            except Error:
+                pass
             return None
+        
+        finally:
+            if cursor is not None:
+                cursor.close()
+            self._registrar_metrica(query, inicio, sum(resultado['filas_por_lote']), not exito)
     
     def get_last_insert_id(self):
         """Retorna el ID del último registro insertado"""
-        return getattr(self, 'last_insert_id', 0)
+        return getattr(self._local, 'last_insert_id', 0)
     
-    def obtener_registro(self, query, params=None):
+    def obtener_registro(self, query, params=None, preparada: bool = False):
         """
         Obtiene un registro de la base de datos
         
         Args:
             query: Consulta SELECT
             params: Parámetros para la consulta
+            preparada: Si es True usa una sentencia preparada del cache de la conexión
         
         Returns:
             Un diccionario con el registro o None
         """
+        inicio = time.perf_counter()
+        exito = False
+        resultado = None
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            
-            if params:
-                cursor.execute(query, params)
+            if preparada:
+                cursor = self._ejecutar_preparada(query, params)
+                filas = self._filas_como_dict(cursor, cursor.fetchall())
+                resultado = filas[0] if filas else None
             else:
-                cursor.execute(query)
-            
-            resultado = cursor.fetchone()
-            cursor.close()
+                cursor = self.connection.cursor(dictionary=True)
+                
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                resultado = cursor.fetchone()
+                cursor.close()
             
+            exito = True
             return resultado
         
         except Error as e:
             print(f"✗ Error en consulta: {e}")
             return None
+        
+        finally:
+            self._registrar_metrica(query, inicio, 1 if resultado else 0, not exito)
     
-    def obtener_registros(self, query, params=None):
+    def obtener_registros(self, query, params=None, preparada: bool = False):
         """
         Obtiene múltiples registros de la base de datos
         
         Args:
             query: Consulta SELECT
             params: Parámetros para la consulta
+            preparada: Si es True usa una sentencia preparada del cache de la conexión
         
         Returns:
             Lista de diccionarios con los registros
         """
+        inicio = time.perf_counter()
+        resultados = None
         try:
-            cursor = self.connection.cursor(dictionary=True)
+            if preparada:
+                cursor = self._ejecutar_preparada(query, params)
+                resultados = self._filas_como_dict(cursor, cursor.fetchall())
+            else:
+                cursor = self.connection.cursor(dictionary=True)
+                
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                resultados = cursor.fetchall()
+                cursor.close()
+            
+            return resultados
+        
+        except Error as e:
+            print(f"✗ Error en consulta: {e}")
+            return None
+        
+        finally:
+            self._registrar_metrica(
+                query, inicio, len(resultados) if resultados is not None else None, resultados is None
+            )
+    
+    # ========== SENTENCIAS PREPARADAS ==========
+    def _ejecutar_preparada(self, query, params=None):
+        """
+        Ejecuta `query` con la sentencia preparada cacheada para la conexión del
+        hilo actual (preparándola la primera vez). El cursor pertenece al cache:
+        no debe cerrarse.
+        
+        Returns:
+            El cursor preparado ya ejecutado
+        """
+        conexion = self.connection
+        
+        with Database._lock_sentencias:
+            cache = Database._caches_sentencias.get(conexion)
+            if cache is None:
+                cache = CacheSentencias(self.config.capacidad_cache_sentencias)
+                Database._caches_sentencias[conexion] = cache
+        
+        cursor, acierto = cache.obtener(query, lambda: conexion.cursor(prepared=True))
+        
+        with Database._lock_sentencias:
+            if acierto:
+                Database._aciertos_sentencias += 1
+            else:
+                Database._fallos_sentencias += 1
+        
+        try:
+            cursor.execute(query, tuple(params) if params else ())
+        except Error:
+            # No reutilizar una sentencia que falló
+            cache.descartar(query)
+            raise
+        
+        return cursor
+    
+    @staticmethod
+    def _filas_como_dict(cursor, filas) -> List[Dict]:
+        """Convierte las tuplas de un cursor preparado en diccionarios"""
+        columnas = cursor.column_names
+        return [dict(zip(columnas, fila)) for fila in filas]
+    
+    @classmethod
+    def estadisticas_sentencias(cls) -> Dict[str, int]:
+        """
+        Retorna los contadores del cache de sentencias preparadas
+        
+        Returns:
+            Diccionario con 'aciertos', 'fallos' y 'sentencias' (preparadas vivas)
+        """
+        with cls._lock_sentencias:
+            return {
+                'aciertos': cls._aciertos_sentencias,
+                'fallos': cls._fallos_sentencias,
+                'sentencias': sum(len(c) for c in cls._caches_sentencias.values()),
+            }
+    
+    def iterar_registros(self, query, params=None, batch_size: int = 1000,
+                         como_tupla: bool = False, solo_lectura: bool = False) -> Iterator[Union[Dict, Tuple]]:
+        """
+        Recorre los registros de un SELECT de a lotes, sin cargarlos todos en memoria.
+        Usa un cursor sin buffer: las filas se leen del servidor a medida que se consumen.
+        
+        La conexión queda reservada mientras dure la iteración; no ejecutar otras
+        consultas en el mismo hilo hasta terminar de recorrer (o cerrar) el generador.
+        
+        Args:
+            query: Consulta SELECT
+            params: Parámetros para la consulta
+            batch_size: Cantidad de filas a traer del servidor por vez
+            como_tupla: Si es True devuelve tuplas en lugar de diccionarios
+            solo_lectura: Si el hilo no tiene conexión, tomarla del servidor de lectura
+        
+        Yields:
+            Cada registro como diccionario (o tupla)
+        """
+        if not self.conectar(solo_lectura=solo_lectura):
+            return
+        
+        cursor = None
+        completo = False
+        exito = False
+        leidas = 0
+        inicio = time.perf_counter()
+        try:
+            cursor = self.connection.cursor(dictionary=not como_tupla, buffered=False)
             
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
             
-            resultados = cursor.fetchall()
-            cursor.close()
-            
-            return resultados
+            while True:
+                lote = cursor.fetchmany(batch_size)
+                if not lote:
+                    break
+                leidas += len(lote)
+                yield from lote
+            completo = True
+            exito = True
         
         except Error as e:
             print(f"✗ Error en consulta: {e}")
-            return None
+        
+        except GeneratorExit:
+            # El consumidor dejó de iterar antes del final: no es un error
+            exito = True
+            raise
+        
+        finally:
+            if cursor is not None:
+                try:
+                    if not completo:
+                        # Descartar las filas no leídas para poder reutilizar la conexión
+                        self.connection.consume_results()
+                    cursor.close()
+                except Error:
+                    pass
+            self.desconectar()
+            # La duración incluye el tiempo que el consumidor tardó en recorrer las filas
+            self._registrar_metrica(query, inicio, leidas, not exito)
+    
+    # ========== MÉTRICAS ==========
+    def _registrar_metrica(self, query, inicio: float, filas: Optional[int], error: bool = False):
+        """Registra la duración (desde `inicio`) de una consulta en las métricas"""
+        Database.metricas.registrar(
+            query, time.perf_counter() - inicio, filas, llamador_externo(), error
+        )
+    
+    @classmethod
+    def estadisticas_consultas(cls) -> Dict[str, List[Dict]]:
+        """
+        Retorna las métricas de consultas acumuladas en el proceso
+        
+        Returns:
+            Diccionario con:
+              - 'por_huella': cantidad, errores, tiempo total y p50/p95/p99 por consulta normalizada
+              - 'mas_lentas': las ejecuciones individuales más lentas (con su llamador)
+        """
+        return {
+            'por_huella': cls.metricas.por_huella(),
+            'mas_lentas': cls.metricas.mas_lentas(),
+        }
+    
+    @classmethod
+    def configurar_metricas_jsonl(cls, ruta: Optional[str]):
+        """Escribe cada consulta medida como una línea JSON en `ruta` (None para desactivar)"""
+        cls.metricas.configurar_jsonl(ruta)
     
     def __str__(self):
         if self.connection and self.connection.is_connected():
@@ -1,38 +1,270 @@
 # -*- coding: utf-8 -*-
 """
 Script para generar turnos automáticamente basados en las agendas
-Crea turnos de 30 minutos para cada rango horario de agenda
+Crea turnos (de 30 minutos por defecto) para cada rango horario de agenda
 Estado inicial: 'Libre', id_especialidad: NULL
+
+Uso: python generar_turnos.py [dias_adelante] [minutos_por_turno]
+
+Si NumPy está instalado los turnos se calculan vectorizados (expandir_slots),
+lo que hace viable generar horizontes de varios años en menos de un segundo.
+
+Es idempotente: para cada agenda solo genera las fechas que todavía no tienen
+turnos, y los inserta con INSERT IGNORE (la clave unique_slot_libre evita
+duplicar un turno libre si dos generaciones se superponen).
 """
 
 import sys
 import os
+import time as reloj
+import unicodedata
 from datetime import datetime, timedelta, date, time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 # Agregar el directorio padre al path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# NumPy es opcional: sin él se usa el cálculo fila por fila (calcular_slots)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from data.database import Database
+from agenda import DURACION_TURNO_MINUTOS
+
+# Día de la semana (sin tildes, en minúsculas) -> date.weekday()
+DIAS_SEMANA = {
+    "lunes": 0,
+    "martes": 1,
+    "miercoles": 2,
+    "jueves": 3,
+    "viernes": 4,
+    "sabado": 5,
+    "domingo": 6
+}
+
+QUERY_INSERT_TURNOS = """INSERT IGNORE INTO Turno (matricula, id_consultorio, id_agenda, id_especialidad, fecha, hora_inicio, hora_fin, estado)
+VALUES (%s, %s, %s, NULL, %s, %s, %s, 'Libre')"""
+
+
+def numero_dia_semana(nombre: str) -> Optional[int]:
+    """Convierte 'Miércoles' / 'miercoles' / 'MIÉRCOLES' al número de date.weekday()"""
+    sin_tildes = unicodedata.normalize("NFKD", nombre or "").encode("ascii", "ignore").decode()
+    return DIAS_SEMANA.get(sin_tildes.strip().lower())
+
 
+def a_minutos(valor) -> int:
+    """Convierte una hora de la BD (timedelta, time o 'HH:MM:SS') a minutos desde las 00:00"""
+    if isinstance(valor, timedelta):
+        return int(valor.total_seconds()) // 60
+    if isinstance(valor, str):
+        valor = datetime.strptime(valor, "%H:%M:%S").time()
+    return valor.hour * 60 + valor.minute
 
-def generar_turnos_desde_agendas(fecha_inicio: date = None, dias_adelante: int = 30):
+
+def fechas_del_dia(numero_dia: int, desde: date, hasta: date) -> Iterator[date]:
+    """
+    Fechas en [desde, hasta) que caen en el día de semana indicado,
+    calculando la primera directamente y avanzando de a una semana
+    """
+    fecha = desde + timedelta(days=(numero_dia - desde.weekday()) % 7)
+    while fecha < hasta:
+        yield fecha
+        fecha += timedelta(days=7)
+
+
+def calcular_slots(agendas: Iterable[Dict], fecha_desde: date, fecha_hasta: date,
+                   fechas_existentes: Set[Tuple[int, date]] = frozenset(),
+                   duracion_minutos: int = DURACION_TURNO_MINUTOS) -> List[tuple]:
     """
-    Genera turnos de 30 minutos basados en las agendas registradas
-    
+    Calcula en memoria los turnos de cada agenda entre dos fechas
+
+    Args:
+        agendas: Filas de Agenda (id_agenda, matricula, id_consultorio, dia_semana, hora_inicio, hora_fin)
+        fecha_desde: Primera fecha (inclusive)
+        fecha_hasta: Última fecha (exclusive)
+        fechas_existentes: (id_agenda, fecha) que ya tienen turnos y se saltean
+        duracion_minutos: Duración de cada turno
+
+    Returns:
+        Lista de (matricula, id_consultorio, id_agenda, fecha, hora_inicio, hora_fin)
+    """
+    slots = []
+    for agenda in agendas:
+        numero_dia = numero_dia_semana(agenda['dia_semana'])
+        if numero_dia is None:
+            print(f"[ERROR] Día de semana inválido en agenda #{agenda['id_agenda']}: {agenda['dia_semana']}")
+            continue
+
+        # Horarios del día: se calculan una sola vez por agenda
+        inicio = a_minutos(agenda['hora_inicio'])
+        fin = a_minutos(agenda['hora_fin'])
+        horarios = [
+            (time(m // 60, m % 60), time((m + duracion_minutos) // 60, (m + duracion_minutos) % 60))
+            for m in range(inicio, fin - duracion_minutos + 1, duracion_minutos)
+        ]
+
+        id_agenda = agenda['id_agenda']
+        for fecha in fechas_del_dia(numero_dia, fecha_desde, fecha_hasta):
+            if (id_agenda, fecha) in fechas_existentes:
+                continue
+            for hora_inicio, hora_fin in horarios:
+                slots.append((agenda['matricula'], agenda['id_consultorio'], id_agenda,
+                              fecha, hora_inicio, hora_fin))
+    return slots
+
+
+def expandir_slots(agendas: Iterable[Dict], fecha_desde: date, fecha_hasta: date,
+                   fechas_existentes: Set[Tuple[int, date]] = frozenset(),
+                   duracion_minutos: int = DURACION_TURNO_MINUTOS) -> Dict[str, 'np.ndarray']:
+    """
+    Versión vectorizada de calcular_slots (requiere NumPy)
+
+    Para cada agenda se calcula la cantidad de fechas y de horarios; luego todas
+    las combinaciones se expanden juntas con np.repeat y aritmética de datetime64,
+    sin crear objetos fecha/hora uno por uno.
+
+    Returns:
+        Diccionario de arrays paralelos: matricula, id_consultorio, id_agenda,
+        fecha (datetime64[D]), hora_inicio y hora_fin (timedelta64[m])
+    """
+    if np is None:
+        raise ImportError("expandir_slots requiere NumPy")
+
+    validas = []
+    for agenda in agendas:
+        numero_dia = numero_dia_semana(agenda['dia_semana'])
+        if numero_dia is None:
+            print(f"[ERROR] Día de semana inválido en agenda #{agenda['id_agenda']}: {agenda['dia_semana']}")
+            continue
+        validas.append((agenda['id_agenda'], agenda['matricula'], agenda['id_consultorio'], numero_dia,
+                        a_minutos(agenda['hora_inicio']), a_minutos(agenda['hora_fin'])))
+
+    columnas = np.array(validas, dtype=np.int64).reshape(-1, 6)
+    id_agenda, matricula, id_consultorio, numero_dia, inicio, fin = columnas.T
+
+    # Primera fecha de cada agenda dentro del rango (datetime64: 1970-01-01 fue jueves)
+    desde = np.datetime64(fecha_desde, 'D')
+    hasta = np.datetime64(fecha_hasta, 'D')
+    dia_desde = (desde.astype(np.int64) + 3) % 7
+    primera = desde + ((numero_dia - dia_desde) % 7).astype('timedelta64[D]')
+
+    cantidad_fechas = np.maximum(0, (hasta - primera).astype(np.int64) + 6) // 7
+    cantidad_horarios = np.maximum(0, (fin - inicio) // duracion_minutos)
+    por_agenda = cantidad_fechas * cantidad_horarios
+
+    # Índice de agenda de cada turno y su posición dentro de esa agenda
+    agenda_de = np.repeat(np.arange(len(columnas)), por_agenda)
+    comienzo = np.concatenate(([0], np.cumsum(por_agenda)[:-1]))
+    posicion = np.arange(por_agenda.sum()) - comienzo[agenda_de]
+    horarios = cantidad_horarios[agenda_de]
+
+    fecha = primera[agenda_de] + (posicion // horarios * 7).astype('timedelta64[D]')
+    hora_inicio = (inicio[agenda_de] + posicion % horarios * duracion_minutos).astype('timedelta64[m]')
+
+    slots = {
+        'matricula': matricula[agenda_de],
+        'id_consultorio': id_consultorio[agenda_de],
+        'id_agenda': id_agenda[agenda_de],
+        'fecha': fecha,
+        'hora_inicio': hora_inicio,
+        'hora_fin': hora_inicio + np.timedelta64(duracion_minutos, 'm'),
+    }
+
+    if fechas_existentes:
+        # (id_agenda, fecha) codificado como un entero para usar np.isin
+        existentes = np.array(
+            [(a << 32) + np.datetime64(f, 'D').astype(np.int64) for a, f in fechas_existentes], dtype=np.int64)
+        claves = (slots['id_agenda'] << 32) + fecha.astype(np.int64)
+        mantener = ~np.isin(claves, existentes)
+        slots = {nombre: valores[mantener] for nombre, valores in slots.items()}
+
+    return slots
+
+
+def _slots_como_filas(slots: Dict[str, 'np.ndarray']) -> List[tuple]:
+    """Convierte el resultado de expandir_slots en tuplas para INSERT (date y timedelta)"""
+    return list(zip(
+        slots['matricula'].tolist(),
+        slots['id_consultorio'].tolist(),
+        slots['id_agenda'].tolist(),
+        slots['fecha'].tolist(),
+        slots['hora_inicio'].astype('timedelta64[s]').tolist(),
+        slots['hora_fin'].astype('timedelta64[s]').tolist(),
+    ))
+
+
+def _fechas_generadas(db: Database, desde: date, hasta: date,
+                      ids_agenda: Optional[List[int]] = None) -> Set[Tuple[int, date]]:
+    """(id_agenda, fecha) que ya tienen turnos en el rango"""
+    query = """
+    SELECT id_agenda, fecha
+    FROM Turno
+    WHERE fecha >= %s AND fecha < %s
+    """
+    params = [desde, hasta]
+    if ids_agenda:
+        query += f" AND id_agenda IN ({', '.join(['%s'] * len(ids_agenda))})"
+        params.extend(ids_agenda)
+    query += " GROUP BY id_agenda, fecha"
+
+    filas = db.obtener_registros(query, tuple(params)) or []
+    return {(fila['id_agenda'], fila['fecha']) for fila in filas}
+
+
+def _horarios_existentes(db: Database, desde: date, hasta: date,
+                         ids_agenda: Optional[List[int]] = None) -> Set[Tuple[int, date, int]]:
+    """(id_agenda, fecha, minuto de inicio) de los turnos que ya existen en el rango"""
+    query = """
+    SELECT id_agenda, fecha, hora_inicio
+    FROM Turno
+    WHERE fecha >= %s AND fecha < %s
+    """
+    params = [desde, hasta]
+    if ids_agenda:
+        query += f" AND id_agenda IN ({', '.join(['%s'] * len(ids_agenda))})"
+        params.extend(ids_agenda)
+
+    filas = db.obtener_registros(query, tuple(params)) or []
+    return {(fila['id_agenda'], fila['fecha'], a_minutos(fila['hora_inicio'])) for fila in filas}
+
+
+def generar_turnos_desde_agendas(fecha_inicio: date = None, dias_adelante: int = 30,
+                                 ids_agenda: Optional[List[int]] = None,
+                                 chunk_size: int = 1000,
+                                 duracion_minutos: int = DURACION_TURNO_MINUTOS,
+                                 completar_fechas: bool = False) -> Optional[Dict]:
+    """
+    Genera turnos (de 30 minutos por defecto) basados en las agendas registradas
+
     Args:
         fecha_inicio: Fecha desde la cual generar turnos (por defecto hoy)
         dias_adelante: Cantidad de días a generar turnos (por defecto 30)
+        ids_agenda: Limitar la generación a estas agendas (por defecto todas las activas)
+        chunk_size: Filas por INSERT múltiple
+        duracion_minutos: Duración de cada turno
+        completar_fechas: Si es True también completa las fechas que ya tienen
+                          turnos, agregando solo los horarios que faltan (por
+                          ejemplo después de modificar el horario de una agenda)
+
+    Returns:
+        Resumen con 'agendas', 'calculados', 'insertados', 'omitidos',
+        'segundos' y 'turnos_por_segundo', o None si hubo un error
     """
-    
+
     if fecha_inicio is None:
         fecha_inicio = date.today()
-    
+    fecha_fin = fecha_inicio + timedelta(days=dias_adelante)
+
     db = Database()
-    
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
-        return False
-    
+        return None
+
+    inicio = reloj.perf_counter()
+
     try:
         # Cargar todas las agendas activas
         query_agendas = """
@@ -40,140 +272,75 @@ def generar_turnos_desde_agendas(fecha_inicio: date = None, dias_adelante: int =
                a.hora_inicio, a.hora_fin
         FROM Agenda a
         WHERE a.activa = TRUE
-        ORDER BY a.matricula, a.dia_semana
         """
-        
-        agendas = db.obtener_registros(query_agendas)
-        
+        params = ()
+        if ids_agenda:
+            query_agendas += f" AND a.id_agenda IN ({', '.join(['%s'] * len(ids_agenda))})"
+            params = tuple(ids_agenda)
+
+        agendas = db.obtener_registros(query_agendas, params) if params else db.obtener_registros(query_agendas)
+
         if not agendas:
             print("[ERROR] No hay agendas registradas en la base de datos")
             db.desconectar()
-            return False
-        
+            return None
+
         print(f"\n{'='*80}")
-        print(f"GENERANDO TURNOS DESDE {fecha_inicio} POR {dias_adelante} DÍAS")
+        print(f"GENERANDO TURNOS DESDE {fecha_inicio} POR {dias_adelante} DÍAS ({len(agendas)} agenda(s))")
         print(f"{'='*80}\n")
-        
-        # Mapeo de días de semana
-        dias_semana = {
-            0: "Lunes",
-            1: "Martes",
-            2: "Miércoles",
-            3: "Jueves",
-            4: "Viernes",
-            5: "Sábado",
-            6: "Domingo"
+
+        # Solo las fechas que cada agenda todavía no tiene generadas
+        existentes = set() if completar_fechas else _fechas_generadas(db, fecha_inicio, fecha_fin, ids_agenda)
+        if np is not None:
+            slots = _slots_como_filas(
+                expandir_slots(agendas, fecha_inicio, fecha_fin, existentes, duracion_minutos))
+        else:
+            slots = calcular_slots(agendas, fecha_inicio, fecha_fin, existentes, duracion_minutos)
+
+        if completar_fechas:
+            ocupados = _horarios_existentes(db, fecha_inicio, fecha_fin, ids_agenda)
+            slots = [s for s in slots if (s[2], s[3], a_minutos(s[4])) not in ocupados]
+
+        insertados = 0
+        if slots:
+            resultado = db.ejecutar_lote(QUERY_INSERT_TURNOS, slots, chunk_size=chunk_size)
+            if resultado is None:
+                print(f"✗ ERROR: no se pudieron insertar los {len(slots)} turnos calculados")
+                db.desconectar()
+                return None
+            insertados = sum(resultado['filas_por_lote'])
+
+        segundos = reloj.perf_counter() - inicio
+        resumen = {
+            'agendas': len(agendas),
+            'calculados': len(slots),
+            'insertados': insertados,
+            'omitidos': len(slots) - insertados,
+            'segundos': round(segundos, 3),
+            'turnos_por_segundo': round(insertados / segundos) if segundos > 0 else 0,
         }
-        
-        dias_semana_inverso = {v: k for k, v in dias_semana.items()}
-        
-        total_turnos_creados = 0
-        total_errores = 0
-        
-        # Iterar sobre cada agenda
-        for agenda in agendas:
-            id_agenda = agenda['id_agenda']
-            matricula = agenda['matricula']
-            id_consultorio = agenda['id_consultorio']
-            dia_agenda = agenda['dia_semana']
-            hora_inicio_agenda = agenda['hora_inicio']
-            hora_fin_agenda = agenda['hora_fin']
-            
-            # Convertir timedelta o string a time
-            if isinstance(hora_inicio_agenda, timedelta):
-                total_seconds = int(hora_inicio_agenda.total_seconds())
-                hora_inicio_agenda = time(total_seconds // 3600, (total_seconds % 3600) // 60)
-            elif isinstance(hora_inicio_agenda, str):
-                hora_inicio_agenda = datetime.strptime(hora_inicio_agenda, "%H:%M:%S").time()
-            
-            if isinstance(hora_fin_agenda, timedelta):
-                total_seconds = int(hora_fin_agenda.total_seconds())
-                hora_fin_agenda = time(total_seconds // 3600, (total_seconds % 3600) // 60)
-            elif isinstance(hora_fin_agenda, str):
-                hora_fin_agenda = datetime.strptime(hora_fin_agenda, "%H:%M:%S").time()
-            
-            numero_dia_semana = dias_semana_inverso.get(dia_agenda)
-            
-            if numero_dia_semana is None:
-                print(f"[ERROR] Día de semana inválido: {dia_agenda}")
-                total_errores += 1
-                continue
-            
-            print(f"\n{'─'*80}")
-            print(f"Agenda #{id_agenda} - Médico: {matricula} | Consultorio: {id_consultorio}")
-            print(f"Día: {dia_agenda} | Horario: {hora_inicio_agenda} - {hora_fin_agenda}")
-            print(f"{'─'*80}\n")
-            
-            # Iterar sobre los días del rango
-            fecha_actual = fecha_inicio
-            fecha_fin = fecha_inicio + timedelta(days=dias_adelante)
-            
-            while fecha_actual < fecha_fin:
-                # Verificar si es el día de semana correcto
-                if fecha_actual.weekday() == numero_dia_semana:
-                    
-                    # Generar turnos cada 30 minutos dentro del horario
-                    hora_actual = datetime.combine(fecha_actual, hora_inicio_agenda)
-                    hora_fin_dt = datetime.combine(fecha_actual, hora_fin_agenda)
-                    
-                    while hora_actual < hora_fin_dt:
-                        hora_inicio_turno = hora_actual.time()
-                        hora_fin_turno_dt = hora_actual + timedelta(minutes=30)
-                        hora_fin_turno = hora_fin_turno_dt.time()
-                        
-                        # Verificar que hora_fin_turno no exceda hora_fin_agenda
-                        if hora_fin_turno > hora_fin_agenda:
-                            break
-                        
-                        # Construir la query INSERT con id_especialidad NULL
-                        query_insert = f"""INSERT INTO Turno (id_paciente, matricula, id_consultorio, id_agenda, id_especialidad, fecha, hora_inicio, hora_fin, estado, observaciones)
-VALUES (NULL, {matricula}, {id_consultorio}, {id_agenda}, NULL, '{fecha_actual}', '{hora_inicio_turno}', '{hora_fin_turno}', 'Libre', NULL);"""
-                        
-                        # Ejecutar la query con id_especialidad NULL
-                        try:
-                            resultado = db.ejecutar_consulta(
-                                """INSERT INTO Turno (matricula, id_consultorio, id_agenda, id_especialidad, fecha, hora_inicio, hora_fin, estado)
-                                VALUES (%s, %s, %s, NULL, %s, %s, %s, 'Libre')""",
-                                (matricula, id_consultorio, id_agenda, fecha_actual, hora_inicio_turno, hora_fin_turno)
-                            )
-                            
-                            if resultado is not None and resultado > 0:
-                                print(f"✓ {query_insert}")
-                                total_turnos_creados += 1
-                            else:
-                                print(f"✗ ERROR: {query_insert}")
-                                total_errores += 1
-                        
-                        except Exception as e:
-                            print(f"✗ ERROR: {query_insert}")
-                            print(f"  Detalle: {str(e)}")
-                            total_errores += 1
-                        
-                        # Avanzar 30 minutos
-                        hora_actual += timedelta(minutes=30)
-                
-                # Avanzar al siguiente día
-                fecha_actual += timedelta(days=1)
-        
-        print(f"\n{'='*80}")
+
+        print(f"{'='*80}")
         print(f"RESUMEN")
         print(f"{'='*80}")
-        print(f"✓ Turnos creados: {total_turnos_creados}")
-        print(f"✗ Errores: {total_errores}")
+        print(f"✓ Turnos creados: {insertados}")
+        print(f"  Fechas ya generadas: {len(existentes)} | Duplicados omitidos: {resumen['omitidos']}")
+        print(f"  Tiempo: {segundos:.2f} s ({resumen['turnos_por_segundo']} turnos/s)")
         print(f"{'='*80}\n")
-        
+
         db.desconectar()
-        return True
-    
+        return resumen
+
     except Exception as e:
         print(f"[ERROR] Error durante la generación de turnos: {str(e)}")
         db.desconectar()
-        return False
+        return None
 
 
 if __name__ == "__main__":
-    # Generar turnos para los próximos 30 días
+    # Por defecto genera turnos de 30 minutos para los próximos 30 días
     generar_turnos_desde_agendas(
         fecha_inicio=date.today(),
-        dias_adelante=30
+        dias_adelante=int(sys.argv[1]) if len(sys.argv) > 1 else 30,
+        duracion_minutos=int(sys.argv[2]) if len(sys.argv) > 2 else DURACION_TURNO_MINUTOS
     )
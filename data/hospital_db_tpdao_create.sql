@@ -123,8 +123,12 @@ CREATE TABLE turno (
   estado VARCHAR(50) NOT NULL DEFAULT 'Libre',
   observaciones TEXT,
   fecha_creacion TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  slot_libre TINYINT AS (CASE WHEN estado = 'Libre' THEN 1 END) STORED INVISIBLE,
+  slot_programado TINYINT AS (CASE WHEN estado = 'Programado' THEN 1 END) STORED INVISIBLE,
   PRIMARY KEY (id_turno),
   UNIQUE KEY unique_turno (id_paciente, matricula, fecha, hora_inicio),
+  UNIQUE KEY unique_slot_libre (id_agenda, fecha, hora_inicio, slot_libre),
+  UNIQUE KEY unique_slot_programado (matricula, fecha, hora_inicio, slot_programado),
   KEY (id_consultorio),
   KEY (id_agenda),
   KEY (id_especialidad),
@@ -154,6 +158,17 @@ CREATE TABLE cambio_estado (
   CONSTRAINT fk_cambio_estado_turno FOREIGN KEY (id_turno) REFERENCES turno (id_turno) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
+-- ============================================================
+-- TABLA: marca_proceso
+-- Hasta qué fecha procesó cada tarea programada (ej. inasistencias)
+-- ============================================================
+CREATE TABLE marca_proceso (
+  nombre VARCHAR(50) NOT NULL,
+  fecha DATE NOT NULL,
+  actualizado TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (nombre)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 -- ============================================================
 -- TABLA: laboratorio
 -- ============================================================
@@ -261,10 +276,14 @@ CREATE TABLE notificacion (
   fecha_envio_real DATETIME DEFAULT NULL,
   motivo_error TEXT,
   fecha_creacion TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  tipo VARCHAR(30) NOT NULL DEFAULT 'Recordatorio',
+  lease_token VARCHAR(32) DEFAULT NULL,
+  lease_hasta DATETIME DEFAULT NULL,
   PRIMARY KEY (id_notificacion),
   KEY idx_turno (id_turno),
   KEY idx_estado (estado),
   KEY idx_fecha (fecha_hora_envio),
+  KEY idx_lease (lease_token),
   CONSTRAINT fk_notificacion_turno FOREIGN KEY (id_turno) REFERENCES turno (id_turno) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
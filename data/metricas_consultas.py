@@ -0,0 +1,224 @@
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+
+# Patrones para normalizar el SQL a una "huella" (fingerprint) sin valores concretos
+_RE_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_RE_CADENAS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_MARCADORES = re.compile(r"%s|\?")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+# Archivos cuyos frames no cuentan como "llamador" de una consulta
+_DIR_DATA = os.path.dirname(os.path.abspath(__file__))
+_ARCHIVOS_INTERNOS = {
+    os.path.join(_DIR_DATA, "database.py"),
+    os.path.join(_DIR_DATA, "metricas_consultas.py"),
+}
+
+
+def huella_sql(sql: str) -> str:
+    """
+    Normaliza una consulta para agrupar las que solo difieren en sus valores
+
+    Ejemplo:
+        "SELECT * FROM Turno WHERE id_turno = 15"  ->  "SELECT * FROM Turno WHERE id_turno = ?"
+    """
+    huella = _RE_COMENTARIOS.sub(" ", sql)
+    huella = _RE_CADENAS.sub("?", huella)
+    huella = _RE_NUMEROS.sub("?", huella)
+    huella = _RE_MARCADORES.sub("?", huella)
+    huella = _RE_LISTAS.sub("(?+)", huella)
+    return _RE_ESPACIOS.sub(" ", huella).strip().rstrip(";")
+
+
+def _percentil(ordenadas: List[float], p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not ordenadas:
+        return 0.0
+    rango = math.ceil(p / 100 * len(ordenadas))
+    return ordenadas[max(0, min(len(ordenadas), rango) - 1)]
+
+
+def llamador_externo() -> str:
+    """Devuelve 'archivo:línea en función' del primer frame fuera de Database"""
+    frame = sys._getframe(1)
+    while frame is not None and os.path.abspath(frame.f_code.co_filename) in _ARCHIVOS_INTERNOS:
+        frame = frame.f_back
+    if frame is None:
+        return "desconocido"
+    archivo = os.path.basename(frame.f_code.co_filename)
+    return f"{archivo}:{frame.f_lineno} en {frame.f_code.co_name}"
+
+
+class _EstadisticaHuella:
+    """Acumulados de una huella SQL"""
+
+    def __init__(self, muestras_max: int):
+        self.cantidad = 0
+        self.errores = 0
+        self.total_seg = 0.0
+        self.filas = 0
+        # Ventana de las últimas latencias, para percentiles con memoria acotada
+        self.muestras: Deque[float] = deque(maxlen=muestras_max)
+        self.llamadores: Dict[str, int] = {}
+
+
+class MetricasConsultas:
+    """
+    Registra latencia, filas y llamador de cada consulta ejecutada por Database.
+    Mantiene las N consultas más lentas y percentiles p50/p95/p99 por huella SQL,
+    y opcionalmente escribe cada medición en un archivo JSONL.
+    """
+
+    def __init__(self, cantidad_lentas: int = 20, muestras_por_huella: int = 1000,
+                 ruta_jsonl: Optional[str] = None):
+        """
+        Args:
+            cantidad_lentas: Cuántas de las consultas más lentas conservar
+            muestras_por_huella: Latencias recientes guardadas por huella (para percentiles)
+            ruta_jsonl: Archivo donde agregar una línea JSON por consulta (opcional)
+        """
+        self.__cantidad_lentas = cantidad_lentas
+        self.__muestras_por_huella = muestras_por_huella
+        self.__ruta_jsonl = ruta_jsonl
+        self.__por_huella: Dict[str, _EstadisticaHuella] = {}
+        self.__lentas: List[tuple] = []  # min-heap de (duración, orden, detalle)
+        self.__orden = itertools.count()
+        self.__lock = threading.Lock()
+        # El archivo JSONL queda abierto y tiene su propio lock: escribir en disco
+        # no bloquea a los hilos que solo actualizan las estadísticas
+        self.__archivo_jsonl = None
+        self.__lock_jsonl = threading.Lock()
+        self.activo = True
+
+    def configurar_jsonl(self, ruta: Optional[str]) -> None:
+        """Activa (o desactiva con None) la escritura de mediciones en un archivo JSONL"""
+        with self.__lock_jsonl:
+            self.__cerrar_jsonl()
+            self.__ruta_jsonl = ruta
+
+    def __cerrar_jsonl(self) -> None:
+        """Cierra el archivo JSONL abierto (llamar con __lock_jsonl tomado)"""
+        if self.__archivo_jsonl is not None:
+            try:
+                self.__archivo_jsonl.close()
+            except OSError:
+                pass
+            self.__archivo_jsonl = None
+
+    def __escribir_jsonl(self, detalle: Dict) -> None:
+        """Agrega una medición al archivo JSONL, abriéndolo la primera vez"""
+        linea = json.dumps(detalle, ensure_ascii=False) + "\n"
+        with self.__lock_jsonl:
+            if not self.__ruta_jsonl:
+                return
+            try:
+                if self.__archivo_jsonl is None:
+                    self.__archivo_jsonl = open(self.__ruta_jsonl, "a", encoding="utf-8")
+                self.__archivo_jsonl.write(linea)
+                self.__archivo_jsonl.flush()
+            except OSError as e:
+                print(f"[WARNING] No se pudo escribir métricas en {self.__ruta_jsonl}: {e}")
+                self.__cerrar_jsonl()
+                self.__ruta_jsonl = None
+
+    def registrar(self, sql: str, duracion_seg: float, filas: Optional[int] = None,
+                  llamador: Optional[str] = None, error: bool = False) -> None:
+        """
+        Registra la ejecución de una consulta
+
+        Args:
+            sql: Texto de la consulta
+            duracion_seg: Tiempo que tardó, en segundos
+            filas: Filas devueltas o afectadas (si se conocen)
+            llamador: Quién la ejecutó ('archivo:línea en función')
+            error: Si la consulta terminó con error
+        """
+        if not self.activo:
+            return
+
+        huella = huella_sql(sql)
+        llamador = llamador or "desconocido"
+
+        with self.__lock:
+            estadistica = self.__por_huella.get(huella)
+            if estadistica is None:
+                estadistica = _EstadisticaHuella(self.__muestras_por_huella)
+                self.__por_huella[huella] = estadistica
+
+            estadistica.cantidad += 1
+            estadistica.total_seg += duracion_seg
+            estadistica.filas += filas or 0
+            estadistica.muestras.append(duracion_seg)
+            estadistica.llamadores[llamador] = estadistica.llamadores.get(llamador, 0) + 1
+            if error:
+                estadistica.errores += 1
+
+            detalle = {
+                'fecha_hora': datetime.now().isoformat(timespec='milliseconds'),
+                'huella': huella,
+                'duracion_ms': round(duracion_seg * 1000, 3),
+                'filas': filas,
+                'llamador': llamador,
+                'error': error,
+            }
+
+            entrada = (duracion_seg, next(self.__orden), detalle)
+            if len(self.__lentas) < self.__cantidad_lentas:
+                heapq.heappush(self.__lentas, entrada)
+            elif duracion_seg > self.__lentas[0][0]:
+                heapq.heapreplace(self.__lentas, entrada)
+
+        if self.__ruta_jsonl:
+            self.__escribir_jsonl(detalle)
+
+    def mas_lentas(self) -> List[Dict]:
+        """Retorna las consultas más lentas registradas, de mayor a menor duración"""
+        with self.__lock:
+            return [dict(d) for _, _, d in sorted(self.__lentas, key=lambda e: e[0], reverse=True)]
+
+    def por_huella(self) -> List[Dict]:
+        """
+        Retorna las estadísticas agregadas por huella, ordenadas por tiempo total
+
+        Returns:
+            Lista de diccionarios con huella, cantidad, errores, total_ms,
+            p50_ms, p95_ms, p99_ms, filas y el llamador más frecuente
+        """
+        with self.__lock:
+            resultado = []
+            for huella, e in self.__por_huella.items():
+                ordenadas = sorted(e.muestras)
+                resultado.append({
+                    'huella': huella,
+                    'cantidad': e.cantidad,
+                    'errores': e.errores,
+                    'total_ms': round(e.total_seg * 1000, 3),
+                    'p50_ms': round(_percentil(ordenadas, 50) * 1000, 3),
+                    'p95_ms': round(_percentil(ordenadas, 95) * 1000, 3),
+                    'p99_ms': round(_percentil(ordenadas, 99) * 1000, 3),
+                    'filas': e.filas,
+                    'llamador_principal': max(e.llamadores, key=e.llamadores.get),
+                })
+        resultado.sort(key=lambda r: r['total_ms'], reverse=True)
+        return resultado
+
+    def reiniciar(self) -> None:
+        """Descarta todas las mediciones acumuladas"""
+        with self.__lock:
+            self.__por_huella.clear()
+            self.__lentas.clear()
+
+    def __repr__(self) -> str:
+        return f"MetricasConsultas(huellas={len(self.__por_huella)}, lentas={len(self.__lentas)})"
@@ -0,0 +1,14 @@
+-- ============================================================
+-- MIGRACIÓN: marcas de avance de las tareas programadas
+-- Las inasistencias se marcan desde SchedulerTurnos solo para las
+-- fechas posteriores a la última barrida (ver GestorTurno.marcar_inasistencias_pendientes)
+-- ============================================================
+
+USE hospital_db;
+
+CREATE TABLE IF NOT EXISTS marca_proceso (
+  nombre VARCHAR(50) NOT NULL,
+  fecha DATE NOT NULL,
+  actualizado TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (nombre)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,13 @@
+-- ============================================================
+-- MIGRACIÓN: reserva (lease) de notificaciones pendientes
+-- Cada instancia de SchedulerNotificaciones reclama una tanda con un token
+-- y un vencimiento; si la instancia se cae, la tanda se vuelve a reclamar
+-- al vencer (ver GestorNotificacion.reclamar_notificaciones)
+-- ============================================================
+
+USE hospital_db;
+
+ALTER TABLE notificacion
+  ADD COLUMN lease_token VARCHAR(32) DEFAULT NULL,
+  ADD COLUMN lease_hasta DATETIME DEFAULT NULL,
+  ADD KEY idx_lease (lease_token);
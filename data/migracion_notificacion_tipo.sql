@@ -0,0 +1,10 @@
+-- ============================================================
+-- MIGRACIÓN: tipo de notificación ('Recordatorio' o 'Cancelacion')
+-- Los avisos de cancelación se encolan al cancelar turnos en lote
+-- (ver GestorTurno.cambiar_estado_lote)
+-- ============================================================
+
+USE hospital_db;
+
+ALTER TABLE notificacion
+  ADD COLUMN tipo VARCHAR(30) NOT NULL DEFAULT 'Recordatorio';
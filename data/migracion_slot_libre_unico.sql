@@ -0,0 +1,23 @@
+-- ============================================================
+-- MIGRACIÓN: un solo turno 'Libre' por agenda, fecha y hora
+-- Permite regenerar turnos con INSERT IGNORE sin duplicarlos
+-- (ver data/generar_turnos.py)
+-- ============================================================
+
+USE hospital_db;
+
+-- Eliminar turnos libres duplicados (se conserva el de menor id)
+DELETE t1 FROM turno t1
+JOIN turno t2
+  ON t1.id_agenda = t2.id_agenda
+ AND t1.fecha = t2.fecha
+ AND t1.hora_inicio = t2.hora_inicio
+ AND t1.estado = 'Libre'
+ AND t2.estado = 'Libre'
+ AND t1.id_turno > t2.id_turno;
+
+-- slot_libre vale 1 solo en turnos libres (NULL en el resto), así la clave única
+-- no afecta a los turnos ya asignados
+ALTER TABLE turno
+  ADD COLUMN slot_libre TINYINT AS (CASE WHEN estado = 'Libre' THEN 1 END) STORED INVISIBLE,
+  ADD UNIQUE KEY unique_slot_libre (id_agenda, fecha, hora_inicio, slot_libre);
@@ -0,0 +1,21 @@
+-- ============================================================
+-- MIGRACIÓN: un solo turno 'Programado' por médico, fecha y hora
+-- Evita que dos reservas concurrentes (o dos agendas del mismo
+-- médico) dejen el mismo horario tomado dos veces
+-- ============================================================
+
+USE hospital_db;
+
+-- Revisar antes los horarios ya duplicados: la clave no se puede crear
+-- mientras existan. Resolverlos a mano (cancelar o mover uno de los turnos)
+SELECT matricula, fecha, hora_inicio, GROUP_CONCAT(id_turno) AS turnos
+FROM turno
+WHERE estado = 'Programado'
+GROUP BY matricula, fecha, hora_inicio
+HAVING COUNT(*) > 1;
+
+-- slot_programado vale 1 solo en turnos programados (NULL en el resto), así la
+-- clave única no afecta al historial de turnos atendidos o cancelados
+ALTER TABLE turno
+  ADD COLUMN slot_programado TINYINT AS (CASE WHEN estado = 'Programado' THEN 1 END) STORED INVISIBLE,
+  ADD UNIQUE KEY unique_slot_programado (matricula, fecha, hora_inicio, slot_programado);
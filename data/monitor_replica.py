@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Optional
+
+
+class MonitorReplica:
+    """
+    Estado compartido (thread-safe) del servidor de lectura.
+
+    Decide si las lecturas pueden ir a la réplica: la descarta durante un tiempo
+    si no responde, y si su retraso de replicación supera el máximo permitido.
+    El retraso se vuelve a medir como mucho cada `intervalo_verificacion` segundos.
+    """
+
+    def __init__(self, retraso_maximo: int = 30, espera_reintento: int = 30,
+                 intervalo_verificacion: int = 5):
+        """
+        Args:
+            retraso_maximo: Segundos de retraso tolerados respecto del principal
+            espera_reintento: Segundos sin usar la réplica después de una falla
+            intervalo_verificacion: Cada cuántos segundos medir el retraso
+        """
+        self.__retraso_maximo = retraso_maximo
+        self.__espera_reintento = espera_reintento
+        self.__intervalo_verificacion = intervalo_verificacion
+        self.__caida_hasta = 0.0
+        self.__ultima_verificacion = 0.0
+        self.__retraso: Optional[float] = 0.0
+        self.__lock = threading.Lock()
+
+    def disponible(self) -> bool:
+        """Indica si conviene intentar leer de la réplica en este momento"""
+        with self.__lock:
+            if time.monotonic() < self.__caida_hasta:
+                return False
+            if self.__necesita_verificar():
+                # El retraso conocido está vencido: se intenta y se vuelve a medir
+                return True
+            return self.__retraso_aceptable()
+
+    def necesita_verificar(self) -> bool:
+        """Indica si hay que volver a medir el retraso de replicación"""
+        with self.__lock:
+            return self.__necesita_verificar()
+
+    def registrar_retraso(self, segundos: Optional[float]) -> bool:
+        """
+        Guarda el retraso medido
+
+        Args:
+            segundos: Retraso de replicación (None si la replicación está detenida)
+
+        Returns:
+            True si el retraso está dentro del máximo permitido
+        """
+        with self.__lock:
+            self.__retraso = segundos
+            self.__ultima_verificacion = time.monotonic()
+            aceptable = self.__retraso_aceptable()
+        if not aceptable:
+            print(f"[WARNING] Réplica de lectura atrasada ({segundos} s), se lee del principal")
+        return aceptable
+
+    def marcar_caida(self, motivo: str = "") -> None:
+        """Deja de usar la réplica durante `espera_reintento` segundos"""
+        with self.__lock:
+            self.__caida_hasta = time.monotonic() + self.__espera_reintento
+        print(f"[WARNING] Réplica de lectura no disponible, se usa el principal {motivo}".rstrip())
+
+    def __necesita_verificar(self) -> bool:
+        return time.monotonic() - self.__ultima_verificacion >= self.__intervalo_verificacion
+
+    def __retraso_aceptable(self) -> bool:
+        return self.__retraso is not None and self.__retraso <= self.__retraso_maximo
+
+    def __repr__(self) -> str:
+        return f"MonitorReplica(retraso={self.__retraso}, maximo={self.__retraso_maximo})"
@@ -0,0 +1,172 @@
+import threading
+import time
+from typing import Callable, List, Tuple, Any, Dict
+
+
+class PoolConexiones:
+    """Pool acotado y thread-safe de conexiones a la base de datos"""
+
+    def __init__(self, fabrica: Callable[[], Any], tamano_maximo: int = 10,
+                 tiempo_max_inactiva: int = 300, intervalo_verificacion: int = 30,
+                 timeout_espera: int = 10):
+        """
+        Inicializa el pool (las conexiones se crean a demanda)
+
+        Args:
+            fabrica: Función sin argumentos que abre una conexión nueva
+            tamano_maximo: Cantidad máxima de conexiones abiertas (en uso + libres)
+            tiempo_max_inactiva: Segundos tras los cuales se cierra una conexión libre
+            intervalo_verificacion: Segundos de inactividad a partir de los cuales
+                                    se verifica la conexión antes de prestarla
+            timeout_espera: Segundos a esperar por una conexión si el pool está lleno
+        """
+        self.__fabrica = fabrica
+        self.__tamano_maximo = tamano_maximo
+        self.__tiempo_max_inactiva = tiempo_max_inactiva
+        self.__intervalo_verificacion = intervalo_verificacion
+        self.__timeout_espera = timeout_espera
+
+        # Conexiones libres: (conexion, momento en que se devolvió)
+        self.__libres: List[Tuple[Any, float]] = []
+        self.__en_uso = 0
+        self.__condicion = threading.Condition(threading.Lock())
+
+        self.__creadas = 0
+        self.__reutilizadas = 0
+        self.__descartadas = 0
+
+    def obtener(self) -> Any:
+        """
+        Presta una conexión del pool, creando una nueva si hace falta
+
+        Returns:
+            Conexión lista para usar
+
+        Raises:
+            TimeoutError: Si el pool está lleno y no se liberó ninguna conexión a tiempo
+        """
+        limite = time.monotonic() + self.__timeout_espera
+
+        while True:
+            with self.__condicion:
+                while True:
+                    self.__desalojar_inactivas()
+
+                    if self.__libres:
+                        # LIFO: la más reciente es la que tiene menos chances de estar caída.
+                        # Se cuenta como prestada mientras se verifica fuera del lock
+                        conexion, devuelta = self.__libres.pop()
+                        self.__en_uso += 1
+                        verificar = time.monotonic() - devuelta >= self.__intervalo_verificacion
+                        break
+
+                    if self.__en_uso < self.__tamano_maximo:
+                        # Reservar el lugar antes de abrir la conexión fuera del lock
+                        self.__en_uso += 1
+                        conexion = None
+                        break
+
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise TimeoutError(
+                            f"Pool de conexiones agotado ({self.__tamano_maximo} en uso)"
+                        )
+                    self.__condicion.wait(restante)
+
+            if conexion is None:
+                break
+
+            # is_connected() va hasta el servidor: no se hace con el lock tomado
+            viva = not verificar or self.__esta_viva(conexion)
+            with self.__condicion:
+                if viva:
+                    self.__reutilizadas += 1
+                    return conexion
+                self.__en_uso -= 1
+                self.__cerrar(conexion)
+                self.__condicion.notify()
+
+        try:
+            conexion = self.__fabrica()
+        except Exception:
+            with self.__condicion:
+                self.__en_uso -= 1
+                self.__condicion.notify()
+            raise
+
+        with self.__condicion:
+            self.__creadas += 1
+        return conexion
+
+    def devolver(self, conexion: Any, descartar: bool = False) -> None:
+        """
+        Devuelve una conexión prestada al pool
+
+        Args:
+            conexion: Conexión obtenida con obtener()
+            descartar: Si es True la conexión se cierra en lugar de reutilizarse
+        """
+        if not descartar:
+            try:
+                # Cerrar la transacción implícita que abren los SELECT para que
+                # el próximo usuario no vea una instantánea vieja de los datos
+                conexion.rollback()
+            except Exception:
+                descartar = True
+
+        with self.__condicion:
+            self.__en_uso -= 1
+            if descartar:
+                self.__cerrar(conexion)
+            else:
+                self.__libres.append((conexion, time.monotonic()))
+            self.__condicion.notify()
+
+    def cerrar_todas(self) -> None:
+        """Cierra todas las conexiones libres (las prestadas se cierran al devolverse)"""
+        with self.__condicion:
+            while self.__libres:
+                conexion, _ = self.__libres.pop()
+                self.__cerrar(conexion)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Retorna contadores de uso del pool"""
+        with self.__condicion:
+            return {
+                'en_uso': self.__en_uso,
+                'libres': len(self.__libres),
+                'creadas': self.__creadas,
+                'reutilizadas': self.__reutilizadas,
+                'descartadas': self.__descartadas,
+            }
+
+    # ========== MÉTODOS AUXILIARES ==========
+    def __desalojar_inactivas(self) -> None:
+        """Cierra las conexiones libres que superaron el tiempo máximo de inactividad"""
+        ahora = time.monotonic()
+        vigentes = []
+        for conexion, devuelta in self.__libres:
+            if ahora - devuelta > self.__tiempo_max_inactiva:
+                self.__cerrar(conexion)
+            else:
+                vigentes.append((conexion, devuelta))
+        self.__libres = vigentes
+
+    @staticmethod
+    def __esta_viva(conexion: Any) -> bool:
+        """Verifica que la conexión siga respondiendo"""
+        try:
+            return conexion.is_connected()
+        except Exception:
+            return False
+
+    def __cerrar(self, conexion: Any) -> None:
+        """Cierra físicamente una conexión ignorando errores"""
+        self.__descartadas += 1
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def __repr__(self) -> str:
+        return f"PoolConexiones(en_uso={self.__en_uso}, libres={len(self.__libres)}, max={self.__tamano_maximo})"
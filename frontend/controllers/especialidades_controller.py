@@ -23,7 +23,7 @@ class EspecialidadesController:
             return False, "El ID debe ser un número"
         
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return False, "No se pudo conectar a la BD"
         
         try:
@@ -56,7 +56,7 @@ class EspecialidadesController:
     def modificar(self, id_especialidad, nombre, descripcion):
         """Modifica una especialidad"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return False, "No se pudo conectar a la BD"
         
         try:
@@ -90,7 +90,7 @@ class EspecialidadesController:
     def eliminar(self, id_especialidad):
         """Elimina una especialidad"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return False, "No se pudo conectar a la BD"
         
         try:
@@ -127,7 +127,7 @@ class EspecialidadesController:
     def listar(self) -> List[Dict]:
         """Lista todas las especialidades de la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
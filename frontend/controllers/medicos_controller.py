@@ -35,7 +35,7 @@ class MedicosController:
         
         # Guardar médico en BD
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return False, "No se pudo conectar a la base de datos"
         
         try:
@@ -72,7 +72,7 @@ class MedicosController:
     def modificar(self, matricula, nombre, apellido, telefono, email, fecha_alta):
         """Modifica un médico en la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return False, "No se pudo conectar a la BD"
         
         try:
@@ -105,7 +105,7 @@ class MedicosController:
     def dar_de_baja(self, matricula):
         """Da de baja un médico en la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return False, "No se pudo conectar a la BD"
         
         try:
@@ -134,7 +134,7 @@ class MedicosController:
     def listar(self):
         """Lista todos los médicos de la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
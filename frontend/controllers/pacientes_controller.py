@@ -29,7 +29,7 @@ class PacientesController:
         
         # Guardar directamente en BD
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return False, "No se pudo conectar a la BD"
         
         try:
@@ -62,7 +62,7 @@ class PacientesController:
     def modificar(self, id_paciente, nombre, apellido, telefono, nacimiento, direccion):
         """Modifica un paciente en la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return False, "No se pudo conectar a la BD"
         
         try:
@@ -95,7 +95,7 @@ class PacientesController:
     def dar_de_baja(self, id_paciente):
         """Da de baja un paciente en la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return False, "No se pudo conectar a la BD"
         
         try:
@@ -124,7 +124,7 @@ class PacientesController:
     def listar(self):
         """Lista todos los pacientes de la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
@@ -152,7 +152,7 @@ class PacientesController:
     def obtener_pacientes(self):
         """Obtiene la lista de todos los pacientes"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
@@ -180,7 +180,7 @@ class PacientesController:
     def obtener_historial(self, id_paciente):
         """Obtiene el historial clínico de un paciente"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
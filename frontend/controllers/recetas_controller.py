@@ -13,8 +13,8 @@ class RecetasController:
         self.db = Database()
 
     def _connect(self) -> bool:
-        # mismo DSN que venís usando; ajustá si lo cambiaste
-        return self.db.conectar("127.0.0.1:3306/hospital_db")
+        # servidor configurado en Database (variables DB_* / .env)
+        return self.db.conectar()
 
     # ----- helpers internos SIN depender de ejecutar_consulta/obtener_* -----
     def _one(self, query: str, params: tuple = ()) -> Optional[Dict]:
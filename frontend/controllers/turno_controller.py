@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta, date, time
 import sys, os
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 
 # asegurar tpdao en sys.path
 BASE = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -9,18 +9,50 @@ if BASE not in sys.path:
 
 # importar tu backend real
 from gestores.gestor_turno import GestorTurno
+from gestores.gestor_disponibilidad import GestorDisponibilidad
+from gestores.indice_disponibilidad import IndiceDisponibilidad
 from data.database import Database
 
 
+# Turno recién programado con los datos de la notificación (si el turno no
+# tiene especialidad se muestra una del médico)
+QUERY_DATOS_NOTIFICACION = """
+SELECT t.id_turno, t.id_paciente, t.matricula, t.id_consultorio,
+       t.fecha, t.hora_inicio, t.hora_fin,
+       p.nombre as paciente_nombre,
+       p.apellido as paciente_apellido,
+       p.telefono as paciente_telefono,
+       p.direccion as paciente_direccion,
+       p.fecha_nacimiento as paciente_nacimiento,
+       m.nombre as medico_nombre,
+       m.apellido as medico_apellido,
+       e.id_especialidad,
+       e.nombre as especialidad_nombre,
+       c.numero as consultorio_numero,
+       c.piso as consultorio_piso
+FROM Turno t
+JOIN Paciente p ON t.id_paciente = p.id_paciente
+JOIN Medico m ON t.matricula = m.matricula
+JOIN Consultorio c ON t.id_consultorio = c.id_consultorio
+LEFT JOIN Especialidad e ON e.id_especialidad = COALESCE(
+    t.id_especialidad,
+    (SELECT MIN(me.id_especialidad) FROM Medico_Especialidad me WHERE me.matricula = t.matricula)
+)
+WHERE t.id_turno = %s
+"""
+
+
 class TurnoController:
     def __init__(self):
         self.gestor = GestorTurno()
+        self.disponibilidad = GestorDisponibilidad()
+        self.indice = IndiceDisponibilidad()
 
     # ========== OBTENER DATOS ==========
     def obtener_medicos(self) -> List[Dict]:
         """Obtiene lista de médicos activos"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar(solo_lectura=True):
             print("[DEBUG] Error conectando a BD")
             return []
         
@@ -63,7 +95,7 @@ class TurnoController:
     def obtener_pacientes(self) -> List[Dict]:
         """Obtiene lista de pacientes activos"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar(solo_lectura=True):
             print("[DEBUG] Error conectando a BD")
             return []
         
@@ -88,102 +120,84 @@ class TurnoController:
             return []
 
     def obtener_turnos_libres_medico(self, matricula: int) -> List[Dict]:
-        """Obtiene turnos libres de un médico, agrupados por día"""
+        """
+        Obtiene los turnos libres de un médico en el horizonte de disponibilidad,
+        calculados a partir de sus agendas (ver GestorDisponibilidad).
+        Los turnos aún no materializados en la BD vienen con id_turno None.
+        """
+        return self.indice.libres(matricula)
+
+    def obtener_turnos_libres_por_fecha(self, matricula: int) -> Dict[str, List[Dict]]:
+        """
+        Turnos libres de un médico agrupados por fecha ('AAAA-MM-DD'), desde el
+        índice en memoria (ver IndiceDisponibilidad)
+        """
+        return {str(fecha): turnos for fecha, turnos in self.indice.libres_por_fecha(matricula).items()}
+
+    def obtener_proximos_turnos_especialidad(self, id_especialidad: int, cantidad: int = 10,
+                                             desde: Optional[date] = None, hasta: Optional[date] = None,
+                                             hora_desde: Optional[time] = None,
+                                             hora_hasta: Optional[time] = None) -> List[Dict]:
+        """
+        Primeros turnos libres entre todos los médicos de una especialidad
+        
+        Args:
+            id_especialidad: Especialidad buscada
+            cantidad: Cantidad de turnos a devolver (default: 10)
+            desde / hasta: Rango de fechas, inclusive (opcional)
+            hora_desde / hora_hasta: Franja horaria del turno (opcional)
+        
+        Returns:
+            Turnos libres ordenados por fecha y hora, con el nombre y apellido
+            del médico además de los campos de obtener_turnos_libres_medico
+        """
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar(solo_lectura=True):
             return []
         
         try:
             query = """
-            SELECT t.id_turno, t.fecha, t.hora_inicio, t.hora_fin, t.id_consultorio,
-                   c.numero as consultorio_numero
-            FROM Turno t
-            JOIN Consultorio c ON t.id_consultorio = c.id_consultorio
-            WHERE t.matricula = %s AND t.estado = 'Libre' AND t.fecha >= CURDATE()
-            ORDER BY t.fecha, t.hora_inicio
-            LIMIT 50
+            SELECT m.matricula, m.nombre, m.apellido
+            FROM Medico m
+            JOIN Medico_Especialidad me ON m.matricula = me.matricula
+            WHERE me.id_especialidad = %s AND m.activo = 1
             """
-            
-            turnos = db.obtener_registros(query, (matricula,))
-            db.desconectar()
-            
-            if not turnos:
-                return []
-            
-            # Filtrar turnos del día actual que ya pasaron
-            hoy = date.today()
-            hora_actual = datetime.now().time()
-            
-            turnos_validos = []
-            for turno in turnos:
-                fecha_turno = turno['fecha']
-                hora_turno = turno['hora_inicio']
-                
-                # Convertir hora_inicio si es timedelta
-                if isinstance(hora_turno, timedelta):
-                    total_seconds = int(hora_turno.total_seconds())
-                    hora_turno = time(total_seconds // 3600, (total_seconds % 3600) // 60)
-                
-                # Si es hoy, solo incluir si la hora no pasó
-                if fecha_turno == hoy:
-                    if hora_turno > hora_actual:
-                        turnos_validos.append(turno)
-                else:
-                    # Si es fecha futura, siempre incluir
-                    turnos_validos.append(turno)
-            
-            return turnos_validos
-            
+            medicos = db.obtener_registros(query, (id_especialidad,)) or []
         except Exception as e:
-            print(f"[ERROR] Error al cargar turnos: {str(e)}")
+            print(f"[ERROR] Error al cargar médicos de la especialidad: {str(e)}")
+            return []
+        finally:
             db.desconectar()
+        
+        if not medicos:
             return []
+        
+        por_matricula = {m['matricula']: m for m in medicos}
+        turnos = self.indice.proximos_libres(
+            por_matricula.keys(), cantidad, desde, hasta, hora_desde, hora_hasta)
+        
+        return [
+            dict(turno, nombre=por_matricula[turno['matricula']]['nombre'],
+                 apellido=por_matricula[turno['matricula']]['apellido'])
+            for turno in turnos
+        ]
 
     def marcar_inasistencias_automaticas(self) -> int:
         """
         Marca automáticamente como 'Inasistencia' los turnos programados 
-        cuya fecha ya pasó (más de 1 día)
+        cuya fecha ya pasó. Lo ejecuta SchedulerTurnos de forma periódica e
+        incremental (ver GestorTurno.marcar_inasistencias_pendientes); las
+        consultas de listado ya no lo llaman.
         
         Returns:
             Cantidad de turnos marcados como inasistencia
         """
-        db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
-            return 0
-        
-        try:
-            # Obtener fecha de ayer (cualquier turno de ayer o antes que siga "Programado" se marca como inasistencia)
-            fecha_limite = date.today() - timedelta(days=1)
-            
-            # Actualizar turnos programados vencidos
-            query = """
-            UPDATE Turno 
-            SET estado = 'Inasistencia'
-            WHERE estado = 'Programado' 
-            AND fecha <= %s
-            """
-            
-            resultado = db.ejecutar_consulta(query, (fecha_limite,))
-            db.desconectar()
-            
-            if resultado and resultado > 0:
-                print(f"[INFO] {resultado} turno(s) marcado(s) automáticamente como inasistencia")
-                return resultado
-            
-            return 0
-        
-        except Exception as e:
-            print(f"[ERROR] Error al marcar inasistencias automáticas: {str(e)}")
-            db.desconectar()
-            return 0
+        return self.gestor.marcar_inasistencias_pendientes()
 
     def obtener_turnos_programados(self) -> List[Dict]:
         """Obtiene todos los turnos programados"""
-        # Primero marcar automáticamente las inasistencias
-        self.marcar_inasistencias_automaticas()
-        
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar(solo_lectura=True):
             return []
         
         try:
@@ -226,63 +240,7 @@ class TurnoController:
         Returns:
             (True/False, mensaje)
         """
-        db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
-            return False, "[ERROR] No se pudo conectar a la base de datos"
-        
-        try:
-            # Verificar que el turno existe y está libre
-            query_check = "SELECT id_turno, estado FROM Turno WHERE id_turno = %s"
-            turno = db.obtener_registro(query_check, (id_turno,))
-            
-            if not turno:
-                return False, "[ERROR] Turno no encontrado"
-            
-            if turno['estado'] != 'Libre':
-                return False, f"[ERROR] El turno no está disponible (estado: {turno['estado']})"
-            
-            # Actualizar el turno
-            query_update = """
-            UPDATE Turno 
-            SET id_paciente = %s, estado = 'Programado', observaciones = %s
-            WHERE id_turno = %s AND estado = 'Libre'
-            """
-            
-            resultado = db.ejecutar_consulta(query_update, (id_paciente, observaciones, id_turno))
-            
-            if resultado is not None and resultado > 0:
-                # Obtener datos completos del turno para la notificación
-                query_turno = """
-                SELECT t.id_turno, t.fecha, t.hora_inicio, t.hora_fin, t.id_consultorio, t.matricula, t.id_paciente
-                FROM Turno t
-                WHERE t.id_turno = %s
-                """
-                turno_datos = db.obtener_registro(query_turno, (id_turno,))
-                db.desconectar()
-                
-                # Mostrar notificación en terminal
-                if turno_datos:
-                    try:
-                        self._mostrar_notificacion_terminal(
-                            turno_datos['id_turno'],
-                            turno_datos['id_paciente'],
-                            turno_datos['matricula'],
-                            turno_datos['fecha'],
-                            turno_datos['hora_inicio'],
-                            turno_datos['hora_fin'],
-                            turno_datos['id_consultorio']
-                        )
-                    except Exception as e:
-                        print(f"⚠ Error al mostrar notificación: {str(e)}")
-                
-                return True, "[OK] Turno programado exitosamente"
-            else:
-                db.desconectar()
-                return False, "[ERROR] No se pudo programar el turno"
-        
-        except Exception as e:
-            db.desconectar()
-            return False, f"[ERROR] {str(e)}"
+        return self._reclamar_turno(id_paciente, id_turno, None, observaciones)
 
     def programar_turno_con_especialidad(self, id_paciente: int, matricula: int, id_turno: int, 
                         id_especialidad: int, observaciones: str = "") -> Tuple[bool, str]:
@@ -299,65 +257,152 @@ class TurnoController:
         Returns:
             (True/False, mensaje)
         """
+        return self._reclamar_turno(id_paciente, id_turno, id_especialidad, observaciones)
+
+    def _reclamar_turno(self, id_paciente: int, id_turno: int, id_especialidad: Optional[int],
+                        observaciones: str) -> Tuple[bool, str]:
+        """
+        Toma el turno con un único UPDATE condicionado a estado = 'Libre'.
+        Si dos recepcionistas eligen el mismo turno, el motor serializa los
+        UPDATE sobre la fila y solo uno la modifica; el otro recibe 0 filas.
+        """
+        if id_turno is None:
+            # Los turnos libres calculados desde la agenda no tienen fila todavía
+            return False, "[ERROR] El turno no está materializado: usar programar_turno_libre"
+        
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
-            return False, "[ERROR] No se pudo conectar a la base de datos"
         
         try:
-            # Verificar que el turno existe y está libre
-            query_check = "SELECT id_turno, estado FROM Turno WHERE id_turno = %s"
-            turno = db.obtener_registro(query_check, (id_turno,))
-            
-            if not turno:
-                return False, "[ERROR] Turno no encontrado"
-            
-            if turno['estado'] != 'Libre':
-                return False, f"[ERROR] El turno no está disponible (estado: {turno['estado']})"
-            
-            # Actualizar el turno CON especialidad
-            query_update = """
-            UPDATE Turno 
-            SET id_paciente = %s, id_especialidad = %s, estado = 'Programado', observaciones = %s
-            WHERE id_turno = %s AND estado = 'Libre'
-            """
-            
-            resultado = db.ejecutar_consulta(query_update, (id_paciente, id_especialidad, observaciones, id_turno))
-            
-            if resultado is not None and resultado > 0:
-                # Obtener datos del turno para mostrar notificación
-                query_turno = """
-                SELECT t.id_turno, t.fecha, t.hora_inicio, t.hora_fin, 
-                       t.id_consultorio, t.matricula, t.id_paciente
-                FROM Turno t
-                WHERE t.id_turno = %s
+            with db.session():
+                query_update = """
+                UPDATE Turno 
+                SET id_paciente = %s, id_especialidad = COALESCE(%s, id_especialidad),
+                    estado = 'Programado', observaciones = %s
+                WHERE id_turno = %s AND estado = 'Libre'
                 """
-                turno_datos = db.obtener_registro(query_turno, (id_turno,))
-                db.desconectar()
+                resultado = db.ejecutar_consulta(
+                    query_update, (id_paciente, id_especialidad, observaciones, id_turno), preparada=True)
+                
+                if resultado is None:
+                    return False, "[ERROR] No se pudo programar el turno"
+                
+                if resultado == 0:
+                    # Solo en el caso de falla se averigua el motivo
+                    turno = db.obtener_registro(
+                        "SELECT estado FROM Turno WHERE id_turno = %s", (id_turno,), preparada=True)
+                    if not turno:
+                        return False, "[ERROR] Turno no encontrado"
+                    return False, f"[ERROR] El turno ya fue tomado (estado: {turno['estado']})"
+                
+                # Datos del turno, paciente, médico y consultorio en una sola consulta
+                datos = db.obtener_registro(QUERY_DATOS_NOTIFICACION, (id_turno,), preparada=True)
                 
-                # Mostrar notificación en terminal
-                if turno_datos:
+                if datos:
+                    self.indice.quitar(datos['matricula'], datos['fecha'], datos['hora_inicio'])
                     try:
                         self._mostrar_notificacion_terminal(
-                            turno_datos['id_turno'],
-                            turno_datos['id_paciente'],
-                            turno_datos['matricula'],
-                            turno_datos['fecha'],
-                            turno_datos['hora_inicio'],
-                            turno_datos['hora_fin'],
-                            turno_datos['id_consultorio']
+                            datos['id_turno'],
+                            datos['id_paciente'],
+                            datos['matricula'],
+                            datos['fecha'],
+                            datos['hora_inicio'],
+                            datos['hora_fin'],
+                            datos['id_consultorio'],
+                            datos=datos
                         )
                     except Exception as e:
                         print(f"⚠ Error al mostrar notificación: {str(e)}")
                 
                 return True, "[OK] Turno programado exitosamente"
-            else:
-                db.desconectar()
-                return False, "[ERROR] No se pudo programar el turno"
         
+        except ConnectionError:
+            return False, "[ERROR] No se pudo conectar a la base de datos"
         except Exception as e:
-            db.desconectar()
             return False, f"[ERROR] {str(e)}"
 
+    def programar_turno_libre(self, id_paciente: int, turno: Dict, id_especialidad: int = None,
+                              observaciones: str = "") -> Tuple[bool, str]:
+        """
+        Programa un turno devuelto por obtener_turnos_libres_medico, esté o no
+        materializado en la BD (si no lo está, la fila se crea en este momento)
+        
+        Args:
+            id_paciente: ID del paciente
+            turno: Turno libre (con id_agenda, fecha y hora_inicio)
+            id_especialidad: ID de la especialidad seleccionada (opcional)
+            observaciones: Observaciones adicionales
+        
+        Returns:
+            (True/False, mensaje)
+        """
+        exito, mensaje, id_turno = self.disponibilidad.reservar(
+            id_paciente, turno['id_agenda'], turno['fecha'], turno['hora_inicio'],
+            id_especialidad=id_especialidad, observaciones=observaciones
+        )
+        
+        if not exito:
+            # Lo pudo haber tomado otra instancia: el índice de ese médico está viejo
+            self.indice.invalidar(turno['matricula'])
+            return exito, mensaje
+        
+        self.indice.quitar(turno['matricula'], turno['fecha'], turno['hora_inicio'])
+        try:
+            self._mostrar_notificacion_terminal(
+                id_turno, id_paciente, turno['matricula'], turno['fecha'],
+                turno['hora_inicio'], turno['hora_fin'], turno['id_consultorio']
+            )
+        except Exception as e:
+            print(f"⚠ Error al mostrar notificación: {str(e)}")
+        
+        return exito, mensaje
+
+    def programar_turnos_recurrentes(self, id_paciente: int, matricula: int, primera_fecha: date,
+                                     hora_inicio: time, cantidad: int, cada_semanas: int = 1,
+                                     id_especialidad: int = None, observaciones: str = "",
+                                     todo_o_nada: bool = False) -> Tuple[bool, str, Dict]:
+        """
+        Programa una serie de turnos del mismo médico, mismo día de la semana y
+        misma hora (por ejemplo, un tratamiento semanal), en una sola transacción
+        
+        Args:
+            id_paciente: ID del paciente
+            matricula: Matrícula del médico
+            primera_fecha: Fecha del primer turno de la serie
+            hora_inicio: Hora de inicio de cada turno
+            cantidad: Cantidad de turnos de la serie
+            cada_semanas: Semanas entre un turno y el siguiente (default: 1)
+            id_especialidad: ID de la especialidad seleccionada (opcional)
+            observaciones: Observaciones adicionales
+            todo_o_nada: No programar ninguno si alguna fecha no está disponible
+        
+        Returns:
+            (True/False, mensaje, {'reservados': [...], 'conflictos': [...]})
+        """
+        if cantidad < 1 or cada_semanas < 1:
+            return False, "[ERROR] La cantidad y la frecuencia deben ser mayores a cero", {}
+        
+        fechas = [primera_fecha + timedelta(weeks=cada_semanas * i) for i in range(cantidad)]
+        resultado = self.disponibilidad.reservar_serie(
+            id_paciente, matricula, fechas, hora_inicio,
+            id_especialidad=id_especialidad, observaciones=observaciones, todo_o_nada=todo_o_nada
+        )
+        
+        if resultado is None:
+            self.indice.invalidar(matricula)
+            return False, "[ERROR] No se pudo programar la serie de turnos", {}
+        
+        for turno in resultado['reservados']:
+            self.indice.quitar(matricula, turno['fecha'], turno['hora_inicio'])
+        if resultado['conflictos']:
+            self.indice.invalidar(matricula)
+        
+        reservados = len(resultado['reservados'])
+        mensaje = f"[{'OK' if reservados else 'ERROR'}] {reservados} de {cantidad} turnos programados"
+        for conflicto in resultado['conflictos']:
+            mensaje += f"\n     {conflicto['fecha'].strftime('%d/%m/%Y')}: {conflicto['motivo']}"
+        
+        return reservados > 0, mensaje, resultado
+
     # ========== CAMBIAR ESTADO ==========
     def cambiar_estado_turno(self, id_turno: int, nuevo_estado: str) -> Tuple[bool, str]:
         """Cambia el estado de un turno"""
@@ -374,6 +419,44 @@ class TurnoController:
         ok = self.gestor.baja_turno_bd(id_turno)
         return (True, "Turno cancelado") if ok else (False, "No se pudo cancelar el turno")
 
+    def cambiar_estado_turnos(self, accion: str, ids_turno: List[int] = None, matricula: int = None,
+                              desde: date = None, hasta: date = None,
+                              notificar: bool = True, todo_o_nada: bool = False) -> Tuple[bool, str, Dict]:
+        """
+        Cancela, atiende o marca ausentes muchos turnos a la vez (por IDs, o por
+        médico y rango de fechas), ver GestorTurno.cambiar_estado_lote
+        
+        Args:
+            accion: 'cancelar', 'atender' o 'ausente'
+            ids_turno: IDs de los turnos
+            matricula: Médico (si no se pasan IDs)
+            desde / hasta: Rango de fechas inclusive (default: hoy)
+            notificar: Avisar a los pacientes de los turnos cancelados
+            todo_o_nada: No modificar ninguno si alguno se rechaza
+        
+        Returns:
+            (True/False, mensaje, {'aplicados', 'rechazados', 'notificaciones'})
+        """
+        resultado = self.gestor.cambiar_estado_lote(
+            accion, ids_turno=ids_turno, matricula=matricula, desde=desde, hasta=hasta,
+            notificar=notificar, todo_o_nada=todo_o_nada)
+        
+        if resultado is None:
+            return False, "[ERROR] No se pudieron modificar los turnos", {}
+        
+        aplicados = len(resultado['aplicados'])
+        mensaje = f"[{'OK' if aplicados else 'ERROR'}] {aplicados} turno(s) modificado(s)"
+        if resultado['rechazados']:
+            mensaje += f", {len(resultado['rechazados'])} rechazado(s)"
+        if resultado['notificaciones']:
+            mensaje += f", {resultado['notificaciones']} paciente(s) a notificar"
+        
+        return aplicados > 0, mensaje, resultado
+
+    def cancelar_turnos_medico(self, matricula: int, desde: date, hasta: date = None) -> Tuple[bool, str, Dict]:
+        """Cancela los turnos de un médico en un rango de fechas (por ejemplo, si se enfermó)"""
+        return self.cambiar_estado_turnos('cancelar', matricula=matricula, desde=desde, hasta=hasta)
+
     # ========== LISTAR ==========
     def listar_turnos_programados(self) -> List[Dict]:
         """Lista turnos programados formateados"""
@@ -396,11 +479,8 @@ class TurnoController:
         Returns:
             Lista de turnos filtrados
         """
-        # Primero marcar automáticamente las inasistencias
-        self.marcar_inasistencias_automaticas()
-        
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar(solo_lectura=True):
             return []
         
         try:
@@ -462,10 +542,8 @@ class TurnoController:
         Obtiene turnos aplicando dos filtros: por fecha y por estado
         INCLUYENDO EL NOMBRE DE LA ESPECIALIDAD
         """
-        self.marcar_inasistencias_automaticas()
-        
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar(solo_lectura=True):
             return []
         
         try:
@@ -528,11 +606,16 @@ class TurnoController:
             db.desconectar()
             return []
     
-    def _mostrar_notificacion_terminal(self, id_turno, id_paciente, matricula, fecha, hora_inicio, hora_fin, id_consultorio):
-        """Muestra una notificación simulada en la terminal con todos los datos del turno"""
+    def _mostrar_notificacion_terminal(self, id_turno, id_paciente, matricula, fecha, hora_inicio, hora_fin, id_consultorio,
+                                       datos: Optional[Dict] = None):
+        """
+        Muestra una notificación simulada en la terminal con todos los datos del turno
+        
+        Si se pasan los datos (obtenidos con QUERY_DATOS_NOTIFICACION) no se vuelven a consultar.
+        """
         
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return
         
         try:
@@ -559,15 +642,14 @@ class TurnoController:
             LIMIT 1
             """
             
-            datos = db.obtener_registro(query, (id_consultorio, id_paciente, matricula))
+            if datos is None:
+                datos = db.obtener_registro(query, (id_consultorio, id_paciente, matricula))
             
             if not datos:
                 print("     ⚠ No se pudieron obtener los datos completos")
                 return
             
             # Formatear fecha y hora
-            from datetime import datetime, timedelta
-            
             if isinstance(hora_inicio, str):
                 hora_str = hora_inicio
             elif isinstance(hora_inicio, timedelta):
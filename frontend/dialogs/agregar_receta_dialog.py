@@ -220,7 +220,7 @@ class AgregarMedicamentoDialog:
     
     def _cargar_medicamentos(self):
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
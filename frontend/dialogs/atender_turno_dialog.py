@@ -249,128 +249,108 @@ Horario: {turno_data['horario']}"""
             messagebox.showwarning("Advertencia", "Fecha inválida (formato: YYYY-MM-DD)")
             return
         
-        # Guardar en la BD
+        # Guardar en la BD: historial, recetas, detalles y estado del turno
+        # se confirman juntos (un solo commit) o no se guarda nada
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
-            messagebox.showerror("Error", "No se pudo conectar a la base de datos")
-            return
         
         try:
-            # Obtener datos del turno
-            query_turno = """
-            SELECT t.id_paciente, t.id_turno
-            FROM Turno t
-            WHERE t.id_turno = %s
-            """
-            turno = db.obtener_registro(query_turno, (self.turno_data['id'],))
-            
-            if not turno:
-                messagebox.showerror("Error", "No se encontró el turno")
-                db.desconectar()
-                return
-            
-            # Insertar historial clínico con las columnas correctas de la BD
-            # Columnas reales: id_turno, id_paciente, diagnostico, tratamiento, notas, observaciones
-            query_historial = """
-            INSERT INTO Historial_clinico 
-            (id_turno, id_paciente, diagnostico, tratamiento, notas, observaciones)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            
-            # Usar 'notas' para las indicaciones
-            params_historial = (
-                turno['id_turno'],
-                turno['id_paciente'],
-                diagnostico,
-                tratamiento,
-                indicaciones,  # -> columna 'notas'
-                observaciones
-            )
-            
-            resultado = db.ejecutar_consulta(query_historial, params_historial)
-            
-            if resultado is None or resultado == 0:
-                messagebox.showerror("Error", "No se pudo guardar el historial clínico")
-                db.desconectar()
-                return
-            
-            # Obtener el ID del historial recién insertado
-            id_historial = db.get_last_insert_id()
-            
-            if not id_historial:
-                messagebox.showerror("Error", "No se pudo obtener el ID del historial")
-                db.desconectar()
-                return
-            
-            print(f"[DEBUG] Historial guardado con ID: {id_historial}")
-            
-            # Guardar recetas si existen
-            if self.recetas:
-                print(f"[DEBUG] Guardando {len(self.recetas)} receta(s)...")
+            with db.transaccion():
+                # Obtener datos del turno
+                query_turno = """
+                SELECT t.id_paciente, t.id_turno
+                FROM Turno t
+                WHERE t.id_turno = %s
+                """
+                turno = db.obtener_registro(query_turno, (self.turno_data['id'],))
+                
+                if not turno:
+                    raise ValueError("No se encontró el turno")
+                
+                # Insertar historial clínico con las columnas correctas de la BD
+                # Columnas reales: id_turno, id_paciente, diagnostico, tratamiento, notas, observaciones
+                query_historial = """
+                INSERT INTO Historial_clinico 
+                (id_turno, id_paciente, diagnostico, tratamiento, notas, observaciones)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                """
+                
+                # Usar 'notas' para las indicaciones
+                params_historial = (
+                    turno['id_turno'],
+                    turno['id_paciente'],
+                    diagnostico,
+                    tratamiento,
+                    indicaciones,  # -> columna 'notas'
+                    observaciones
+                )
+                
+                db.ejecutar_consulta(query_historial, params_historial)
+                
+                # Obtener el ID del historial recién insertado
+                id_historial = db.get_last_insert_id()
                 
-                for idx, receta in enumerate(self.recetas, 1):
-                    print(f"[DEBUG] Guardando receta #{idx}...")
+                if not id_historial:
+                    raise ValueError("No se pudo obtener el ID del historial")
+                
+                print(f"[DEBUG] Historial guardado con ID: {id_historial}")
+                
+                # Guardar recetas si existen (en lote)
+                if self.recetas:
+                    print(f"[DEBUG] Guardando {len(self.recetas)} receta(s)...")
                     
-                    # Insertar receta
                     query_receta = """
                     INSERT INTO Receta (id_historial, fecha_emision, fecha_vencimiento, observaciones)
                     VALUES (%s, %s, %s, %s)
                     """
-                    params_receta = (
-                        id_historial,
-                        fecha_obj,
-                        receta['fecha_vencimiento'],
-                        receta['observaciones']
-                    )
+                    params_recetas = [
+                        (id_historial, fecha_obj, receta['fecha_vencimiento'], receta['observaciones'])
+                        for receta in self.recetas
+                    ]
                     
-                    print(f"[DEBUG] Params receta: {params_receta}")
-                    resultado_receta = db.ejecutar_consulta(query_receta, params_receta)
+                    ids_recetas = db.ejecutar_lote(query_receta, params_recetas)['ids']
                     
-                    if resultado_receta and resultado_receta > 0:
-                        id_receta = db.get_last_insert_id()
-                        print(f"[DEBUG] Receta guardada con ID: {id_receta}")
-                        
-                        if not id_receta:
-                            print(f"[ERROR] No se pudo obtener ID de receta #{idx}")
-                            continue
-                        
-                        # Insertar detalles de la receta
-                        for det_idx, detalle in enumerate(receta['detalles'], 1):
-                            print(f"[DEBUG] Guardando detalle {det_idx}/{len(receta['detalles'])}...")
-                            
-                            query_detalle = """
-                            INSERT INTO Detalle_receta (id_receta, id_medicamento, dosis, indicaciones, cantidad)
-                            VALUES (%s, %s, %s, %s, %s)
-                            """
-                            params_detalle = (
-                                id_receta,
-                                detalle['id_medicamento'],
-                                detalle['dosis'],
-                                detalle['indicacion'],
-                                detalle['cantidad']
-                            )
-                            
-                            print(f"[DEBUG] Params detalle: {params_detalle}")
-                            resultado_detalle = db.ejecutar_consulta(query_detalle, params_detalle)
-                            
-                            if resultado_detalle and resultado_detalle > 0:
-                                print(f"[DEBUG] ✓ Detalle guardado")
-                            else:
-                                print(f"[ERROR] ✗ Error guardando detalle")
-                    else:
-                        print(f"[ERROR] Error al guardar receta #{idx}")
-            
-            # Actualizar estado del turno a "Atendido"
-            query_turno_update = """
-            UPDATE Turno 
-            SET estado = 'Atendido'
-            WHERE id_turno = %s
-            """
-            
-            db.ejecutar_consulta(query_turno_update, (self.turno_data['id'],))
-            
-            db.desconectar()
-            
+                    if len(ids_recetas) != len(self.recetas):
+                        raise ValueError("No se pudieron obtener los IDs de las recetas")
+                    
+                    print(f"[DEBUG] Recetas guardadas con ID: {ids_recetas}")
+                    
+                    # Insertar los detalles de todas las recetas
+                    query_detalle = """
+                    INSERT INTO Detalle_receta (id_receta, id_medicamento, dosis, indicaciones, cantidad)
+                    VALUES (%s, %s, %s, %s, %s)
+                    """
+                    params_detalles = [
+                        (
+                            id_receta,
+                            detalle['id_medicamento'],
+                            detalle['dosis'],
+                            detalle['indicacion'],
+                            detalle['cantidad']
+                        )
+                        for id_receta, receta in zip(ids_recetas, self.recetas)
+                        for detalle in receta['detalles']
+                    ]
+                    
+                    resultado_detalles = db.ejecutar_lote(query_detalle, params_detalles)
+                    print(f"[DEBUG] ✓ {sum(resultado_detalles['filas_por_lote'])} detalle(s) guardado(s)")
+                
+                # Actualizar estado del turno a "Atendido"
+                query_turno_update = """
+                UPDATE Turno 
+                SET estado = 'Atendido'
+                WHERE id_turno = %s
+                """
+                
+                db.ejecutar_consulta(query_turno_update, (self.turno_data['id'],))
+        
+        except ConnectionError:
+            messagebox.showerror("Error", "No se pudo conectar a la base de datos")
+            return
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al guardar: {str(e)}")
+            return
+        
+        try:
             mensaje_exito = "✓ Turno atendido y historial clínico registrado exitosamente"
             if self.recetas:
                 mensaje_exito += f"\n✓ Se guardaron {len(self.recetas)} receta(s) médica(s)"
@@ -394,7 +374,6 @@ Horario: {turno_data['horario']}"""
             self.window.destroy()
         
         except Exception as e:
-            db.desconectar()
             messagebox.showerror("Error", f"Error al guardar: {str(e)}")
     
     def _imprimir_receta(self, id_historial, fecha_emision):
@@ -402,7 +381,7 @@ Horario: {turno_data['horario']}"""
         try:
             # Buscar la receta asociada al historial
             db = Database()
-            if not db.conectar("127.0.0.1:3306/hospital_db"):
+            if not db.conectar():
                 messagebox.showerror("Error", "No se pudo conectar a la base de datos")
                 return
             
@@ -120,7 +120,7 @@ class CrearMedicoDialog:
     def _cargar_especialidades(self):
         """Carga las especialidades desde la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
@@ -47,7 +47,7 @@ class ProgramarTurnoDialog:
     def _obtener_especialidades_directo(self):
         """Obtiene especialidades directamente de la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
@@ -63,7 +63,7 @@ class ProgramarTurnoDialog:
     def _obtener_medicos_directo(self):
         """Obtiene médicos directamente de la BD con sus especialidades"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
@@ -197,7 +197,7 @@ class ProgramarTurnoDialog:
     def _obtener_medicos_por_especialidad(self, id_especialidad: int):
         """Obtiene médicos que tienen una especialidad específica"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return []
         
         try:
@@ -268,21 +268,14 @@ class ProgramarTurnoDialog:
         self.titulo.config(text=f"PASO 3/4: Seleccionar Turno - Dr/Dra. {self.medico_seleccionado['nombre']} {self.medico_seleccionado['apellido']}")
         self._limpiar_frame()
         
-        turnos = self.controller.obtener_turnos_libres_medico(self.medico_seleccionado['matricula'])
+        # Todo el horizonte, ya agrupado por fecha
+        turnos_por_fecha = self.controller.obtener_turnos_libres_por_fecha(self.medico_seleccionado['matricula'])
         
-        if not turnos:
+        if not turnos_por_fecha:
             messagebox.showwarning("Advertencia", "Este médico no tiene turnos disponibles")
             self._mostrar_paso_2_medicos()
             return
         
-        # Agrupar por fecha
-        turnos_por_fecha = {}
-        for t in turnos:
-            fecha = str(t['fecha'])
-            if fecha not in turnos_por_fecha:
-                turnos_por_fecha[fecha] = []
-            turnos_por_fecha[fecha].append(t)
-        
         # Frame de navegación
         nav_frame = ttk.Frame(self.frame_paso)
         nav_frame.pack(fill="x", pady=(0, 10))
@@ -365,6 +358,7 @@ class ProgramarTurnoDialog:
         
         # Horarios únicos
         horarios = sorted(set(str(t['hora_inicio']) for t in turnos_fecha))
+        por_celda = {(str(t['hora_inicio']), t['consultorio_numero']): t for t in turnos_fecha}
         
         # Dibujar celdas
         y = y_inicio + 40
@@ -377,7 +371,7 @@ class ProgramarTurnoDialog:
                 x = x_inicio + (i + 1) * ancho_celda
                 
                 # Buscar turno
-                turno = next((t for t in turnos_fecha if str(t['hora_inicio']) == hora and t['consultorio_numero'] == cons), None)
+                turno = por_celda.get((hora, cons))
                 
                 if turno:
                     # Botón disponible (verde)
@@ -518,10 +512,9 @@ Consultorio: #{self.turno_seleccionado['consultorio_numero']}"""
         observaciones = self.text_observaciones.get("1.0", "end-1c").strip()
         
         # Llamar al controlador CON la especialidad
-        exito, mensaje = self.controller.programar_turno_con_especialidad(
+        exito, mensaje = self.controller.programar_turno_libre(
             id_paciente=self.paciente_seleccionado['id_paciente'],
-            matricula=self.medico_seleccionado['matricula'],
-            id_turno=self.turno_seleccionado['id_turno'],
+            turno=self.turno_seleccionado,
             id_especialidad=self.especialidad_seleccionada['id_especialidad'],
             observaciones=observaciones
         )
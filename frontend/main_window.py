@@ -12,6 +12,8 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from gestores.scheduler_notificaciones import SchedulerNotificaciones
+from gestores.scheduler_turnos import SchedulerTurnos
+from data.database import Database
 
 
 def run_app():
@@ -26,6 +28,10 @@ def run_app():
     scheduler.iniciar()
     print("📲 Sistema de notificaciones automáticas activado")
 
+    # Los turnos libres se calculan desde las agendas; el scheduler depura los vencidos
+    scheduler_turnos = SchedulerTurnos(dias_horizonte=30, materializar=False)
+    scheduler_turnos.iniciar()
+
     nb = ttk.Notebook(root)
     nb.pack(fill="both", expand=True)
 
@@ -38,6 +44,8 @@ def run_app():
     # Detener scheduler al cerrar la aplicación
     def on_closing():
         scheduler.detener()
+        scheduler_turnos.detener()
+        Database.cerrar_pools()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
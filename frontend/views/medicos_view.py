@@ -108,7 +108,7 @@ class MedicosView(ttk.Frame):
     def _cargar_especialidades(self):
         """Carga las especialidades desde la BD"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return
         
         try:
@@ -274,7 +274,7 @@ class MedicosView(ttk.Frame):
     def _refresh(self):
         """Recarga la lista de médicos con sus especialidades"""
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             self.todos_medicos = []
             self.medicos_filtrados = []
             self._repoblar_tabla()
@@ -73,7 +73,7 @@ class ReportesView(ttk.Frame):
         """Consulta la BD y muestra reporte de turnos por médico"""
         try:
             db = Database()
-            if not db.conectar():
+            if not db.conectar(solo_lectura=True):
                 messagebox.showerror("Error", "No se pudo conectar a la BD")
                 return
 
@@ -124,7 +124,7 @@ class ReportesView(ttk.Frame):
         """Consulta la BD y muestra reporte de turnos por especialidad"""
         try:
             db = Database()
-            if not db.conectar():
+            if not db.conectar(solo_lectura=True):
                 messagebox.showerror("Error", "No se pudo conectar a la BD")
                 return
 
@@ -171,7 +171,7 @@ class ReportesView(ttk.Frame):
         """Genera el reporte con las fechas seleccionadas"""
         try:
             db = Database()
-            if not db.conectar():
+            if not db.conectar(solo_lectura=True):
                 messagebox.showerror("Error", "No se pudo conectar a la BD")
                 return
 
@@ -213,12 +213,13 @@ class ReportesView(ttk.Frame):
         ORDER BY t.fecha DESC, m.nombre, p.apellido, p.nombre
         """
 
-        resultados = db.obtener_registros(query, (fecha_inicio, fecha_fin))
+        # Se procesa en streaming: no hace falta tener todas las filas en memoria
+        resultados = db.iterar_registros(query, (fecha_inicio, fecha_fin))
         return self._procesar_reporte(resultados, fecha_inicio, fecha_fin)
 
     @staticmethod
     def _procesar_reporte(resultados, fecha_inicio, fecha_fin):
-        """Procesa los resultados en estructura legible"""
+        """Procesa los resultados (lista o iterador de filas) en estructura legible"""
         reporte = {
             'fecha_inicio': fecha_inicio,
             'fecha_fin': fecha_fin,
@@ -303,17 +304,7 @@ class ReportesView(ttk.Frame):
         )
 
         try:
-            db_config = Database()
-
-            png = grafico_asistencia_bd(
-                ruta,
-                host=db_config.host,
-                user=db_config.user,
-                password=db_config.password,
-                database=db_config.database,
-                port=db_config.port,
-                tipo="pie"
-            )
+            png = grafico_asistencia_bd(ruta, tipo="pie")
 
             messagebox.showinfo("Reporte listo", f"Gráfico generado en:\n{png}")
 
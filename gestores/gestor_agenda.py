@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict
 from datetime import time
 import sys
 import os
@@ -13,10 +13,35 @@ from data.database import Database
 class GestorAgenda:
     """Clase gestora de operaciones ABMC de agendas"""
     
+    # Funciones a llamar con el id_agenda cada vez que una agenda se modifica
+    # o se da de baja (ver SchedulerTurnos)
+    _observadores: List[Callable[[int], None]] = []
+    
     def __init__(self):
         self.__agendas: List[Agenda] = []
         self.__agendas_bd: List[Dict] = []  # Almacenar datos de BD
     
+    # ========== OBSERVADORES ==========
+    @classmethod
+    def agregar_observador(cls, funcion: Callable[[int], None]) -> None:
+        """Registra una función que recibe el id_agenda de cada agenda modificada o dada de baja"""
+        if funcion not in cls._observadores:
+            cls._observadores.append(funcion)
+    
+    @classmethod
+    def quitar_observador(cls, funcion: Callable[[int], None]) -> None:
+        """Deja de notificar a una función registrada con agregar_observador"""
+        if funcion in cls._observadores:
+            cls._observadores.remove(funcion)
+    
+    def _notificar_cambio(self, id_agenda: int) -> None:
+        """Avisa a los observadores que cambió una agenda"""
+        for funcion in list(GestorAgenda._observadores):
+            try:
+                funcion(id_agenda)
+            except Exception as e:
+                print(f"[WARNING] Error al notificar cambio de agenda #{id_agenda}: {str(e)}")
+    
     # ========== CARGAR DE BASE DE DATOS ==========
     def cargar_agendas_bd(self) -> bool:
         """
@@ -27,7 +52,7 @@ class GestorAgenda:
         """
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
@@ -155,7 +180,7 @@ class GestorAgenda:
         """
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
@@ -188,6 +213,7 @@ class GestorAgenda:
                 # Recargar agendas de BD
                 self.__agendas_bd = []
                 db.desconectar()
+                self._notificar_cambio(id_agenda)
                 return True
             else:
                 print("[ERROR] No se pudo eliminar la agenda")
@@ -217,7 +243,7 @@ class GestorAgenda:
         """
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
@@ -258,6 +284,7 @@ class GestorAgenda:
                 # Recargar agendas de BD
                 self.__agendas_bd = []
                 db.desconectar()
+                self._notificar_cambio(id_agenda)
                 return True
             else:
                 print("[ERROR] No se pudo modificar la agenda")
@@ -282,7 +309,7 @@ class GestorAgenda:
         """
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
@@ -0,0 +1,350 @@
+from typing import List, Optional, Dict, Set, Tuple
+from datetime import date, datetime, time, timedelta
+import sys
+import os
+from mysql.connector.errors import IntegrityError
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agenda import DURACION_TURNO_MINUTOS
+from data.database import Database
+from data.generar_turnos import a_minutos, calcular_slots
+
+
+# Estados que ocupan el horario del médico (un turno Cancelado lo libera)
+ESTADOS_OCUPADOS = ('Programado', 'Atendido', 'Inasistencia')
+
+
+class GestorDisponibilidad:
+    """
+    Calcula los turnos libres a partir de las agendas y de los turnos ya
+    reservados, sin necesidad de tener filas 'Libre' pre-generadas en Turno.
+    La fila del turno se inserta recién al reservarlo.
+
+    Si existen filas 'Libre' (generadas por data/generar_turnos.py) se siguen
+    usando: el turno libre calculado trae su id_turno y al reservarlo se
+    actualiza esa fila en lugar de insertar una nueva.
+    """
+
+    def __init__(self, dias_horizonte: int = 30,
+                 duracion_minutos: int = DURACION_TURNO_MINUTOS):
+        """
+        Args:
+            dias_horizonte: Días hacia adelante a considerar (default: 30)
+            duracion_minutos: Duración de cada turno (default: 30)
+        """
+        self.dias_horizonte = dias_horizonte
+        self.duracion_minutos = duracion_minutos
+
+    # ========== CONSULTA ==========
+    def turnos_libres(self, matriculas: List[int], desde: Optional[date] = None,
+                      hasta: Optional[date] = None) -> List[Dict]:
+        """
+        Turnos libres de uno o más médicos, ordenados por fecha y hora
+
+        Args:
+            matriculas: Médicos a consultar
+            desde: Primera fecha (por defecto hoy)
+            hasta: Última fecha, exclusive (por defecto desde + dias_horizonte)
+
+        Returns:
+            Lista de diccionarios con id_turno (None si el turno no está
+            materializado), id_agenda, matricula, id_consultorio,
+            consultorio_numero, fecha, hora_inicio y hora_fin; o None si no
+            se pudo consultar la BD
+        """
+        if not matriculas:
+            return []
+        desde = desde or date.today()
+        hasta = hasta or desde + timedelta(days=self.dias_horizonte)
+
+        db = Database()
+        # Siempre del principal: en la réplica un turno recién reservado
+        # podría aparecer libre hasta que se ponga al día
+        if not db.conectar():
+            return None
+
+        try:
+            marcadores = ", ".join(["%s"] * len(matriculas))
+            agendas = db.obtener_registros(f"""
+                SELECT a.id_agenda, a.matricula, a.id_consultorio, a.dia_semana,
+                       a.hora_inicio, a.hora_fin, c.numero as consultorio_numero
+                FROM Agenda a
+                JOIN Consultorio c ON a.id_consultorio = c.id_consultorio
+                WHERE a.activa = TRUE AND a.matricula IN ({marcadores})
+            """, tuple(matriculas)) or []
+
+            if not agendas:
+                return []
+
+            turnos = db.obtener_registros(f"""
+                SELECT id_turno, matricula, fecha, hora_inicio, estado
+                FROM Turno
+                WHERE matricula IN ({marcadores}) AND fecha >= %s AND fecha < %s
+                  AND estado IN ('Libre', {", ".join(["%s"] * len(ESTADOS_OCUPADOS))})
+            """, tuple(matriculas) + (desde, hasta) + ESTADOS_OCUPADOS) or []
+        except Exception as e:
+            print(f"[ERROR] Error al calcular disponibilidad: {str(e)}")
+            return None
+        finally:
+            db.desconectar()
+
+        ocupados, materializados = self._clasificar_turnos(turnos)
+        return self._armar_libres(agendas, desde, hasta, ocupados, materializados)
+
+    def _clasificar_turnos(self, turnos: List[Dict]) -> Tuple[Set[Tuple], Dict[Tuple, int]]:
+        """Separa los horarios ocupados de las filas 'Libre' ya materializadas"""
+        ocupados: Set[Tuple[int, date, int]] = set()
+        materializados: Dict[Tuple[int, date, int], int] = {}
+        for turno in turnos:
+            clave = (turno['matricula'], turno['fecha'], a_minutos(turno['hora_inicio']))
+            if turno['estado'] == 'Libre':
+                materializados.setdefault(clave, turno['id_turno'])
+            else:
+                ocupados.add(clave)
+        return ocupados, materializados
+
+    def _armar_libres(self, agendas: List[Dict], desde: date, hasta: date,
+                      ocupados: Set[Tuple], materializados: Dict[Tuple, int]) -> List[Dict]:
+        """Expande las agendas y descarta los horarios ocupados o ya pasados"""
+        numeros = {a['id_agenda']: a['consultorio_numero'] for a in agendas}
+        ahora = datetime.now()
+        hoy, hora_actual = ahora.date(), ahora.time()
+
+        libres = []
+        for matricula, id_consultorio, id_agenda, fecha, hora_inicio, hora_fin in calcular_slots(
+                agendas, desde, hasta, duracion_minutos=self.duracion_minutos):
+            if fecha < hoy or (fecha == hoy and hora_inicio <= hora_actual):
+                continue
+            clave = (matricula, fecha, hora_inicio.hour * 60 + hora_inicio.minute)
+            if clave in ocupados:
+                continue
+            libres.append({
+                'id_turno': materializados.get(clave),
+                'id_agenda': id_agenda,
+                'matricula': matricula,
+                'id_consultorio': id_consultorio,
+                'consultorio_numero': numeros[id_agenda],
+                'fecha': fecha,
+                'hora_inicio': hora_inicio,
+                'hora_fin': hora_fin,
+            })
+
+        libres.sort(key=lambda t: (t['fecha'], t['hora_inicio'], t['consultorio_numero']))
+        return libres
+
+    # ========== RESERVA ==========
+    def reservar(self, id_paciente: int, id_agenda: int, fecha: date, hora_inicio: time,
+                 id_especialidad: Optional[int] = None,
+                 observaciones: str = "") -> Tuple[bool, str, Optional[int]]:
+        """
+        Reserva un turno libre calculado: actualiza su fila 'Libre' si existe,
+        o inserta la fila del turno ya como 'Programado'
+
+        Args:
+            id_paciente: ID del paciente
+            id_agenda: Agenda a la que pertenece el turno
+            fecha: Fecha del turno
+            hora_inicio: Hora de inicio del turno
+            id_especialidad: Especialidad seleccionada (opcional)
+            observaciones: Observaciones adicionales
+
+        Returns:
+            (True/False, mensaje, id_turno reservado o None)
+        """
+        ahora = datetime.now()
+        if fecha < ahora.date() or (fecha == ahora.date() and a_minutos(hora_inicio) <= a_minutos(ahora.time())):
+            return False, "[ERROR] La fecha ya pasó", None
+
+        db = Database()
+
+        try:
+            with db.transaccion():
+                # Bloquear la agenda serializa las reservas concurrentes de ese médico
+                agenda = db.obtener_registro("""
+                    SELECT id_agenda, matricula, id_consultorio, dia_semana, hora_inicio, hora_fin
+                    FROM Agenda
+                    WHERE id_agenda = %s AND activa = TRUE
+                    FOR UPDATE
+                """, (id_agenda,))
+
+                if not agenda:
+                    return False, "[ERROR] Agenda no encontrada o inactiva", None
+
+                hora_fin = self._hora_fin_en_agenda(agenda, fecha, hora_inicio)
+                if hora_fin is None:
+                    return False, "[ERROR] El horario no corresponde a la agenda del médico", None
+
+                # Lectura bloqueante: ve los turnos confirmados por programar_turno o por
+                # otra agenda del mismo médico aunque la transacción haya empezado antes
+                ocupado = db.obtener_registro(f"""
+                    SELECT id_turno FROM Turno
+                    WHERE matricula = %s AND fecha = %s AND hora_inicio = %s
+                      AND estado IN ({", ".join(["%s"] * len(ESTADOS_OCUPADOS))})
+                    LIMIT 1
+                    FOR UPDATE
+                """, (agenda['matricula'], fecha, hora_inicio) + ESTADOS_OCUPADOS)
+
+                if ocupado:
+                    return False, "[ERROR] El turno ya fue tomado", None
+
+                libre = db.obtener_registro("""
+                    SELECT id_turno FROM Turno
+                    WHERE id_agenda = %s AND fecha = %s AND hora_inicio = %s AND estado = 'Libre'
+                    LIMIT 1
+                    FOR UPDATE
+                """, (id_agenda, fecha, hora_inicio))
+
+                if libre:
+                    # La fila 'Libre' también se puede tomar por id (TurnoController.programar_turno),
+                    # sin pasar por el bloqueo de la agenda: el UPDATE solo vale si sigue libre
+                    tomadas = db.ejecutar_consulta("""
+                        UPDATE Turno
+                        SET id_paciente = %s, id_especialidad = %s, estado = 'Programado', observaciones = %s
+                        WHERE id_turno = %s AND estado = 'Libre'
+                    """, (id_paciente, id_especialidad, observaciones, libre['id_turno']))
+                    if not tomadas:
+                        return False, "[ERROR] El turno ya fue tomado", None
+                    id_turno = libre['id_turno']
+                else:
+                    db.ejecutar_consulta("""
+                        INSERT INTO Turno (id_paciente, matricula, id_consultorio, id_agenda, id_especialidad,
+                                           fecha, hora_inicio, hora_fin, estado, observaciones)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'Programado', %s)
+                    """, (id_paciente, agenda['matricula'], agenda['id_consultorio'], id_agenda,
+                          id_especialidad, fecha, hora_inicio, hora_fin, observaciones))
+                    id_turno = db.get_last_insert_id()
+
+            return True, "[OK] Turno programado exitosamente", id_turno
+
+        except ConnectionError:
+            return False, "[ERROR] No se pudo conectar a la base de datos", None
+        except IntegrityError as e:
+            # unique_slot_programado: otra reserva tomó el horario al mismo tiempo
+            if e.errno == 1062:
+                return False, "[ERROR] El turno ya fue tomado", None
+            return False, f"[ERROR] {str(e)}", None
+        except Exception as e:
+            return False, f"[ERROR] {str(e)}", None
+
+    def reservar_serie(self, id_paciente: int, matricula: int, fechas: List[date], hora_inicio: time,
+                       id_especialidad: Optional[int] = None, observaciones: str = "",
+                       todo_o_nada: bool = False) -> Optional[Dict]:
+        """
+        Reserva el mismo horario del médico en varias fechas, en una única
+        transacción: una consulta para las agendas, una para los turnos ya
+        existentes en esas fechas y un lote de UPDATE/INSERT para los libres
+
+        Args:
+            id_paciente: ID del paciente
+            matricula: Médico
+            fechas: Fechas de la serie
+            hora_inicio: Hora de inicio del turno en cada fecha
+            id_especialidad: Especialidad seleccionada (opcional)
+            observaciones: Observaciones adicionales
+            todo_o_nada: Si es True y alguna fecha no está disponible, no se reserva ninguna
+
+        Returns:
+            Diccionario con:
+              - 'reservados': [{'fecha', 'hora_inicio', 'hora_fin', 'id_turno'}]
+              - 'conflictos': [{'fecha', 'motivo'}]
+            o None si hubo un error (en ese caso no se reserva nada)
+        """
+        if not fechas:
+            return {'reservados': [], 'conflictos': []}
+
+        db = Database()
+        ahora = datetime.now()
+        minutos = a_minutos(hora_inicio)
+
+        try:
+            with db.transaccion():
+                # Bloquear las agendas del médico serializa sus reservas concurrentes
+                agendas = db.obtener_registros("""
+                    SELECT id_agenda, matricula, id_consultorio, dia_semana, hora_inicio, hora_fin
+                    FROM Agenda
+                    WHERE matricula = %s AND activa = TRUE
+                    FOR UPDATE
+                """, (matricula,)) or []
+
+                marcadores = ", ".join(["%s"] * len(fechas))
+                existentes = db.obtener_registros(f"""
+                    SELECT id_turno, id_agenda, fecha, estado FROM Turno
+                    WHERE matricula = %s AND hora_inicio = %s AND fecha IN ({marcadores})
+                      AND estado IN ('Libre', {", ".join(["%s"] * len(ESTADOS_OCUPADOS))})
+                    FOR UPDATE
+                """, (matricula, hora_inicio) + tuple(fechas) + ESTADOS_OCUPADOS) or []
+
+                ocupadas = {t['fecha'] for t in existentes if t['estado'] != 'Libre'}
+                libres = {(t['id_agenda'], t['fecha']): t['id_turno'] for t in existentes if t['estado'] == 'Libre'}
+
+                reservados, conflictos = [], []
+                actualizar, insertar = [], []
+                for fecha in sorted(set(fechas)):
+                    if fecha < ahora.date() or (fecha == ahora.date() and minutos <= a_minutos(ahora.time())):
+                        conflictos.append({'fecha': fecha, 'motivo': "La fecha ya pasó"})
+                        continue
+                    if fecha in ocupadas:
+                        conflictos.append({'fecha': fecha, 'motivo': "El turno ya fue tomado"})
+                        continue
+
+                    agenda, hora_fin = None, None
+                    for candidata in agendas:
+                        hora_fin = self._hora_fin_en_agenda(candidata, fecha, hora_inicio)
+                        if hora_fin is not None:
+                            agenda = candidata
+                            break
+                    if agenda is None:
+                        conflictos.append({'fecha': fecha, 'motivo': "El médico no atiende en ese día y horario"})
+                        continue
+
+                    turno = {'fecha': fecha, 'hora_inicio': hora_inicio, 'hora_fin': hora_fin,
+                             'id_turno': libres.get((agenda['id_agenda'], fecha))}
+                    if turno['id_turno'] is not None:
+                        actualizar.append((id_paciente, id_especialidad, observaciones, turno['id_turno']))
+                    else:
+                        insertar.append((id_paciente, matricula, agenda['id_consultorio'], agenda['id_agenda'],
+                                         id_especialidad, fecha, hora_inicio, hora_fin, observaciones))
+                    reservados.append(turno)
+
+                if todo_o_nada and conflictos:
+                    return {'reservados': [], 'conflictos': conflictos}
+
+                if actualizar:
+                    db.ejecutar_lote("""
+                        UPDATE Turno
+                        SET id_paciente = %s, id_especialidad = %s, estado = 'Programado', observaciones = %s
+                        WHERE id_turno = %s AND estado = 'Libre'
+                    """, actualizar)
+
+                if insertar:
+                    resultado = db.ejecutar_lote("""
+                        INSERT INTO Turno (id_paciente, matricula, id_consultorio, id_agenda, id_especialidad,
+                                           fecha, hora_inicio, hora_fin, estado, observaciones)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'Programado', %s)
+                    """, insertar)
+                    # Los INSERT se enviaron en el mismo orden que los turnos sin id
+                    ids = iter(resultado['ids'])
+                    for turno in reservados:
+                        if turno['id_turno'] is None:
+                            turno['id_turno'] = next(ids, None)
+
+            return {'reservados': reservados, 'conflictos': conflictos}
+
+        except Exception as e:
+            print(f"[ERROR] Error al reservar la serie de turnos: {str(e)}")
+            return None
+
+    def _hora_fin_en_agenda(self, agenda: Dict, fecha: date, hora_inicio: time) -> Optional[time]:
+        """Hora de fin del turno si (fecha, hora_inicio) es un turno válido de la agenda"""
+        slots = calcular_slots([agenda], fecha, fecha + timedelta(days=1),
+                               duracion_minutos=self.duracion_minutos)
+        minutos = a_minutos(hora_inicio)
+        for _, _, _, _, inicio, fin in slots:
+            if inicio.hour * 60 + inicio.minute == minutos:
+                return fin
+        return None
+
+    def __repr__(self) -> str:
+        return f"GestorDisponibilidad(horizonte={self.dias_horizonte} días, turno={self.duracion_minutos} min)"
@@ -143,7 +143,7 @@ def guardar_en_base_datos(gestor: GestorEspecialidad) -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -192,7 +192,7 @@ def listar_especialidades_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -246,7 +246,7 @@ def eliminar_especialidad_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -305,7 +305,7 @@ def modificar_especialidad_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
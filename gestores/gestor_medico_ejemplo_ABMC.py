@@ -219,7 +219,7 @@ def guardar_en_base_datos(gestor: GestorMedico) -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -280,7 +280,7 @@ def listar_medicos_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -341,7 +341,7 @@ def eliminar_medico_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -391,7 +391,7 @@ def modificar_medico_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
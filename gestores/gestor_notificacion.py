@@ -1,15 +1,54 @@
 ﻿from datetime import datetime, timedelta
 from data.database import Database
 import os
+import threading
+import uuid
+from typing import Callable, List, Optional
 from dotenv import load_dotenv
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from gestores.mailer_smtp import MailerSMTP
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Resultado de un envío (ver registrar_resultados)
+ENVIADO = 'Enviado'
+REINTENTO = 'Reintento'
+ERROR = 'Error'
+
+# Un envío fallido no se vuelve a reclamar antes de este tiempo
+ESPERA_REINTENTO_SEGUNDOS = 300
+
+# Notificaciones con los datos del mensaje y el mejor contacto del paciente para
+# su medio (destinatario; None si no tiene). COLLATE explícito: Contactos_Paciente
+# puede tener otra collation que Notificacion
+QUERY_NOTIFICACIONES = '''
+SELECT n.id_notificacion, n.id_turno, n.medio_envio, n.intentos, n.tipo,
+       t.fecha, t.hora_inicio, t.id_paciente,
+       p.nombre, p.apellido,
+       m.nombre as medico_nombre, m.apellido as medico_apellido,
+       (SELECT cp.valor_contacto FROM Contactos_Paciente cp
+        WHERE cp.id_paciente = t.id_paciente AND cp.activo = TRUE
+          AND cp.tipo_contacto = n.medio_envio COLLATE utf8mb4_unicode_ci
+        ORDER BY cp.es_principal DESC, cp.id_contacto
+        LIMIT 1) as destinatario
+FROM Notificacion n
+JOIN Turno t ON n.id_turno = t.id_turno
+JOIN Paciente p ON t.id_paciente = p.id_paciente
+JOIN Medico m ON t.matricula = m.matricula
+'''
+
+# Pendientes a enviar: vencidas, con intentos disponibles y sin reserva vigente
+CONDICION_PENDIENTES = '''
+n.estado = 'Pendiente'
+AND n.fecha_hora_envio <= NOW()
+AND n.intentos < 3
+AND (n.lease_hasta IS NULL OR n.lease_hasta < NOW())
+'''
+
 class GestorNotificacion:
+    # Funciones que reciben la fecha_hora_envio de cada notificación creada
+    _observadores: List[Callable[[datetime], None]] = []
+    
     def __init__(self):
         self.db = Database()
         
@@ -17,33 +56,57 @@ class GestorNotificacion:
         self.email_sender = os.getenv('EMAIL_SENDER')
         self.email_password = os.getenv('EMAIL_PASSWORD')
         
+        # Una sesión SMTP por hilo, reutilizada por toda la tanda de envíos
+        self._local = threading.local()
+        self._mailers = []
+        self._lock_mailers = threading.Lock()
+    
+    @property
+    def mailer(self) -> MailerSMTP:
+        '''Sesión SMTP del hilo actual (cada hilo de envío tiene la suya)'''
+        mailer = getattr(self._local, 'mailer', None)
+        if mailer is None:
+            mailer = MailerSMTP.desde_entorno()
+            with self._lock_mailers:
+                self._local.mailer = mailer
+                self._mailers.append(mailer)
+        return mailer
+        
     def enviar_email(self, destinatario: str, asunto: str, mensaje: str) -> tuple:
-        '''Envía email usando Gmail SMTP'''
-        try:
-            if not all([self.email_sender, self.email_password]):
-                return False, 'Credenciales de email no configuradas en .env'
-            
-            # Crear mensaje
-            msg = MIMEMultipart()
-            msg['From'] = self.email_sender
-            msg['To'] = destinatario
-            msg['Subject'] = asunto
-            
-            msg.attach(MIMEText(mensaje, 'plain', 'utf-8'))
-            
-            # Conectar a Gmail
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(self.email_sender, self.email_password)
-            
-            # Enviar
-            server.send_message(msg)
-            server.quit()
-            
-            return True, f'Email enviado a {destinatario}'
-            
-        except Exception as e:
-            return False, f'Error al enviar email: {str(e)}'
+        '''Envía email por la sesión SMTP abierta (ver MailerSMTP)'''
+        return self.mailer.enviar(destinatario, asunto, mensaje)
+    
+    def cerrar_conexiones(self):
+        '''
+        Cierra las sesiones SMTP al terminar una tanda de envíos (o al cerrar
+        el pool de hilos) y las olvida: cada hilo crea una nueva en su próximo
+        envío, así la lista no crece con los hilos de pools anteriores
+        '''
+        with self._lock_mailers:
+            mailers, self._mailers = self._mailers, []
+            self._local = threading.local()
+        for mailer in mailers:
+            mailer.cerrar()
+    
+    @classmethod
+    def agregar_observador(cls, funcion: Callable[[datetime], None]) -> None:
+        '''Registra una función que recibe la fecha_hora_envio de cada notificación creada'''
+        if funcion not in cls._observadores:
+            cls._observadores.append(funcion)
+    
+    @classmethod
+    def quitar_observador(cls, funcion: Callable[[datetime], None]) -> None:
+        '''Deja de notificar a una función registrada con agregar_observador'''
+        if funcion in cls._observadores:
+            cls._observadores.remove(funcion)
+    
+    def _notificar_nueva(self, fecha_hora_envio: datetime) -> None:
+        '''Avisa a los observadores (p.ej. el scheduler) que hay una notificación nueva'''
+        for funcion in list(GestorNotificacion._observadores):
+            try:
+                funcion(fecha_hora_envio)
+            except Exception as e:
+                print(f'[WARNING] Error al avisar notificación nueva: {str(e)}')
     
     def crear_notificacion_turno(self, id_turno: int, contacto_adicional: str = None) -> bool:
         '''Crea notificación automática para un turno'''
@@ -117,6 +180,7 @@ class GestorNotificacion:
             
             if resultado:
                 print(f'✓ Notificación {medio_envio} creada para turno {id_turno} - Envío: {fecha_hora_envio}')
+                self._notificar_nueva(fecha_hora_envio)
                 return True
             else:
                 print(f'[ERROR] No se pudo crear notificación para turno {id_turno}')
@@ -129,23 +193,16 @@ class GestorNotificacion:
             self.db.desconectar()
 
     def obtener_notificaciones_pendientes(self) -> list:
-        '''Obtiene notificaciones pendientes'''
+        '''
+        Obtiene notificaciones pendientes no reclamadas, cada una con el mejor
+        contacto del paciente para su medio (destinatario; None si no tiene)
+        '''
         try:
             if not self.db.conectar():
                 return []
 
-            query = '''
-            SELECT n.id_notificacion, n.id_turno, n.medio_envio, n.intentos,
-                   t.fecha, t.hora_inicio, t.id_paciente,
-                   p.nombre, p.apellido,
-                   m.nombre as medico_nombre, m.apellido as medico_apellido
-            FROM Notificacion n
-            JOIN Turno t ON n.id_turno = t.id_turno
-            JOIN Paciente p ON t.id_paciente = p.id_paciente
-            JOIN Medico m ON t.matricula = m.matricula
-            WHERE n.estado = 'Pendiente'
-              AND n.fecha_hora_envio <= NOW()
-              AND n.intentos < 3
+            query = f'''{QUERY_NOTIFICACIONES}
+            WHERE {CONDICION_PENDIENTES}
             ORDER BY n.fecha_hora_envio
             '''
             
@@ -157,34 +214,152 @@ class GestorNotificacion:
         finally:
             self.db.desconectar()
 
-    def procesar_notificacion(self, notif: dict) -> bool:
-        '''Procesa y envía una notificación individual'''
+    def proxima_notificacion(self) -> Optional[datetime]:
+        '''
+        Momento en que se podrá enviar la próxima notificación pendiente (su
+        fecha_hora_envio o, si está reservada o esperando un reintento, el fin
+        de esa espera)
+        
+        Returns:
+            Fecha y hora, o None si no hay pendientes (o no se pudo consultar)
+        '''
         try:
-            id_notificacion = notif['id_notificacion']
-            medio = notif['medio_envio']
-            id_paciente = notif['id_paciente']
-            
-            # Obtener contacto del paciente
             if not self.db.conectar():
-                return False
+                return None
             
-            query_contacto = '''
-            SELECT valor_contacto FROM Contactos_Paciente
-            WHERE id_paciente = %s AND tipo_contacto = %s AND activo = TRUE
-            ORDER BY es_principal DESC LIMIT 1
-            '''
-            contactos = self.db.obtener_registros(query_contacto, (id_paciente, medio))
+            proxima = self.db.obtener_registro('''
+            SELECT fecha_hora_envio, lease_hasta FROM Notificacion
+            WHERE estado = 'Pendiente' AND intentos < 3
+            ORDER BY CASE WHEN lease_hasta > fecha_hora_envio THEN lease_hasta
+                          ELSE fecha_hora_envio END
+            LIMIT 1
+            ''')
+            if not proxima:
+                return None
+            if proxima['lease_hasta'] and proxima['lease_hasta'] > proxima['fecha_hora_envio']:
+                return proxima['lease_hasta']
+            return proxima['fecha_hora_envio']
+            
+        except Exception as e:
+            print(f'[ERROR] proxima_notificacion: {str(e)}')
+            return None
+        finally:
             self.db.desconectar()
+
+    def reclamar_notificaciones(self, cantidad: int = 50, lease_segundos: int = 300) -> tuple:
+        '''
+        Reclama una tanda de notificaciones pendientes para esta instancia
+        
+        Las filas quedan reservadas con un token hasta lease_segundos después;
+        otras instancias las saltean (SKIP LOCKED mientras dura la transacción,
+        la reserva después). Si esta instancia no confirma el resultado a
+        tiempo (registrar_resultados con el token), vuelven a estar disponibles.
+        
+        Args:
+            cantidad: Máximo de notificaciones a reclamar
+            lease_segundos: Duración de la reserva; debe alcanzar para enviar la tanda
+        
+        Returns:
+            (token, lista de notificaciones como obtener_notificaciones_pendientes)
+        '''
+        token = uuid.uuid4().hex
+        
+        try:
+            with self.db.transaccion():
+                candidatas = self.db.obtener_registros(f'''
+                SELECT n.id_notificacion FROM Notificacion n
+                WHERE {CONDICION_PENDIENTES}
+                ORDER BY n.fecha_hora_envio
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                ''', (cantidad,))
+                if not candidatas:
+                    return token, []
+                
+                ids = tuple(c['id_notificacion'] for c in candidatas)
+                # La condición se repite: sin bloqueo de filas (SQLite) decide el UPDATE
+                self.db.ejecutar_consulta(f'''
+                UPDATE Notificacion AS n
+                SET lease_token = %s, lease_hasta = DATE_ADD(NOW(), INTERVAL %s SECOND)
+                WHERE n.id_notificacion IN ({', '.join(['%s'] * len(ids))})
+                  AND {CONDICION_PENDIENTES}
+                ''', (token, lease_segundos) + ids)
+                
+                reclamadas = self.db.obtener_registros(f'''{QUERY_NOTIFICACIONES}
+                WHERE n.lease_token = %s
+                ORDER BY n.fecha_hora_envio
+                ''', (token,)) or []
+                
+                # Las que quedaron fuera de los JOIN (turno sin paciente, p.ej. liberado)
+                # no se pueden enviar nunca: se cierran en lugar de reclamarlas cada vez
+                sin_datos = tuple(set(ids) - {n['id_notificacion'] for n in reclamadas})
+                if sin_datos:
+                    self.db.ejecutar_consulta(f'''
+                    UPDATE Notificacion
+                    SET estado = 'Error', lease_token = NULL, lease_hasta = NULL,
+                        motivo_error = 'El turno no tiene paciente o médico asignado'
+                    WHERE id_notificacion IN ({', '.join(['%s'] * len(sin_datos))})
+                      AND lease_token = %s
+                    ''', sin_datos + (token,))
+            return token, reclamadas
             
-            if not contactos:
-                self._marcar_error(id_notificacion, f'Paciente sin contacto {medio}')
-                return False
+        except Exception as e:
+            print(f'[ERROR] reclamar_notificaciones: {str(e)}')
+            return token, []
+
+    def liberar_notificaciones(self, token: str) -> int:
+        '''
+        Devuelve a la cola las notificaciones del token que no se llegaron a
+        enviar (p.ej. al detener el scheduler)
+        
+        Returns:
+            Cantidad de notificaciones liberadas
+        '''
+        try:
+            if not self.db.conectar():
+                return 0
             
-            destinatario = contactos[0]['valor_contacto']
+            return self.db.ejecutar_consulta('''
+            UPDATE Notificacion
+            SET lease_token = NULL, lease_hasta = NULL
+            WHERE lease_token = %s
+            ''', (token,)) or 0
+            
+        except Exception as e:
+            print(f'[ERROR] liberar_notificaciones: {str(e)}')
+            return 0
+        finally:
+            self.db.desconectar()
+
+    def procesar_notificacion(self, notif: dict) -> bool:
+        '''Procesa y envía una notificación individual'''
+        resultado, detalle = self.enviar_notificacion(notif)
+        self.registrar_resultados([(notif['id_notificacion'], resultado, detalle)])
+        return resultado == ENVIADO
+
+    def enviar_notificacion(self, notif: dict) -> tuple:
+        '''
+        Envía una notificación sin escribir en la BD (el resultado se guarda
+        después, junto con el resto de la tanda, con registrar_resultados)
+        
+        Returns:
+            (ENVIADO / REINTENTO / ERROR, detalle)
+        '''
+        id_notificacion = notif['id_notificacion']
+        medio = notif['medio_envio']
+        
+        try:
+            destinatario = notif.get('destinatario')
+            if not destinatario:
+                print(f'✗ Notificación {id_notificacion}: paciente sin contacto {medio}')
+                return ERROR, f'Paciente sin contacto {medio}'
             
             # Construir mensaje
             mensaje = self._construir_mensaje(notif)
-            asunto = f'Recordatorio de Turno Médico - {notif["fecha"].strftime("%d/%m/%Y")}'
+            if notif.get('tipo') == 'Cancelacion':
+                asunto = f'Turno Médico Cancelado - {notif["fecha"].strftime("%d/%m/%Y")}'
+            else:
+                asunto = f'Recordatorio de Turno Médico - {notif["fecha"].strftime("%d/%m/%Y")}'
             
             # Enviar según medio
             if medio == 'Email':
@@ -193,19 +368,81 @@ class GestorNotificacion:
                 exito = False
                 resultado = f'Medio {medio} no implementado'
             
-            # Actualizar estado
             if exito:
-                self._marcar_enviado(id_notificacion)
                 print(f'✓ Notificación {id_notificacion} enviada vía {medio}: {resultado}')
-            else:
-                self._incrementar_intento(id_notificacion, resultado)
-                print(f'✗ Notificación {id_notificacion} falló: {resultado}')
+                return ENVIADO, resultado
+            
+            print(f'✗ Notificación {id_notificacion} falló: {resultado}')
+            return REINTENTO, resultado
+            
+        except Exception as e:
+            print(f'[ERROR] enviar_notificacion: {str(e)}')
+            return REINTENTO, str(e)
+
+    def registrar_resultados(self, resultados: list, token: str = None) -> bool:
+        '''
+        Guarda el resultado de una tanda de envíos con un UPDATE por clase
+        (enviadas, a reintentar, con error) y libera su reserva
+        
+        Las fallidas a reintentar quedan fuera de la cola durante
+        ESPERA_REINTENTO_SEGUNDOS.
+        
+        Args:
+            resultados: Lista de (id_notificacion, ENVIADO / REINTENTO / ERROR, detalle)
+            token: Token de reclamar_notificaciones; si se indica, solo se
+                   actualizan las filas que siguen reservadas con él
+        '''
+        por_clase = {ENVIADO: [], REINTENTO: [], ERROR: []}
+        for id_notificacion, resultado, detalle in resultados:
+            por_clase[resultado].append((id_notificacion, detalle))
+        
+        condicion_token = ' AND lease_token = %s' if token else ''
+        params_token = (token,) if token else ()
+        actualizadas = 0
+        
+        try:
+            if not self.db.conectar():
+                return False
             
-            return exito
+            enviadas = [id_notificacion for id_notificacion, _ in por_clase[ENVIADO]]
+            if enviadas:
+                actualizadas += self.db.ejecutar_consulta(f'''
+                UPDATE Notificacion 
+                SET estado = 'Enviado', fecha_envio_real = NOW(),
+                    lease_token = NULL, lease_hasta = NULL
+                WHERE id_notificacion IN ({', '.join(['%s'] * len(enviadas))}){condicion_token}
+                ''', tuple(enviadas) + params_token) or 0
+            
+            # Cada fila guarda su propio motivo: CASE por id en un único UPDATE
+            for resultado, estado in ((REINTENTO, None), (ERROR, 'Error')):
+                filas = por_clase[resultado]
+                if not filas:
+                    continue
+                casos = ' '.join(['WHEN %s THEN %s'] * len(filas))
+                ids = tuple(id_notificacion for id_notificacion, _ in filas)
+                params = tuple(valor for fila in filas for valor in fila)
+                if estado:
+                    asignar = "estado = 'Error', lease_hasta = NULL"
+                else:
+                    asignar = 'lease_hasta = DATE_ADD(NOW(), INTERVAL %s SECOND)'
+                    params = (ESPERA_REINTENTO_SEGUNDOS,) + params
+                actualizadas += self.db.ejecutar_consulta(f'''
+                UPDATE Notificacion 
+                SET {asignar}, lease_token = NULL, intentos = intentos + 1,
+                    motivo_error = CASE id_notificacion {casos} END
+                WHERE id_notificacion IN ({', '.join(['%s'] * len(ids))}){condicion_token}
+                ''', params + ids + params_token) or 0
+            
+            if actualizadas < len(resultados):
+                print(f'[WARNING] registrar_resultados: {len(resultados) - actualizadas} '
+                      f'resultado(s) descartados (la reserva venció y otra instancia los reclamó)')
+            return True
             
         except Exception as e:
-            print(f'[ERROR] procesar_notificacion: {str(e)}')
+            print(f'[ERROR] registrar_resultados: {str(e)}')
             return False
+        finally:
+            self.db.desconectar()
 
     def _construir_mensaje(self, notif: dict) -> str:
         '''Construye el mensaje de notificación'''
@@ -214,6 +451,22 @@ class GestorNotificacion:
         paciente = f"{notif['nombre']} {notif['apellido']}"
         medico = f"Dr/Dra. {notif['medico_nombre']} {notif['medico_apellido']}"
         
+        if notif.get('tipo') == 'Cancelacion':
+            mensaje = f'''
+TURNO MÉDICO CANCELADO
+
+Paciente: {paciente}
+Fecha: {fecha}
+Hora: {hora}
+Médico: {medico}
+
+Su turno fue cancelado. Comuníquese con el hospital para reprogramarlo.
+
+---
+Sistema de Turnos Hospital DAO 2025
+'''
+            return mensaje.strip()
+        
         mensaje = f'''
 RECORDATORIO DE TURNO MÉDICO
 
@@ -228,57 +481,3 @@ Por favor, confirme su asistencia.
 Sistema de Turnos Hospital DAO 2025
 '''
         return mensaje.strip()
-
-    def _marcar_enviado(self, id_notificacion: int):
-        '''Marca notificación como enviada'''
-        try:
-            if not self.db.conectar():
-                return
-            
-            query = '''
-            UPDATE Notificacion 
-            SET estado = 'Enviado', fecha_envio_real = NOW()
-            WHERE id_notificacion = %s
-            '''
-            self.db.ejecutar_consulta(query, (id_notificacion,))
-            
-        except Exception as e:
-            print(f'[ERROR] _marcar_enviado: {str(e)}')
-        finally:
-            self.db.desconectar()
-
-    def _marcar_error(self, id_notificacion: int, motivo: str):
-        '''Marca notificación como error'''
-        try:
-            if not self.db.conectar():
-                return
-            
-            query = '''
-            UPDATE Notificacion 
-            SET estado = 'Error', motivo_error = %s, intentos = intentos + 1
-            WHERE id_notificacion = %s
-            '''
-            self.db.ejecutar_consulta(query, (motivo, id_notificacion))
-            
-        except Exception as e:
-            print(f'[ERROR] _marcar_error: {str(e)}')
-        finally:
-            self.db.desconectar()
-
-    def _incrementar_intento(self, id_notificacion: int, motivo: str):
-        '''Incrementa contador de intentos'''
-        try:
-            if not self.db.conectar():
-                return
-            
-            query = '''
-            UPDATE Notificacion 
-            SET intentos = intentos + 1, motivo_error = %s
-            WHERE id_notificacion = %s
-            '''
-            self.db.ejecutar_consulta(query, (motivo, id_notificacion))
-            
-        except Exception as e:
-            print(f'[ERROR] _incrementar_intento: {str(e)}')
-        finally:
-            self.db.desconectar()
@@ -156,7 +156,7 @@ def guardar_en_base_datos(gestor: GestorPaciente) -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -207,7 +207,7 @@ def listar_pacientes_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -258,7 +258,7 @@ def eliminar_paciente_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -305,7 +305,7 @@ def modificar_paciente_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -1,5 +1,5 @@
-from typing import List, Optional, Dict
-from datetime import date, time
+from typing import List, Optional, Dict, Iterator, Callable
+from datetime import date, datetime, time, timedelta
 import sys
 import os
 
@@ -7,17 +7,76 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from turno import Turno
+from libre import Libre
+from programado import Programado
+from atendido import Atendido
+from cancelado import Cancelado
+from inasistencia import Inasistencia
 from data.database import Database
 
 
+# Clase del patrón State correspondiente al estado guardado en la BD
+ESTADOS_TURNO = {
+    'Libre': Libre,
+    'Programado': Programado,
+    'Atendido': Atendido,
+    'Cancelado': Cancelado,
+    'Inasistencia': Inasistencia,
+}
+
+# Acciones en lote: método del estado que hace la transición
+ACCIONES_LOTE = ('cancelar', 'atender', 'ausente')
+
+# Nombre de la marca de avance de la barrida de inasistencias (tabla marca_proceso)
+PROCESO_INASISTENCIAS = 'inasistencias'
+
+
 class GestorTurno:
     """Clase gestora de operaciones ABMC de turnos"""
     
+    # Funciones a llamar con la matrícula del médico cada vez que uno de sus
+    # turnos se cancela o se modifica (ver IndiceDisponibilidad)
+    _observadores: List[Callable[[int], None]] = []
+    
     def __init__(self):
         self.__turnos: List[Turno] = []
         self.__turnos_bd: List[Dict] = []
     
+    # ========== OBSERVADORES ==========
+    @classmethod
+    def agregar_observador(cls, funcion: Callable[[int], None]) -> None:
+        """Registra una función que recibe la matrícula del médico de cada turno cancelado o modificado"""
+        if funcion not in cls._observadores:
+            cls._observadores.append(funcion)
+    
+    @classmethod
+    def quitar_observador(cls, funcion: Callable[[int], None]) -> None:
+        """Deja de notificar a una función registrada con agregar_observador"""
+        if funcion in cls._observadores:
+            cls._observadores.remove(funcion)
+    
+    def _notificar_cambio(self, matricula: int) -> None:
+        """Avisa a los observadores que cambiaron los turnos de un médico"""
+        for funcion in list(GestorTurno._observadores):
+            try:
+                funcion(matricula)
+            except Exception as e:
+                print(f"[WARNING] Error al notificar cambio de turnos del médico {matricula}: {str(e)}")
+    
     # ========== CARGAR DE BASE DE DATOS ==========
+    QUERY_TURNOS_BD = """
+    SELECT t.id_turno, t.id_paciente, t.matricula, t.id_consultorio,
+           t.fecha, t.hora_inicio, t.hora_fin, t.estado, t.observaciones,
+           p.nombre as paciente_nombre, p.apellido as paciente_apellido,
+           m.nombre as medico_nombre, m.apellido as medico_apellido,
+           c.numero as consultorio_numero
+    FROM Turno t
+    JOIN Paciente p ON t.id_paciente = p.id_paciente
+    JOIN Medico m ON t.matricula = m.matricula
+    JOIN Consultorio c ON t.id_consultorio = c.id_consultorio
+    ORDER BY t.fecha, t.hora_inicio
+    """
+    
     def cargar_turnos_bd(self) -> bool:
         """
         Carga todos los turnos de la base de datos
@@ -27,25 +86,12 @@ class GestorTurno:
         """
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
         try:
-            query = """
-            SELECT t.id_turno, t.id_paciente, t.matricula, t.id_consultorio,
-                   t.fecha, t.hora_inicio, t.hora_fin, t.estado, t.observaciones,
-                   p.nombre as paciente_nombre, p.apellido as paciente_apellido,
-                   m.nombre as medico_nombre, m.apellido as medico_apellido,
-                   c.numero as consultorio_numero
-            FROM Turno t
-            JOIN Paciente p ON t.id_paciente = p.id_paciente
-            JOIN Medico m ON t.matricula = m.matricula
-            JOIN Consultorio c ON t.id_consultorio = c.id_consultorio
-            ORDER BY t.fecha, t.hora_inicio
-            """
-            
-            turnos = db.obtener_registros(query)
+            turnos = db.obtener_registros(self.QUERY_TURNOS_BD)
             
             if turnos:
                 self.__turnos_bd = turnos
@@ -62,23 +108,50 @@ class GestorTurno:
         finally:
             db.desconectar()
     
+    def iterar_turnos_bd(self, batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Recorre los turnos de la base de datos sin cargarlos todos en memoria
+        
+        Args:
+            batch_size: Cantidad de filas a traer del servidor por vez
+        
+        Yields:
+            Cada turno como diccionario
+        """
+        db = Database()
+        
+        if not db.conectar():
+            print("[ERROR] No se pudo conectar a la base de datos")
+            return
+        
+        try:
+            yield from db.iterar_registros(self.QUERY_TURNOS_BD, batch_size=batch_size)
+        finally:
+            db.desconectar()
+    
     # ========== LISTAR TURNOS DE BD ==========
     def listar_turnos_bd(self) -> bool:
         """
-        Lista todos los turnos de la base de datos
+        Lista todos los turnos de la base de datos.
+        Si no están cargados en memoria se recorren directamente desde la BD.
         
         Returns:
             True si se listaron correctamente
         """
-        if not self.__turnos_bd:
-            if not self.cargar_turnos_bd():
-                return False
-        
         if self.__turnos_bd:
             print(f"\n[INFO] Total de turnos: {len(self.__turnos_bd)}\n")
             for turno in self.__turnos_bd:
                 self._mostrar_turno_bd(turno)
             return True
+        
+        total = 0
+        for turno in self.iterar_turnos_bd():
+            self._mostrar_turno_bd(turno)
+            total += 1
+        
+        if total:
+            print(f"\n[INFO] Total de turnos: {total}\n")
+            return True
         else:
             print("[INFO] No hay turnos registrados")
             return False
@@ -104,7 +177,7 @@ class GestorTurno:
         """
         db = Database()
 
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
 
@@ -197,7 +270,7 @@ class GestorTurno:
         """Muestra una notificación simulada en la terminal con todos los datos del turno"""
         
         db = Database()
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             return
         
         try:
@@ -336,14 +409,14 @@ class GestorTurno:
         """
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
         try:
             # Verificar que el turno existe
             query_check = """
-            SELECT t.id_turno, p.nombre as paciente_nombre, p.apellido as paciente_apellido,
+            SELECT t.id_turno, t.matricula, p.nombre as paciente_nombre, p.apellido as paciente_apellido,
                    m.nombre as medico_nombre, m.apellido as medico_apellido,
                    t.fecha, t.hora_inicio, t.hora_fin, t.estado
             FROM Turno t
@@ -378,6 +451,7 @@ class GestorTurno:
                 print(f"     Nuevo estado: CANCELADO")
                 self.__turnos_bd = []
                 db.desconectar()
+                self._notificar_cambio(turno['matricula'])
                 return True
             else:
                 print("[ERROR] No se pudo cancelar el turno")
@@ -411,13 +485,13 @@ class GestorTurno:
         """
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
         try:
             # Verificar que el turno existe
-            query_check = "SELECT id_turno FROM Turno WHERE id_turno = %s"
+            query_check = "SELECT id_turno, matricula FROM Turno WHERE id_turno = %s"
             turno = db.obtener_registro(query_check, (id_turno,))
             
             if not turno:
@@ -459,6 +533,7 @@ class GestorTurno:
                 print(f"[OK] Turno #{id_turno} modificado exitosamente")
                 self.__turnos_bd = []
                 db.desconectar()
+                self._notificar_cambio(turno['matricula'])
                 return True
             else:
                 print("[ERROR] No se pudo modificar el turno")
@@ -470,12 +545,222 @@ class GestorTurno:
             db.desconectar()
             return False
     
+    # ========== CAMBIOS DE ESTADO EN LOTE ==========
+    def cambiar_estado_lote(self, accion: str, ids_turno: Optional[List[int]] = None,
+                            matricula: Optional[int] = None, desde: Optional[date] = None,
+                            hasta: Optional[date] = None, notificar: bool = True,
+                            todo_o_nada: bool = False) -> Optional[Dict]:
+        """
+        Aplica la misma transición a muchos turnos en una única transacción:
+        un UPDATE para los turnos, un lote de filas en cambio_estado y, al
+        cancelar, un lote de notificaciones de cancelación a los pacientes
+        
+        Los turnos se eligen por IDs o por médico y rango de fechas. Cada uno
+        se valida contra su clase de estado (Programado.cancelar, etc.); los
+        que no admiten la transición se informan como rechazados.
+        
+        Args:
+            accion: 'cancelar', 'atender' o 'ausente'
+            ids_turno: IDs de los turnos (o bien matricula + desde/hasta)
+            matricula: Médico cuyos turnos se modifican
+            desde: Primera fecha, inclusive (con matricula; default: hoy)
+            hasta: Última fecha, inclusive (con matricula; default: desde)
+            notificar: Avisar a los pacientes de los turnos cancelados
+            todo_o_nada: Si es True y algún turno se rechaza, no se modifica ninguno
+        
+        Returns:
+            Diccionario con:
+              - 'aplicados': IDs de los turnos modificados
+              - 'rechazados': [{'id_turno', 'estado', 'motivo'}]
+              - 'notificaciones': notificaciones de cancelación creadas
+            o None si hay error (en ese caso no se modifica nada)
+        """
+        if accion not in ACCIONES_LOTE:
+            print(f"[ERROR] Acción '{accion}' no válida. Válidas: {', '.join(ACCIONES_LOTE)}")
+            return None
+        
+        if ids_turno:
+            ids_turno = list(dict.fromkeys(ids_turno))
+            condicion = f"t.id_turno IN ({', '.join(['%s'] * len(ids_turno))})"
+            params = tuple(ids_turno)
+        elif matricula is not None:
+            desde = desde or date.today()
+            hasta = hasta or desde
+            condicion = "t.matricula = %s AND t.fecha BETWEEN %s AND %s AND t.id_paciente IS NOT NULL"
+            params = (matricula, desde, hasta)
+        else:
+            print("[ERROR] Indique los IDs de los turnos o el médico y las fechas")
+            return None
+        
+        db = Database()
+        resultado = {'aplicados': [], 'rechazados': [], 'notificaciones': 0}
+        
+        try:
+            with db.transaccion():
+                turnos = db.obtener_registros(f"""
+                    SELECT t.id_turno, t.estado, t.matricula, t.id_paciente
+                    FROM Turno t
+                    WHERE {condicion}
+                    FOR UPDATE
+                """, params) or []
+                
+                encontrados = {t['id_turno'] for t in turnos}
+                for id_turno in ids_turno or []:
+                    if id_turno not in encontrados:
+                        resultado['rechazados'].append(
+                            {'id_turno': id_turno, 'estado': None, 'motivo': "Turno no encontrado"})
+                
+                # Validar cada turno contra el patrón State y agrupar por transición
+                por_transicion: Dict[tuple, List[Dict]] = {}
+                for turno in turnos:
+                    clase_estado = ESTADOS_TURNO.get(turno['estado'])
+                    if clase_estado is None:
+                        resultado['rechazados'].append({
+                            'id_turno': turno['id_turno'], 'estado': turno['estado'],
+                            'motivo': f"Estado desconocido: {turno['estado']}"
+                        })
+                        continue
+                    estado = clase_estado()
+                    if not hasattr(estado, accion):
+                        resultado['rechazados'].append({
+                            'id_turno': turno['id_turno'], 'estado': turno['estado'],
+                            'motivo': f"No se puede {accion} un turno {turno['estado']}"
+                        })
+                        continue
+                    nuevo = getattr(estado, accion)().get_nombre()
+                    por_transicion.setdefault((turno['estado'], nuevo), []).append(turno)
+                
+                if todo_o_nada and resultado['rechazados']:
+                    print(f"[ERROR] {accion.capitalize()}: {len(resultado['rechazados'])} turno(s) "
+                          f"rechazado(s), no se modificó ninguno")
+                    return resultado
+                
+                for (anterior, nuevo), grupo in por_transicion.items():
+                    ids = [t['id_turno'] for t in grupo]
+                    db.ejecutar_consulta(
+                        f"UPDATE Turno SET estado = %s WHERE id_turno IN ({', '.join(['%s'] * len(ids))})",
+                        (nuevo,) + tuple(ids))
+                    db.ejecutar_lote(
+                        "INSERT INTO cambio_estado (id_turno, estado_anterior, estado_nuevo) VALUES (%s, %s, %s)",
+                        [(id_turno, anterior, nuevo) for id_turno in ids])
+                    resultado['aplicados'].extend(ids)
+                
+                if accion == 'cancelar' and resultado['aplicados']:
+                    cancelados = [t for grupo in por_transicion.values() for t in grupo]
+                    resultado['notificaciones'] = self._encolar_cancelaciones(db, cancelados, notificar)
+        
+        except Exception as e:
+            print(f"[ERROR] Error al aplicar '{accion}' en lote: {str(e)}")
+            return None
+        
+        self.__turnos_bd = []
+        for matricula_afectada in {t['matricula'] for t in turnos}:
+            self._notificar_cambio(matricula_afectada)
+        
+        print(f"[OK] {accion.capitalize()}: {len(resultado['aplicados'])} turno(s) modificado(s), "
+              f"{len(resultado['rechazados'])} rechazado(s)")
+        return resultado
+    
+    def marcar_inasistencias_pendientes(self) -> int:
+        """
+        Marca como 'Inasistencia' los turnos programados de ayer o antes que
+        siguen 'Programado', recorriendo solo las fechas posteriores a la
+        última barrida (guardada en marca_proceso). Si la marca ya está al día
+        no modifica nada. Pensado para ejecutarse desde SchedulerTurnos.
+        
+        Returns:
+            Cantidad de turnos marcados como inasistencia
+        """
+        ayer = date.today() - timedelta(days=1)
+        db = Database()
+        
+        try:
+            with db.transaccion():
+                marca = db.obtener_registro(
+                    "SELECT fecha FROM marca_proceso WHERE nombre = %s FOR UPDATE", (PROCESO_INASISTENCIAS,))
+                
+                if marca and marca['fecha'] >= ayer:
+                    return 0
+                
+                condicion = "estado = 'Programado' AND fecha <= %s"
+                params = (ayer,)
+                if marca:
+                    condicion += " AND fecha > %s"
+                    params += (marca['fecha'],)
+                
+                db.ejecutar_consulta(f"""
+                    INSERT INTO cambio_estado (id_turno, estado_anterior, estado_nuevo)
+                    SELECT id_turno, 'Programado', 'Inasistencia' FROM Turno WHERE {condicion}
+                """, params)
+                marcados = db.ejecutar_consulta(
+                    f"UPDATE Turno SET estado = 'Inasistencia' WHERE {condicion}", params) or 0
+                
+                if marca:
+                    db.ejecutar_consulta(
+                        "UPDATE marca_proceso SET fecha = %s, actualizado = NOW() WHERE nombre = %s",
+                        (ayer, PROCESO_INASISTENCIAS))
+                else:
+                    db.ejecutar_consulta(
+                        "INSERT INTO marca_proceso (nombre, fecha) VALUES (%s, %s)",
+                        (PROCESO_INASISTENCIAS, ayer))
+            
+            if marcados > 0:
+                print(f"[INFO] {marcados} turno(s) marcado(s) automáticamente como inasistencia")
+            return marcados
+        
+        except Exception as e:
+            print(f"[ERROR] Error al marcar inasistencias automáticas: {str(e)}")
+            return 0
+    
+    def _encolar_cancelaciones(self, db: Database, turnos: List[Dict], notificar: bool) -> int:
+        """
+        Descarta los recordatorios pendientes de los turnos cancelados y, si
+        corresponde, encola un aviso de cancelación por el contacto principal
+        de cada paciente (dentro de la transacción en curso)
+        
+        Returns:
+            Cantidad de avisos de cancelación encolados
+        """
+        ids = [t['id_turno'] for t in turnos]
+        db.ejecutar_consulta(
+            f"""DELETE FROM Notificacion
+            WHERE id_turno IN ({', '.join(['%s'] * len(ids))})
+              AND estado = 'Pendiente' AND tipo = 'Recordatorio'""",
+            tuple(ids))
+        
+        pacientes = {t['id_paciente'] for t in turnos if t['id_paciente'] is not None}
+        if not notificar or not pacientes:
+            return 0
+        
+        contactos = db.obtener_registros(f"""
+            SELECT id_paciente, tipo_contacto
+            FROM Contactos_Paciente
+            WHERE id_paciente IN ({', '.join(['%s'] * len(pacientes))}) AND activo = TRUE
+            ORDER BY es_principal DESC, id_contacto
+        """, tuple(pacientes)) or []
+        
+        medio_por_paciente: Dict[int, str] = {}
+        for contacto in contactos:
+            medio_por_paciente.setdefault(contacto['id_paciente'], contacto['tipo_contacto'])
+        
+        ahora = datetime.now().replace(microsecond=0)
+        filas = [
+            (t['id_turno'], ahora, medio_por_paciente[t['id_paciente']])
+            for t in turnos if t['id_paciente'] in medio_por_paciente
+        ]
+        if filas:
+            db.ejecutar_lote("""
+                INSERT INTO Notificacion (id_turno, fecha_hora_envio, estado, medio_envio, intentos, tipo)
+                VALUES (%s, %s, 'Pendiente', %s, 0, 'Cancelacion')
+            """, filas)
+        return len(filas)
+    
     # ========== CONSULTA (READ) ==========
     def consultar_turnos_paciente_bd(self, id_paciente: int) -> bool:
         """Consulta turnos de un paciente desde BD"""
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
@@ -513,7 +798,7 @@ class GestorTurno:
         """Consulta turnos de un médico desde BD"""
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
@@ -551,7 +836,7 @@ class GestorTurno:
         """Consulta turnos de una fecha específica desde BD"""
         db = Database()
         
-        if not db.conectar("127.0.0.1:3306/hospital_db"):
+        if not db.conectar():
             print("[ERROR] No se pudo conectar a la base de datos")
             return False
         
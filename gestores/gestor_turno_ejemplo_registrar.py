@@ -38,7 +38,7 @@ def mostrar_menu():
 def cargar_medicos_bd() -> list:
     """Carga los médicos de la base de datos"""
     db = Database()
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return []
     
@@ -55,7 +55,7 @@ def cargar_medicos_bd() -> list:
 def cargar_pacientes_bd() -> list:
     """Carga los pacientes de la base de datos"""
     db = Database()
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return []
     
@@ -72,7 +72,7 @@ def cargar_pacientes_bd() -> list:
 def cargar_turnos_libres_medico_bd(matricula: int) -> list:
     """Carga los turnos disponibles (Libre) de un médico desde la BD"""
     db = Database()
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return []
     
@@ -217,7 +217,7 @@ def registrar_turno_interactivo(gestor: GestorTurno) -> bool:
     print("\n[PASO 5] Guardando en Base de Datos...")
     
     db = Database()
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
@@ -263,7 +263,7 @@ def listar_turnos_bd() -> bool:
     
     db = Database()
     
-    if not db.conectar("127.0.0.1:3306/hospital_db"):
+    if not db.conectar():
         print("[ERROR] No se pudo conectar a la base de datos")
         return False
     
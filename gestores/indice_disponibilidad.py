@@ -0,0 +1,219 @@
+import heapq
+import threading
+from datetime import date, datetime, time
+from itertools import islice
+from time import monotonic
+from typing import Dict, Iterable, Iterator, List, Optional
+import sys
+import os
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.generar_turnos import a_minutos
+from gestores.gestor_agenda import GestorAgenda
+from gestores.gestor_disponibilidad import GestorDisponibilidad
+from gestores.gestor_turno import GestorTurno
+
+
+class IndiceDisponibilidad:
+    """
+    Índice en memoria de los turnos libres de cada médico, por fecha, para
+    todo el horizonte de GestorDisponibilidad.
+
+    Cada médico se carga la primera vez que se consulta y después se mantiene
+    con los eventos del sistema:
+      - reserva de un turno: se quita ese horario (quitar)
+      - cancelación o modificación de un turno (GestorTurno): se recarga el médico
+      - modificación o baja de agendas (GestorAgenda) y generación de turnos
+        (SchedulerTurnos): se recarga todo
+
+    Como red de seguridad ante cambios hechos por otra instancia de la
+    aplicación, cada médico se recarga al cambiar el día o pasados
+    vigencia_segundos desde su carga.
+    """
+
+    _instancia: Optional['IndiceDisponibilidad'] = None
+    _lock_instancia = threading.Lock()
+
+    def __new__(cls):
+        """Todas las llamadas a IndiceDisponibilidad() devuelven la misma instancia"""
+        if cls._instancia is None:
+            with cls._lock_instancia:
+                if cls._instancia is None:
+                    cls._instancia = super().__new__(cls)
+        return cls._instancia
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self.disponibilidad = GestorDisponibilidad()
+            self.vigencia_segundos = 300
+            # matricula -> {'dia': date, 'cargado': float, 'fechas': {fecha: [turnos libres]}}
+            self._medicos: Dict[int, Dict] = {}
+            self._lock = threading.RLock()
+            # Versión de cada médico (quitar / invalidar) y generación de invalidar():
+            # una lectura de la BD que empezó antes de un cambio de ese médico
+            # puede estar vieja y no se guarda
+            self._versiones: Dict[int, int] = {}
+            self._generacion = 0
+
+            GestorTurno.agregar_observador(self.invalidar)
+            GestorAgenda.agregar_observador(self._agenda_modificada)
+            self._initialized = True
+
+    # ========== CONSULTA ==========
+    def libres_por_fecha(self, matricula: int) -> Dict[date, List[Dict]]:
+        """
+        Turnos libres futuros del médico agrupados por fecha
+
+        Returns:
+            Diccionario fecha -> turnos libres ordenados por hora y consultorio
+            (mismo formato que GestorDisponibilidad.turnos_libres)
+        """
+        fechas = self._fechas([matricula])[matricula]
+        ahora = datetime.now()
+        hoy, hora_actual = ahora.date(), ahora.time()
+
+        resultado = {}
+        for fecha in sorted(fechas):
+            if fecha < hoy:
+                continue
+            turnos = fechas[fecha]
+            if fecha == hoy:
+                turnos = [t for t in turnos if t['hora_inicio'] > hora_actual]
+            if turnos:
+                resultado[fecha] = list(turnos)
+        return resultado
+
+    def libres(self, matricula: int) -> List[Dict]:
+        """Turnos libres futuros del médico ordenados por fecha y hora"""
+        return [turno for turnos in self.libres_por_fecha(matricula).values() for turno in turnos]
+
+    def proximos_libres(self, matriculas: Iterable[int], cantidad: int = 10,
+                        desde: Optional[date] = None, hasta: Optional[date] = None,
+                        hora_desde: Optional[time] = None,
+                        hora_hasta: Optional[time] = None) -> List[Dict]:
+        """
+        Los primeros turnos libres entre varios médicos, en orden de fecha y hora
+
+        Mezcla con un heap las listas ya ordenadas de cada médico, así que solo
+        recorre los turnos necesarios para llegar a `cantidad`. Los médicos que
+        no están en el índice se cargan todos juntos con una sola consulta.
+
+        Args:
+            matriculas: Médicos a considerar
+            cantidad: Cantidad máxima de turnos a devolver
+            desde: Primera fecha (opcional)
+            hasta: Última fecha, inclusive (opcional)
+            hora_desde: Descartar turnos que empiezan antes de esta hora (opcional)
+            hora_hasta: Descartar turnos que terminan después de esta hora (opcional)
+        """
+        fechas_por_medico = self._fechas(list(matriculas))
+        ahora = datetime.now()
+
+        iteradores = [
+            self._recorrer(fechas, ahora, desde, hasta, hora_desde, hora_hasta)
+            for fechas in fechas_por_medico.values()
+        ]
+        mezclados = heapq.merge(*iteradores, key=lambda t: (t['fecha'], t['hora_inicio']))
+        return list(islice(mezclados, cantidad))
+
+    @staticmethod
+    def _recorrer(fechas: Dict[date, List[Dict]], ahora: datetime, desde: Optional[date],
+                  hasta: Optional[date], hora_desde: Optional[time],
+                  hora_hasta: Optional[time]) -> Iterator[Dict]:
+        """Turnos libres futuros de un médico, en orden, dentro de los límites pedidos"""
+        for fecha in sorted(fechas):
+            if fecha < ahora.date() or (desde and fecha < desde):
+                continue
+            if hasta and fecha > hasta:
+                return
+            for turno in fechas[fecha]:
+                if fecha == ahora.date() and turno['hora_inicio'] <= ahora.time():
+                    continue
+                if hora_desde and turno['hora_inicio'] < hora_desde:
+                    continue
+                if hora_hasta and turno['hora_fin'] > hora_hasta:
+                    continue
+                yield turno
+
+    def _fechas(self, matriculas: List[int]) -> Dict[int, Dict[date, List[Dict]]]:
+        """
+        Turnos libres por fecha de cada médico, cargando juntos los que no están
+        o vencieron
+
+        La consulta a la BD se hace sin tomar el lock, así una carga lenta no
+        frena al resto de las consultas ni a los eventos. Si la consulta falla
+        se usan los datos vencidos (o ninguno) sin guardarlos, para reintentar
+        en la próxima consulta.
+
+        Returns:
+            matricula -> copia de sus fechas (quitar() reemplaza las listas en
+            lugar de modificarlas, así que la copia superficial alcanza)
+        """
+        hoy, instante = date.today(), monotonic()
+        with self._lock:
+            faltantes = [
+                m for m in set(matriculas)
+                if m not in self._medicos or self._medicos[m]['dia'] != hoy
+                or instante - self._medicos[m]['cargado'] > self.vigencia_segundos
+            ]
+            versiones = {m: self._version_de(m) for m in faltantes}
+
+        leidas: Dict[int, Dict[date, List[Dict]]] = {}
+        if faltantes:
+            turnos = self.disponibilidad.turnos_libres(faltantes)
+            if turnos is not None:
+                leidas = {m: {} for m in faltantes}
+                for turno in turnos:
+                    leidas[turno['matricula']].setdefault(turno['fecha'], []).append(turno)
+
+        with self._lock:
+            for m, fechas in leidas.items():
+                if versiones[m] == self._version_de(m):
+                    self._medicos[m] = {'dia': hoy, 'cargado': instante, 'fechas': fechas}
+            resultado = {}
+            for m in matriculas:
+                if m in leidas:
+                    resultado[m] = dict(leidas[m])
+                elif m in self._medicos:
+                    resultado[m] = dict(self._medicos[m]['fechas'])
+                else:
+                    resultado[m] = {}
+            return resultado
+
+    def _version_de(self, matricula: int) -> tuple:
+        """Versión actual de los datos del médico (llamar con el lock tomado)"""
+        return self._generacion, self._versiones.get(matricula, 0)
+
+    # ========== EVENTOS ==========
+    def quitar(self, matricula: int, fecha: date, hora_inicio) -> None:
+        """Saca del índice el horario reservado (en todos los consultorios del médico)"""
+        minutos = a_minutos(hora_inicio)
+        with self._lock:
+            self._versiones[matricula] = self._versiones.get(matricula, 0) + 1
+            entrada = self._medicos.get(matricula)
+            if entrada is None or fecha not in entrada['fechas']:
+                return
+            turnos = [t for t in entrada['fechas'][fecha] if a_minutos(t['hora_inicio']) != minutos]
+            if turnos:
+                entrada['fechas'][fecha] = turnos
+            else:
+                del entrada['fechas'][fecha]
+
+    def _agenda_modificada(self, id_agenda: int) -> None:
+        """Una agenda cambió: se recargan todos los médicos"""
+        self.invalidar()
+
+    def invalidar(self, matricula: Optional[int] = None) -> None:
+        """Descarta los turnos de un médico (o de todos) para recargarlos en la próxima consulta"""
+        with self._lock:
+            if matricula is None:
+                self._generacion += 1
+                self._medicos.clear()
+            else:
+                self._versiones[matricula] = self._versiones.get(matricula, 0) + 1
+                self._medicos.pop(matricula, None)
+
+    def __repr__(self) -> str:
+        return f"IndiceDisponibilidad(médicos={len(self._medicos)}, vigencia={self.vigencia_segundos}s)"
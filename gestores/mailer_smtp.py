@@ -0,0 +1,178 @@
+import os
+import smtplib
+import threading
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Optional, Tuple
+
+
+# Errores que indican que la sesión se cortó: se reconecta y se reintenta una vez
+ERRORES_CONEXION = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+# Errores al abrir la sesión (saludo, TLS, login): no hay sesión para reutilizar
+ERRORES_SESION = (smtplib.SMTPAuthenticationError, smtplib.SMTPHeloError, smtplib.SMTPNotSupportedError)
+
+
+class MailerSMTP:
+    """
+    Envía emails reutilizando una única sesión SMTP autenticada (conexión,
+    STARTTLS y login una sola vez) para toda una tanda de mensajes.
+
+    - Si la sesión se corta, reconecta y reintenta el mensaje una vez.
+    - Si el servidor rechaza un mensaje (destinatario inválido, etc.) solo
+      falla ese mensaje: la sesión se sigue usando para los demás.
+    - Después de max_mensajes envíos cierra la sesión y abre otra (los
+      servidores suelen limitar los mensajes por conexión).
+    - cerrar() termina la sesión; se puede usar como context manager.
+
+    Para probar sin Gmail alcanza un servidor SMTP local, por ejemplo:
+        python -m aiosmtpd -n -l localhost:8025
+        SMTP_HOST=localhost SMTP_PORT=8025 SMTP_STARTTLS=0
+    """
+
+    def __init__(self, remitente: Optional[str], password: Optional[str] = None,
+                 host: str = 'smtp.gmail.com', port: int = 587, starttls: bool = True,
+                 max_mensajes: int = 100, timeout: int = 30):
+        """
+        Args:
+            remitente: Dirección que envía (y usuario del login)
+            password: Contraseña; si no hay, no se hace login (servidores locales)
+            host / port: Servidor SMTP (default: Gmail)
+            starttls: Negociar TLS después de conectar (default: True)
+            max_mensajes: Mensajes por conexión antes de reconectar (default: 100)
+            timeout: Segundos de espera de la conexión
+        """
+        self.remitente = remitente
+        self.password = password
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.max_mensajes = max_mensajes
+        self.timeout = timeout
+        self._servidor: Optional[smtplib.SMTP] = None
+        self._enviados_en_sesion = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls) -> 'MailerSMTP':
+        """
+        Crea el mailer con las variables de entorno / .env:
+            EMAIL_SENDER, EMAIL_PASSWORD   Cuenta que envía
+            SMTP_HOST, SMTP_PORT           Servidor (default smtp.gmail.com:587)
+            SMTP_STARTTLS                  0 para no usar TLS (default 1)
+            SMTP_MAX_MENSAJES              Mensajes por conexión (default 100)
+        """
+        return cls(
+            remitente=os.getenv('EMAIL_SENDER'),
+            password=os.getenv('EMAIL_PASSWORD'),
+            host=os.getenv('SMTP_HOST', 'smtp.gmail.com'),
+            port=int(os.getenv('SMTP_PORT', '587')),
+            starttls=os.getenv('SMTP_STARTTLS', '1') != '0',
+            max_mensajes=int(os.getenv('SMTP_MAX_MENSAJES', '100')),
+        )
+
+    # ========== ENVÍO ==========
+    def enviar(self, destinatario: str, asunto: str, mensaje: str) -> Tuple[bool, str]:
+        """
+        Envía un email por la sesión abierta (la abre si hace falta)
+
+        Returns:
+            (True/False, mensaje)
+        """
+        if not self.remitente or (self.host == 'smtp.gmail.com' and not self.password):
+            return False, 'Credenciales de email no configuradas en .env'
+
+        msg = MIMEMultipart()
+        msg['From'] = self.remitente
+        msg['To'] = destinatario
+        msg['Subject'] = asunto
+        msg.attach(MIMEText(mensaje, 'plain', 'utf-8'))
+
+        with self._lock:
+            for intento in range(2):
+                try:
+                    if self._servidor is None or self._enviados_en_sesion >= self.max_mensajes:
+                        self._reconectar()
+                    self._servidor.send_message(msg)
+                    self._enviados_en_sesion += 1
+                    return True, f'Email enviado a {destinatario}'
+                except ERRORES_CONEXION as e:
+                    self._descartar_sesion()
+                    if intento == 1:
+                        return False, f'Error al enviar email: {str(e)}'
+                except ERRORES_SESION as e:
+                    self._descartar_sesion()
+                    return False, f'Error al enviar email: {str(e)}'
+                except smtplib.SMTPResponseException as e:
+                    if e.smtp_code == 421:
+                        # El servidor cierra la sesión: se reintenta con una nueva
+                        self._descartar_sesion()
+                        if intento == 1:
+                            return False, f'Error al enviar email: {str(e)}'
+                        continue
+                    # Rechazo de este mensaje (remitente, datos): la sesión sigue
+                    self._restablecer_sesion()
+                    return False, f'Error al enviar email: {str(e)}'
+                except Exception as e:
+                    # Destinatarios rechazados u otro error de este mensaje: la sesión sigue
+                    self._restablecer_sesion()
+                    return False, f'Error al enviar email: {str(e)}'
+
+    # ========== SESIÓN ==========
+    def _reconectar(self) -> None:
+        """Cierra la sesión actual (si hay) y abre una nueva autenticada"""
+        self._cerrar_sesion()
+        servidor = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                servidor.starttls()
+            if self.password:
+                servidor.login(self.remitente, self.password)
+        except Exception:
+            servidor.close()
+            raise
+        self._servidor = servidor
+        self._enviados_en_sesion = 0
+
+    def _cerrar_sesion(self) -> None:
+        """Termina la sesión con QUIT (si el servidor no responde, la descarta)"""
+        if self._servidor is None:
+            return
+        try:
+            self._servidor.quit()
+        except Exception:
+            self._servidor.close()
+        self._servidor = None
+
+    def _restablecer_sesion(self) -> None:
+        """Deja la sesión lista para el próximo mensaje (RSET); si no responde, la descarta"""
+        if self._servidor is None:
+            return
+        try:
+            self._servidor.rset()
+        except Exception:
+            self._descartar_sesion()
+
+    def _descartar_sesion(self) -> None:
+        """Descarta la sesión sin QUIT (se usa cuando ya está rota)"""
+        if self._servidor is not None:
+            try:
+                self._servidor.close()
+            except Exception:
+                pass
+        self._servidor = None
+
+    def cerrar(self) -> None:
+        """Cierra la sesión al terminar una tanda de envíos"""
+        with self._lock:
+            self._cerrar_sesion()
+
+    def __enter__(self) -> 'MailerSMTP':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.cerrar()
+
+    def __repr__(self) -> str:
+        estado = 'conectado' if self._servidor else 'desconectado'
+        return f"MailerSMTP({self.host}:{self.port}, {estado}, máx. {self.max_mensajes} por conexión)"
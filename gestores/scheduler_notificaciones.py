@@ -1,23 +1,87 @@
 import time
 import threading
-from datetime import datetime
-from gestores.gestor_notificacion import GestorNotificacion
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from gestores.gestor_notificacion import ENVIADO, GestorNotificacion
+from gestores.gestor_turno import GestorTurno
+
+
+class LimitadorTasa:
+    """Limita los envíos a una cantidad por segundo, repartida entre todos los hilos"""
+    
+    def __init__(self, por_segundo: float):
+        self.intervalo = 1.0 / por_segundo if por_segundo and por_segundo > 0 else 0.0
+        self._proximo = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def esperar(self, detener: threading.Event) -> bool:
+        """
+        Espera el turno del próximo envío
+        
+        Returns:
+            False si se pidió detener mientras esperaba
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo)
+            self._proximo = turno + self.intervalo
+        espera = turno - ahora
+        return not detener.wait(espera) if espera > 0 else not detener.is_set()
 
 
 class SchedulerNotificaciones:
     """
     Scheduler que se ejecuta en segundo plano para enviar notificaciones pendientes
+    
+    Cada tanda se envía con un pool de hilos, con un límite de envíos por
+    segundo y un máximo de envíos simultáneos por medio (Email, SMS, ...), así
+    un envío lento no frena al resto. Al detener, los envíos en curso terminan
+    y los que no empezaron vuelven a la cola para la próxima ejecución.
+    
+    Las notificaciones se reclaman por tandas con una reserva (lease) en la BD,
+    así varias instancias de la aplicación pueden correr su scheduler sin
+    enviar dos veces lo mismo; si una instancia se cae, su tanda se vuelve a
+    reclamar cuando vence la reserva. Los resultados de cada tanda se guardan
+    juntos al final, con un UPDATE por clase de resultado (enviadas, a
+    reintentar, con error).
+    
+    Entre revisiones duerme hasta la próxima fecha_hora_envio pendiente (como
+    mucho `intervalo`, por las notificaciones que crean otras instancias). Se
+    despierta antes si esta instancia crea una notificación más próxima o
+    cancela turnos (avisos de cancelación), y al detener.
     """
     
-    def __init__(self, intervalo_minutos: int = 5):
+    def __init__(self, intervalo_minutos: int = 5, hilos: int = 4, envios_por_segundo: float = 5.0,
+                 limite_por_medio: Optional[Dict[str, int]] = None, lote: int = 50,
+                 lease_segundos: int = 300):
         """
         Args:
-            intervalo_minutos: Cada cuántos minutos revisar notificaciones pendientes (default: 5)
+            intervalo_minutos: Espera máxima entre revisiones, en minutos (default: 5)
+            hilos: Envíos en paralelo como máximo (default: 4)
+            envios_por_segundo: Tope de envíos por segundo entre todos los hilos (default: 5)
+            limite_por_medio: Envíos simultáneos por medio, p.ej. {'Email': 2}
+                              (los medios no indicados usan `hilos`)
+            lote: Notificaciones reclamadas por tanda (default: 50)
+            lease_segundos: Duración de la reserva de una tanda; debe alcanzar
+                            para enviarla (default: 300)
         """
         self.intervalo = intervalo_minutos * 60  # Convertir a segundos
         self.gestor = GestorNotificacion()
         self.thread = None
         self.activo = False
+        self.hilos = hilos
+        self.limitador = LimitadorTasa(envios_por_segundo)
+        self.limite_por_medio = limite_por_medio or {}
+        self.lote = lote
+        self.lease_segundos = lease_segundos
+        self._semaforos: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock_semaforos = threading.Lock()
+        self._detener = threading.Event()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Próxima revisión: la adelantan los avisos de notificaciones nuevas
+        self._condicion = threading.Condition()
+        self._proxima_revision: Optional[datetime] = None
         
     def iniciar(self):
         """Inicia el scheduler en segundo plano"""
@@ -26,15 +90,28 @@ class SchedulerNotificaciones:
             return
         
         self.activo = True
+        self._detener.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='notificacion')
+        GestorNotificacion.agregar_observador(self._notificacion_nueva)
+        GestorTurno.agregar_observador(self._turnos_modificados)
         self.thread = threading.Thread(target=self._ejecutar, daemon=True)
         self.thread.start()
-        print(f'✓ Scheduler de notificaciones iniciado (intervalo: {self.intervalo // 60} min)')
+        print(f'✓ Scheduler de notificaciones iniciado (revisión máxima cada {self.intervalo // 60} min)')
     
     def detener(self):
-        """Detiene el scheduler"""
+        """Detiene el scheduler: termina los envíos en curso y descarta los que no empezaron"""
         self.activo = False
+        self._detener.set()
+        with self._condicion:
+            self._condicion.notify_all()
+        GestorNotificacion.quitar_observador(self._notificacion_nueva)
+        GestorTurno.quitar_observador(self._turnos_modificados)
+        if self._pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
         if self.thread:
             self.thread.join(timeout=2)
+        self.gestor.cerrar_conexiones()
         print('✓ Scheduler de notificaciones detenido')
     
     def _ejecutar(self):
@@ -42,37 +119,139 @@ class SchedulerNotificaciones:
         print(f'[{datetime.now().strftime("%H:%M:%S")}] Scheduler en ejecución...')
         
         while self.activo:
+            # Desde acá, los avisos de notificaciones nuevas quedan para la próxima espera
+            with self._condicion:
+                self._proxima_revision = None
+            
             try:
                 self._procesar_notificaciones_pendientes()
             except Exception as e:
                 print(f'[ERROR] Scheduler: {str(e)}')
             
-            # Esperar el intervalo antes de la próxima revisión
-            time.sleep(self.intervalo)
+            self._esperar_proxima()
+    
+    def _esperar_proxima(self):
+        """
+        Duerme hasta la próxima notificación pendiente, como mucho `intervalo`
+        (la interrumpen los avisos de notificaciones más próximas y detener)
+        """
+        ahora = datetime.now()
+        candidatas = [ahora + timedelta(seconds=self.intervalo)]
+        proxima = self.gestor.proxima_notificacion()
+        if proxima:
+            # Al menos un segundo entre revisiones, por si la pendiente no se puede reclamar todavía
+            candidatas.append(max(proxima, ahora + timedelta(seconds=1)))
+        
+        with self._condicion:
+            if self._proxima_revision:
+                candidatas.append(self._proxima_revision)
+            self._proxima_revision = min(candidatas)
+            while self.activo and not self._detener.is_set():
+                espera = (self._proxima_revision - datetime.now()).total_seconds()
+                if espera <= 0:
+                    break
+                self._condicion.wait(espera)
+    
+    def _notificacion_nueva(self, fecha_hora_envio: datetime):
+        """Adelanta la próxima revisión si la notificación creada vence antes"""
+        with self._condicion:
+            if self._proxima_revision is None or fecha_hora_envio < self._proxima_revision:
+                self._proxima_revision = fecha_hora_envio
+                self._condicion.notify_all()
+    
+    def _turnos_modificados(self, matricula: int):
+        """Al cancelar turnos se pueden encolar avisos para enviar ya: revisar ahora"""
+        self._notificacion_nueva(datetime.now())
     
     def _procesar_notificaciones_pendientes(self):
-        """Obtiene y procesa todas las notificaciones pendientes"""
+        """Reclama y procesa tandas de notificaciones pendientes hasta vaciar la cola"""
         hora_actual = datetime.now().strftime('%H:%M:%S')
+        enviadas = fallidas = pospuestas = 0
         
-        # Obtener notificaciones pendientes
-        notificaciones = self.gestor.obtener_notificaciones_pendientes()
+        try:
+            while not self._detener.is_set():
+                token, notificaciones = self.gestor.reclamar_notificaciones(self.lote, self.lease_segundos)
+                if not notificaciones:
+                    break
+                
+                print(f'[{hora_actual}] Procesando {len(notificaciones)} notificación(es)...')
+                resultados = self._procesar_tanda(token, notificaciones)
+                
+                enviadas_tanda = sum(1 for _, clase, _ in resultados if clase == ENVIADO)
+                enviadas += enviadas_tanda
+                fallidas += len(resultados) - enviadas_tanda
+                pospuestas += len(notificaciones) - len(resultados)
+                
+                if len(notificaciones) < self.lote:
+                    break
+        finally:
+            # Las sesiones SMTP se reutilizan entre tandas y se cierran al final
+            self.gestor.cerrar_conexiones()
         
-        if not notificaciones:
+        if not (enviadas or fallidas or pospuestas):
             print(f'[{hora_actual}] No hay notificaciones pendientes')
             return
         
-        print(f'[{hora_actual}] Procesando {len(notificaciones)} notificación(es)...')
+        print(f'[{hora_actual}] Resultado: {enviadas} enviadas, {fallidas} fallidas, {pospuestas} pospuestas')
+    
+    def _procesar_tanda(self, token: str, notificaciones: list) -> List[Tuple[int, str, str]]:
+        """
+        Envía una tanda reclamada, guarda sus resultados y devuelve a la cola
+        las que no se llegaron a enviar
         
-        enviadas = 0
-        fallidas = 0
+        Returns:
+            Resultados (id_notificacion, clase, detalle) de las enviadas o fallidas
+        """
+        resultados = []
         
-        for notif in notificaciones:
-            if self.gestor.procesar_notificacion(notif):
-                enviadas += 1
-            else:
-                fallidas += 1
+        pool = self._pool or ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='notificacion')
+        try:
+            futuros = [pool.submit(self._despachar, notif) for notif in notificaciones]
+            for futuro in futuros:
+                try:
+                    resultado = futuro.result()
+                except CancelledError:
+                    resultado = None
+                if resultado is not None:
+                    resultados.append(resultado)
+        except RuntimeError:
+            # El pool se cerró (detener) mientras se encolaba la tanda
+            pass
+        finally:
+            if pool is not self._pool:
+                pool.shutdown(wait=True)
+            if resultados:
+                self.gestor.registrar_resultados(resultados, token)
+            if len(resultados) < len(notificaciones):
+                self.gestor.liberar_notificaciones(token)
         
-        print(f'[{hora_actual}] Resultado: {enviadas} enviadas, {fallidas} fallidas')
+        return resultados
+    
+    def _despachar(self, notif: dict) -> Optional[Tuple[int, str, str]]:
+        """
+        Envía una notificación desde un hilo del pool respetando el límite de
+        su medio y el de envíos por segundo
+        
+        Returns:
+            (id_notificacion, clase de resultado, detalle), o None si se detuvo
+            el scheduler antes de enviarla
+        """
+        if self._detener.is_set():
+            return None
+        
+        with self._semaforo(notif['medio_envio']):
+            if not self.limitador.esperar(self._detener):
+                return None
+            clase, detalle = self.gestor.enviar_notificacion(notif)
+            return notif['id_notificacion'], clase, detalle
+    
+    def _semaforo(self, medio: str) -> threading.BoundedSemaphore:
+        """Semáforo que limita los envíos simultáneos de un medio"""
+        with self._lock_semaforos:
+            if medio not in self._semaforos:
+                limite = self.limite_por_medio.get(medio, self.hilos)
+                self._semaforos[medio] = threading.BoundedSemaphore(max(1, limite))
+            return self._semaforos[medio]
     
     def ejecutar_ahora(self):
         """Ejecuta el procesamiento inmediatamente (útil para testing)"""
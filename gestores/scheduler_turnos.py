@@ -0,0 +1,238 @@
+import time
+import threading
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Set
+
+from data.database import Database
+from data.generar_turnos import generar_turnos_desde_agendas
+from gestores.gestor_agenda import GestorAgenda
+from gestores.gestor_turno import GestorTurno
+from gestores.indice_disponibilidad import IndiceDisponibilidad
+
+
+class SchedulerTurnos:
+    """
+    Scheduler que se ejecuta en segundo plano para mantener materializados los
+    turnos libres de los próximos N días de cada agenda activa.
+
+    Una vez por día agrega la fecha nueva del horizonte y borra los turnos
+    libres que ya pasaron (o que quedaron fuera del horizonte). Cuando una
+    agenda se modifica o se da de baja (GestorAgenda) regenera solo los turnos
+    futuros de esa agenda.
+
+    En cada vuelta también marca como inasistencia los turnos programados que
+    ya pasaron (solo las fechas nuevas desde la última barrida).
+
+    Con materializar=False no se generan filas 'Libre': los turnos libres se
+    calculan desde las agendas (GestorDisponibilidad) y el scheduler solo
+    depura las filas 'Libre' que ya pasaron o que quedaron desactualizadas.
+    """
+
+    def __init__(self, dias_horizonte: int = 30, intervalo_minutos: int = 10,
+                 tamano_lote_borrado: int = 5000, materializar: bool = True):
+        """
+        Args:
+            dias_horizonte: Días hacia adelante con turnos libres generados (default: 30)
+            intervalo_minutos: Cada cuántos minutos revisar si cambió el día (default: 10)
+            tamano_lote_borrado: Turnos borrados por sentencia DELETE al depurar
+            materializar: Generar filas 'Libre' para el horizonte (default: True)
+        """
+        self.dias_horizonte = dias_horizonte
+        self.intervalo = intervalo_minutos * 60  # Convertir a segundos
+        self.tamano_lote_borrado = tamano_lote_borrado
+        self.materializar = materializar
+        self.thread = None
+        self.activo = False
+        self._ultimo_dia: Optional[date] = None
+        self._agendas_pendientes: Set[int] = set()
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+
+    def iniciar(self):
+        """Inicia el scheduler en segundo plano"""
+        if self.activo:
+            print('[WARNING] Scheduler de turnos ya está en ejecución')
+            return
+
+        self.activo = True
+        GestorAgenda.agregar_observador(self.regenerar_agenda)
+        self.thread = threading.Thread(target=self._ejecutar, daemon=True)
+        self.thread.start()
+        print(f'✓ Scheduler de turnos iniciado (horizonte: {self.dias_horizonte} días)')
+
+    def detener(self):
+        """Detiene el scheduler"""
+        self.activo = False
+        GestorAgenda.quitar_observador(self.regenerar_agenda)
+        self._despertar.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        print('✓ Scheduler de turnos detenido')
+
+    def regenerar_agenda(self, id_agenda: int):
+        """
+        Programa la regeneración de los turnos futuros de una agenda
+        (se llama desde GestorAgenda al modificarla o darla de baja)
+        """
+        with self._lock:
+            self._agendas_pendientes.add(id_agenda)
+        self._despertar.set()
+
+    def _ejecutar(self):
+        """Bucle principal del scheduler"""
+        print(f'[{datetime.now().strftime("%H:%M:%S")}] Scheduler de turnos en ejecución...')
+
+        while self.activo:
+            try:
+                if self._ultimo_dia != date.today():
+                    self._mantener_horizonte()
+                self._procesar_agendas_pendientes()
+                GestorTurno().marcar_inasistencias_pendientes()
+            except Exception as e:
+                print(f'[ERROR] Scheduler de turnos: {str(e)}')
+
+            # Esperar el intervalo, o hasta que se modifique una agenda
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+    def _mantener_horizonte(self):
+        """Completa el horizonte de todas las agendas y depura turnos libres fuera de él"""
+        hoy = date.today()
+        hora_actual = datetime.now().strftime('%H:%M:%S')
+
+        if not self.materializar:
+            borrados = self._borrar_turnos_libres("fecha < %s", (hoy,))
+            self._ultimo_dia = hoy
+            print(f'[{hora_actual}] Turnos libres vencidos depurados: {borrados}')
+            return
+
+        resumen = generar_turnos_desde_agendas(fecha_inicio=hoy, dias_adelante=self.dias_horizonte)
+        if resumen is None:
+            if self._hay_agendas_activas() is False:
+                # Sin agendas no hay nada que generar: no se reintenta hasta mañana
+                self._ultimo_dia = hoy
+                print(f'[{hora_actual}] Sin agendas activas: no hay turnos para generar')
+            # Sin conexión o con error: se reintenta en el próximo intervalo
+            return
+
+        borrados = self._borrar_turnos_libres(
+            "(fecha < %s OR fecha >= %s)", (hoy, hoy + timedelta(days=self.dias_horizonte)))
+
+        self._ultimo_dia = hoy
+        IndiceDisponibilidad().invalidar()
+        print(f'[{hora_actual}] Horizonte de turnos al día: {resumen["insertados"]} creados, '
+              f'{borrados} libres depurados')
+
+    def _procesar_agendas_pendientes(self):
+        """Regenera los turnos futuros de las agendas modificadas o dadas de baja"""
+        with self._lock:
+            pendientes = sorted(self._agendas_pendientes)
+            self._agendas_pendientes.clear()
+
+        for id_agenda in pendientes:
+            hoy = date.today()
+            hora_actual = datetime.now().strftime('%H:%M:%S')
+
+            # Los turnos libres futuros se rehacen; los ya asignados se conservan
+            borrados = self._borrar_turnos_libres("id_agenda = %s AND fecha >= %s", (id_agenda, hoy))
+
+            if not self.materializar:
+                print(f'[{hora_actual}] Agenda #{id_agenda} actualizada ({borrados} libres eliminados)')
+                continue
+
+            if not self._agenda_activa(id_agenda):
+                print(f'[{hora_actual}] Agenda #{id_agenda} sin turnos futuros ({borrados} libres eliminados)')
+                continue
+
+            resumen = generar_turnos_desde_agendas(
+                fecha_inicio=hoy,
+                dias_adelante=self.dias_horizonte,
+                ids_agenda=[id_agenda],
+                completar_fechas=True
+            )
+            creados = resumen['insertados'] if resumen else 0
+            IndiceDisponibilidad().invalidar()
+            print(f'[{hora_actual}] Agenda #{id_agenda} regenerada: {borrados} libres eliminados, {creados} creados')
+
+    def _agenda_activa(self, id_agenda: int) -> bool:
+        """Indica si la agenda existe y está activa"""
+        db = Database()
+        if not db.conectar():
+            return False
+        try:
+            agenda = db.obtener_registro(
+                "SELECT id_agenda FROM Agenda WHERE id_agenda = %s AND activa = TRUE", (id_agenda,))
+            return agenda is not None
+        finally:
+            db.desconectar()
+
+    def _hay_agendas_activas(self) -> Optional[bool]:
+        """Indica si existe al menos una agenda activa (None si no hay conexión)"""
+        db = Database()
+        if not db.conectar():
+            return None
+        try:
+            agenda = db.obtener_registro("SELECT id_agenda FROM Agenda WHERE activa = TRUE LIMIT 1")
+            return agenda is not None
+        finally:
+            db.desconectar()
+
+    def _borrar_turnos_libres(self, condicion: str, params: tuple) -> int:
+        """
+        Borra por lotes los turnos libres (sin paciente) que cumplen la condición
+
+        Returns:
+            Cantidad de turnos borrados
+        """
+        db = Database()
+        if not db.conectar():
+            print('[ERROR] No se pudo conectar a la base de datos')
+            return 0
+
+        query_ids = f"""
+        SELECT id_turno FROM Turno
+        WHERE estado = 'Libre' AND id_paciente IS NULL AND {condicion}
+        LIMIT {int(self.tamano_lote_borrado)}
+        """
+
+        borrados = 0
+        try:
+            while True:
+                ids: List[int] = [fila['id_turno'] for fila in db.obtener_registros(query_ids, params) or []]
+                if not ids:
+                    break
+                marcadores = ", ".join(["%s"] * len(ids))
+                resultado = db.ejecutar_consulta(
+                    f"DELETE FROM Turno WHERE id_turno IN ({marcadores})", tuple(ids))
+                if not resultado:
+                    break
+                borrados += resultado
+        finally:
+            db.desconectar()
+        return borrados
+
+    def ejecutar_ahora(self):
+        """Ejecuta el mantenimiento inmediatamente (útil para testing)"""
+        print('\n=== EJECUCIÓN MANUAL DEL SCHEDULER DE TURNOS ===')
+        self._mantener_horizonte()
+        self._procesar_agendas_pendientes()
+        GestorTurno().marcar_inasistencias_pendientes()
+        print('=== FIN EJECUCIÓN MANUAL ===\n')
+
+
+# Para testing directo
+if __name__ == '__main__':
+    print('=== TEST DE SCHEDULER DE TURNOS ===\n')
+
+    scheduler = SchedulerTurnos(dias_horizonte=30, intervalo_minutos=1)
+    scheduler.iniciar()
+
+    try:
+        # Mantener el programa corriendo
+        print('Presiona Ctrl+C para detener...\n')
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print('\n\nDeteniendo scheduler...')
+        scheduler.detener()
+        print('\nScheduler detenido correctamente')
@@ -30,7 +30,7 @@ def main():
     db = Database()
     
     # Conectar a la base de datos
-    if db.conectar("127.0.0.1:3306/hospital_db"):
+    if db.conectar():
         print(f"   Estado: {db}")
         
         # ========== CONSULTAR DATOS ==========
@@ -7,54 +7,44 @@ Ignora los turnos en estado 'Libre' (y cualquier otro estado no relevante).
 import os
 from typing import Optional, Tuple
 
-import mysql.connector
 import matplotlib.pyplot as plt
 
+from data.database import Database
 
-def _contar_asistencias(
-    host: str = "127.0.0.1",
-    user: str = "root",
-    password: str = "",
-    database: str = "hospital_db",
-    port: int = 3306,
-) -> Tuple[int, int]:
+
+def _contar_asistencias() -> Tuple[int, int]:
     """
     Devuelve (asistieron, no_asistieron) leyendo de la tabla Turno.
     Cuenta:
       - Asistieron: estado = 'Atendido'
       - No asistieron: estado = 'Inasistencia'
     Ignora 'Libre' (y cualquier otro estado).
+    Usa el servidor de lectura configurado en Database (DB_READ_* / .env).
     """
-    conn = mysql.connector.connect(
-        host=host, user=user, password=password, database=database, port=port
-    )
+    db = Database()
+    if not db.conectar(solo_lectura=True):
+        raise ConnectionError("No se pudo conectar a la base de datos")
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT estado, COUNT(*) 
+        filas = db.obtener_registros("""
+            SELECT estado, COUNT(*) AS cantidad
             FROM Turno
             WHERE estado IN ('Atendido','Inasistencia')
             GROUP BY estado
-        """)
+        """) or []
         asist, no_asist = 0, 0
-        for estado, cant in cur.fetchall():
-            if estado == "Atendido":
-                asist = int(cant)
-            elif estado == "Inasistencia":
-                no_asist = int(cant)
+        for fila in filas:
+            if fila['estado'] == "Atendido":
+                asist = int(fila['cantidad'])
+            elif fila['estado'] == "Inasistencia":
+                no_asist = int(fila['cantidad'])
         return asist, no_asist
     finally:
-        conn.close()
+        db.desconectar()
 
 
 def grafico_asistencia_bd(
     ruta_salida: str,
     *,
-    host: str = "127.0.0.1",
-    user: str = "root",
-    password: str = "",
-    database: str = "hospital_db",
-    port: int = 3306,
     tipo: str = "pie",   # "pie" o "bar"
 ) -> Optional[str]:
     """
@@ -62,9 +52,7 @@ def grafico_asistencia_bd(
     Si no hay datos (0 y 0), igual genera una imagen con el aviso.
     """
     # 1) Datos
-    asist, no_asist = _contar_asistencias(
-        host=host, user=user, password=password, database=database, port=port
-    )
+    asist, no_asist = _contar_asistencias()
 
     # 2) Preparar carpeta
     parent = os.path.dirname(ruta_salida)
@@ -22,7 +22,7 @@ if not turnos_libres:
 print(f"   ✓ Encontrados {len(turnos_libres)} turnos libres")
 print(f"\n2. Seleccionando primer turno disponible:")
 turno = turnos_libres[0]
-print(f"   ID: {turno['id_turno']}")
+print(f"   ID: {turno['id_turno'] or '(se crea al reservar)'}")
 print(f"   Fecha: {turno['fecha']}")
 print(f"   Hora: {turno['hora_inicio']}")
 
@@ -30,10 +30,9 @@ print(f"   Hora: {turno['hora_inicio']}")
 print(f"\n3. Programando turno para María González (ID: 1)...")
 print("=" * 80)
 
-exito, mensaje = controller.programar_turno(
+exito, mensaje = controller.programar_turno_libre(
     id_paciente=1,
-    matricula=12345,
-    id_turno=turno['id_turno'],
+    turno=turno,
     observaciones="Turno de prueba - Sistema de notificaciones"
 )
 
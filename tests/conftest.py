@@ -0,0 +1,27 @@
+"""
+Las pruebas corren sobre el backend SQLite con los datos de ejemplo, en un
+archivo temporal (cada hilo usa su propia conexión), sin servidor MySQL.
+"""
+
+import os
+import sys
+import tempfile
+
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["DB_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="tpdao_tests_"), "hospital.sqlite")
+os.environ["DB_SQLITE_DATOS"] = "1"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from data.database import Database
+
+
+@pytest.fixture
+def db():
+    """Database conectada durante la prueba"""
+    db = Database()
+    assert db.conectar()
+    yield db
+    db.desconectar()
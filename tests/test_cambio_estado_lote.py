@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+
+import pytest
+
+from gestores.gestor_turno import GestorTurno
+
+
+@pytest.fixture
+def turnos(db):
+    """
+    Turnos de un médico en una fecha lejana: dos programados (el paciente del
+    primero tiene contacto), uno atendido, uno con un estado desconocido y uno libre
+    """
+    agenda = db.obtener_registro("SELECT id_agenda, matricula, id_consultorio FROM Agenda ORDER BY id_agenda LIMIT 1")
+    pacientes = [p['id_paciente'] for p in db.obtener_registros("SELECT id_paciente FROM Paciente ORDER BY id_paciente LIMIT 4")]
+    fecha = date.today() + timedelta(days=500)
+    db.ejecutar_consulta("DELETE FROM Contactos_Paciente WHERE id_paciente IN (%s, %s)", (pacientes[0], pacientes[1]))
+    db.ejecutar_consulta(
+        "INSERT INTO Contactos_Paciente (id_paciente, tipo_contacto, valor_contacto, es_principal) "
+        "VALUES (%s, 'Email', 'paciente@example.com', TRUE)", (pacientes[0],))
+
+    ids = {}
+    for hora, (nombre, id_paciente, estado) in enumerate([
+            ('programado', pacientes[0], 'Programado'), ('programado_sin_contacto', pacientes[1], 'Programado'),
+            ('atendido', pacientes[2], 'Atendido'), ('desconocido', pacientes[3], 'Bloqueado'),
+            ('libre', None, 'Libre')], start=8):
+        db.ejecutar_consulta(
+            "INSERT INTO Turno (id_paciente, matricula, id_consultorio, id_agenda, fecha, hora_inicio, hora_fin, estado) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+            (id_paciente, agenda['matricula'], agenda['id_consultorio'], agenda['id_agenda'], fecha,
+             timedelta(hours=hora), timedelta(hours=hora, minutes=30), estado))
+        ids[nombre] = db.get_last_insert_id()
+
+    yield {'ids': ids, 'matricula': agenda['matricula'], 'fecha': fecha}
+
+    marcadores = ", ".join(["%s"] * len(ids))
+    for tabla in ("Notificacion", "cambio_estado", "Turno"):
+        db.ejecutar_consulta(f"DELETE FROM {tabla} WHERE id_turno IN ({marcadores})", tuple(ids.values()))
+
+
+@pytest.fixture
+def cambios():
+    """Matrículas avisadas a los observadores de GestorTurno durante la prueba"""
+    avisadas = []
+    GestorTurno.agregar_observador(avisadas.append)
+    yield avisadas
+    GestorTurno.quitar_observador(avisadas.append)
+
+
+def _estados(db, ids):
+    filas = db.obtener_registros(
+        f"SELECT id_turno, estado FROM Turno WHERE id_turno IN ({', '.join(['%s'] * len(ids))})", tuple(ids))
+    return {f['id_turno']: f['estado'] for f in filas}
+
+
+def _auditoria(db, ids):
+    return db.obtener_registros(
+        f"SELECT id_turno, estado_anterior, estado_nuevo FROM cambio_estado "
+        f"WHERE id_turno IN ({', '.join(['%s'] * len(ids))}) ORDER BY id_turno", tuple(ids))
+
+
+def test_cancelar_aplica_los_validos_y_rechaza_el_resto(db, turnos, cambios):
+    ids = turnos['ids']
+    pedidos = [ids['programado'], ids['programado_sin_contacto'], ids['atendido'], ids['desconocido'], 999999]
+
+    resultado = GestorTurno().cambiar_estado_lote('cancelar', pedidos)
+
+    assert sorted(resultado['aplicados']) == sorted([ids['programado'], ids['programado_sin_contacto']])
+    motivos = {r['id_turno']: r['motivo'] for r in resultado['rechazados']}
+    assert motivos == {
+        ids['atendido']: "No se puede cancelar un turno Atendido",
+        ids['desconocido']: "Estado desconocido: Bloqueado",
+        999999: "Turno no encontrado",
+    }
+    assert _estados(db, pedidos) == {
+        ids['programado']: 'Cancelado', ids['programado_sin_contacto']: 'Cancelado',
+        ids['atendido']: 'Atendido', ids['desconocido']: 'Bloqueado',
+    }
+    assert _auditoria(db, list(ids.values())) == [
+        {'id_turno': ids['programado'], 'estado_anterior': 'Programado', 'estado_nuevo': 'Cancelado'},
+        {'id_turno': ids['programado_sin_contacto'], 'estado_anterior': 'Programado', 'estado_nuevo': 'Cancelado'},
+    ]
+    # Aviso de cancelación solo para el paciente con contacto
+    assert resultado['notificaciones'] == 1
+    avisos = db.obtener_registros(
+        "SELECT id_turno, tipo, medio_envio FROM Notificacion WHERE id_turno IN (%s, %s)",
+        (ids['programado'], ids['programado_sin_contacto']))
+    assert avisos == [{'id_turno': ids['programado'], 'tipo': 'Cancelacion', 'medio_envio': 'Email'}]
+    assert cambios == [turnos['matricula']]
+
+
+def test_todo_o_nada_no_modifica_nada_si_hay_rechazos(db, turnos, cambios):
+    ids = turnos['ids']
+
+    resultado = GestorTurno().cambiar_estado_lote(
+        'cancelar', [ids['programado'], ids['atendido']], todo_o_nada=True)
+
+    assert resultado['aplicados'] == []
+    assert [r['id_turno'] for r in resultado['rechazados']] == [ids['atendido']]
+    assert _estados(db, [ids['programado'], ids['atendido']]) == {
+        ids['programado']: 'Programado', ids['atendido']: 'Atendido'}
+    assert _auditoria(db, list(ids.values())) == []
+    assert db.obtener_registro("SELECT COUNT(*) as n FROM Notificacion WHERE id_turno = %s",
+                               (ids['programado'],))['n'] == 0
+    assert cambios == []
+
+
+def test_cancelar_el_dia_de_un_medico(db, turnos, cambios):
+    ids = turnos['ids']
+
+    resultado = GestorTurno().cambiar_estado_lote(
+        'cancelar', matricula=turnos['matricula'], desde=turnos['fecha'])
+
+    # Los turnos sin paciente (libres) no se tocan
+    assert sorted(resultado['aplicados']) == sorted([ids['programado'], ids['programado_sin_contacto']])
+    assert _estados(db, [ids['libre']]) == {ids['libre']: 'Libre'}
+    assert cambios == [turnos['matricula']]
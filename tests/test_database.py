@@ -0,0 +1,25 @@
+import time
+
+from data.database import Database
+
+
+def test_ejecutar_lote_registra_la_duracion_de_todo_el_lote():
+    db = Database()
+    Database.metricas.reiniciar()
+    filas = [(f"lote_{i}", "Sin descripción") for i in range(1200)]
+
+    assert db.conectar()
+    try:
+        inicio = time.perf_counter()
+        resultado = db.ejecutar_lote(
+            "INSERT INTO Especialidad (nombre, descripcion) VALUES (%s, %s)", filas, chunk_size=500)
+        transcurrido_ms = (time.perf_counter() - inicio) * 1000
+        db.ejecutar_consulta("DELETE FROM Especialidad WHERE nombre LIKE 'lote_%'")
+    finally:
+        db.desconectar()
+
+    assert resultado['filas_por_lote'] == [500, 500, 200]
+    metrica = next(m for m in Database.metricas.por_huella() if m['huella'].startswith("INSERT INTO Especialidad"))
+    assert metrica['cantidad'] == 1
+    assert metrica['filas'] == 1200
+    assert 0 < metrica['total_ms'] <= transcurrido_ms
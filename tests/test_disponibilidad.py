@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from data.database import Database
+from data.generar_turnos import calcular_slots
+from gestores.gestor_disponibilidad import GestorDisponibilidad
+
+
+def _agenda_y_slot(db: Database, dias: int):
+    """Una agenda activa y su primer horario a partir de hoy + dias"""
+    agenda = db.obtener_registro(
+        "SELECT id_agenda, matricula, id_consultorio, dia_semana, hora_inicio, hora_fin "
+        "FROM Agenda WHERE activa = TRUE ORDER BY id_agenda LIMIT 1")
+    inicio = date.today() + timedelta(days=dias)
+    _, _, _, fecha, hora_inicio, hora_fin = calcular_slots([agenda], inicio, inicio + timedelta(days=7))[0]
+    return agenda, fecha, hora_inicio, hora_fin
+
+
+def test_reservar_rechaza_horarios_pasados(db):
+    agenda, fecha, hora_inicio, _ = _agenda_y_slot(db, -7)
+
+    exito, mensaje, id_turno = GestorDisponibilidad().reservar(1, agenda['id_agenda'], fecha, hora_inicio)
+
+    assert not exito and id_turno is None
+    assert "ya pasó" in mensaje
+
+
+def test_reservar_no_pisa_un_turno_ya_tomado(db):
+    agenda, fecha, hora_inicio, hora_fin = _agenda_y_slot(db, 400)
+    db.ejecutar_consulta(
+        "INSERT INTO Turno (matricula, id_consultorio, id_agenda, fecha, hora_inicio, hora_fin, estado) "
+        "VALUES (%s, %s, %s, %s, %s, %s, 'Libre')",
+        (agenda['matricula'], agenda['id_consultorio'], agenda['id_agenda'], fecha, hora_inicio, hora_fin))
+    id_libre = db.get_last_insert_id()
+
+    disponibilidad = GestorDisponibilidad()
+    primero = disponibilidad.reservar(1, agenda['id_agenda'], fecha, hora_inicio)
+    segundo = disponibilidad.reservar(2, agenda['id_agenda'], fecha, hora_inicio)
+
+    turno = db.obtener_registro("SELECT id_paciente, estado FROM Turno WHERE id_turno = %s", (id_libre,))
+    db.ejecutar_consulta("DELETE FROM Turno WHERE id_turno = %s", (id_libre,))
+
+    assert primero[0] and primero[2] == id_libre
+    assert not segundo[0] and "ya fue tomado" in segundo[1]
+    assert turno == {'id_paciente': 1, 'estado': 'Programado'}
+
+
+def test_un_horario_del_medico_no_se_programa_dos_veces(db):
+    agenda, fecha, hora_inicio, hora_fin = _agenda_y_slot(db, 410)
+    insertar = (
+        "INSERT INTO Turno (id_paciente, matricula, id_consultorio, id_agenda, fecha, hora_inicio, hora_fin, estado) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, 'Programado')")
+    db.ejecutar_consulta(insertar, (1, agenda['matricula'], agenda['id_consultorio'], agenda['id_agenda'],
+                                    fecha, hora_inicio, hora_fin))
+    id_turno = db.get_last_insert_id()
+
+    # El mismo horario para otro paciente choca con unique_slot_programado
+    duplicado = db.ejecutar_consulta(insertar, (2, agenda['matricula'], agenda['id_consultorio'],
+                                                agenda['id_agenda'], fecha, hora_inicio, hora_fin))
+    db.ejecutar_consulta("DELETE FROM Turno WHERE id_turno = %s", (id_turno,))
+
+    assert duplicado is None
@@ -0,0 +1,43 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from gestores.gestor_notificacion import GestorNotificacion
+
+
+def test_cerrar_conexiones_cierra_y_olvida_las_sesiones_de_cada_pool():
+    gestor = GestorNotificacion()
+
+    for _ in range(3):
+        # Como en cada ejecución del scheduler: un pool nuevo que usa una sesión por hilo
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            barrera = threading.Barrier(4)
+            mailers = list(pool.map(lambda _: (barrera.wait(), gestor.mailer)[1], range(4)))
+        assert len(gestor._mailers) == 4
+        gestor.cerrar_conexiones()
+        assert gestor._mailers == []
+        assert all(m._servidor is None for m in mailers)
+
+    # El hilo actual recibe una sesión nueva después de cerrar
+    assert gestor.mailer in gestor._mailers
+
+
+def test_reclamar_cierra_las_notificaciones_que_no_se_pueden_enviar(db):
+    # Un turno libre no tiene paciente: su notificación queda fuera de los JOIN
+    turno = db.obtener_registro("SELECT id_turno FROM Turno WHERE id_paciente IS NULL LIMIT 1")
+    db.ejecutar_consulta(
+        "INSERT INTO Notificacion (id_turno, fecha_hora_envio, estado, medio_envio) "
+        "VALUES (%s, NOW(), 'Pendiente', 'email')", (turno['id_turno'],))
+    id_notificacion = db.get_last_insert_id()
+    gestor = GestorNotificacion()
+
+    token, reclamadas = gestor.reclamar_notificaciones(cantidad=1000)
+    gestor.liberar_notificaciones(token)
+
+    notificacion = db.obtener_registro(
+        "SELECT estado, lease_token FROM Notificacion WHERE id_notificacion = %s", (id_notificacion,))
+    assert id_notificacion not in [n['id_notificacion'] for n in reclamadas]
+    assert notificacion == {'estado': 'Error', 'lease_token': None}
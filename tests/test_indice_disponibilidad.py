@@ -0,0 +1,69 @@
+import threading
+import time
+
+from gestores.indice_disponibilidad import IndiceDisponibilidad
+
+
+class DisponibilidadFalsa:
+    """Reemplaza a GestorDisponibilidad: devuelve `turnos` y cuenta las consultas"""
+
+    def __init__(self, turnos, espera: threading.Event = None):
+        self.turnos = turnos
+        self.espera = espera
+        self.consultas = 0
+
+    def turnos_libres(self, matriculas, desde=None, hasta=None):
+        self.consultas += 1
+        if self.espera:
+            self.espera.wait(5)
+        return self.turnos
+
+
+def test_una_consulta_fallida_no_queda_guardada(monkeypatch):
+    indice = IndiceDisponibilidad()
+    indice.invalidar()
+    falsa = DisponibilidadFalsa(None)
+    monkeypatch.setattr(indice, 'disponibilidad', falsa)
+
+    assert indice.libres(99999) == []
+    assert indice.libres(99999) == []
+    assert falsa.consultas == 2
+
+
+def test_la_consulta_a_la_bd_no_bloquea_los_eventos(monkeypatch):
+    indice = IndiceDisponibilidad()
+    indice.invalidar()
+    liberar = threading.Event()
+    monkeypatch.setattr(indice, 'disponibilidad', DisponibilidadFalsa([], liberar))
+
+    consulta = threading.Thread(target=indice.libres, args=(99999,))
+    consulta.start()
+    invalidado = threading.Event()
+    evento = threading.Thread(target=lambda: (indice.invalidar(99999), invalidado.set()))
+    evento.start()
+
+    assert invalidado.wait(2), "invalidar() esperó a la consulta a la BD"
+    liberar.set()
+    consulta.join()
+    evento.join()
+    # La lectura empezó antes de invalidar: no se guarda
+    assert 99999 not in indice._medicos
+
+
+def test_un_cambio_de_otro_medico_no_descarta_la_lectura(monkeypatch):
+    indice = IndiceDisponibilidad()
+    indice.invalidar()
+    liberar = threading.Event()
+    falsa = DisponibilidadFalsa([], liberar)
+    monkeypatch.setattr(indice, 'disponibilidad', falsa)
+
+    consulta = threading.Thread(target=indice.libres, args=(99999,))
+    consulta.start()
+    # Esperar a que la lectura esté en curso antes del cambio
+    while not falsa.consultas:
+        time.sleep(0.001)
+    indice.invalidar(99998)
+    liberar.set()
+    consulta.join()
+
+    assert 99999 in indice._medicos
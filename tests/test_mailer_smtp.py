@@ -0,0 +1,83 @@
+import smtplib
+
+import pytest
+
+from gestores.mailer_smtp import MailerSMTP
+
+
+class SMTPFalso:
+    """Servidor SMTP en memoria: rechaza destinatarios 'rechazado@...' y cuerpos 'spam'"""
+
+    def __init__(self, host, port, timeout=None):
+        self.enviados = []
+        self.rsets = 0
+        self.cortar_proximo = False
+        self.cerrado = False
+
+    def starttls(self):
+        pass
+
+    def login(self, usuario, password):
+        pass
+
+    def send_message(self, msg):
+        if self.cortar_proximo:
+            self.cortar_proximo = False
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        if msg['To'].startswith('rechazado'):
+            raise smtplib.SMTPRecipientsRefused({msg['To']: (550, b'No such user')})
+        if msg['Subject'] == 'spam':
+            raise smtplib.SMTPDataError(554, b'Message rejected')
+        self.enviados.append(msg['To'])
+
+    def rset(self):
+        self.rsets += 1
+
+    def quit(self):
+        self.cerrado = True
+
+    def close(self):
+        self.cerrado = True
+
+
+@pytest.fixture
+def conexiones(monkeypatch):
+    """Sesiones SMTP abiertas por el mailer durante la prueba"""
+    abiertas = []
+
+    def conectar(*args, **kwargs):
+        abiertas.append(SMTPFalso(*args, **kwargs))
+        return abiertas[-1]
+
+    monkeypatch.setattr(smtplib, 'SMTP', conectar)
+    return abiertas
+
+
+def _mailer():
+    return MailerSMTP('hospital@example.com', host='localhost', port=8025, starttls=False)
+
+
+def test_un_mensaje_rechazado_no_descarta_la_sesion(conexiones):
+    mailer = _mailer()
+
+    assert mailer.enviar('a@example.com', 'Turno', 'x')[0]
+    exito, detalle = mailer.enviar('rechazado@example.com', 'Turno', 'x')
+    assert not exito and 'No such user' in detalle
+    assert not mailer.enviar('b@example.com', 'spam', 'x')[0]
+    assert mailer.enviar('c@example.com', 'Turno', 'x')[0]
+
+    assert len(conexiones) == 1
+    assert conexiones[0].enviados == ['a@example.com', 'c@example.com']
+    assert conexiones[0].rsets == 2
+
+
+def test_reconecta_si_la_sesion_se_corta(conexiones):
+    mailer = _mailer()
+    assert mailer.enviar('a@example.com', 'Turno', 'x')[0]
+    conexiones[0].cortar_proximo = True
+
+    assert mailer.enviar('b@example.com', 'Turno', 'x')[0]
+
+    assert len(conexiones) == 2
+    assert conexiones[0].cerrado
+    assert conexiones[1].enviados == ['b@example.com']